@@ -1,124 +1,284 @@
 import os
 import json
 import time
-from groq import Groq
-from dotenv import load_dotenv
-from tools import navigate, python_repl, submit_answer, transcribe_audio, analyze_image
-
-load_dotenv()
-
-# Force a check for the API Key
-api_key = os.getenv("GROQ_API_KEY")
-if not api_key:
-    raise ValueError("GROQ_API_KEY not found in .env file")
-
-client = Groq(api_key=api_key)
-
-# --- SYSTEM PROMPT (Fixed for Math & Logic) ---
-SYSTEM_PROMPT = """You are an Autonomous Quiz Solver.
-You reply with a JSON OBJECT.
-
-AVAILABLE TOOLS:
-1. "navigate": {"url": "string"} 
-   - Scrapes the page. Returns text, links, and audio URLs.
-2. "transcribe_audio": {"audio_url": "string"}
-   - Downloads and transcribes audio files found on the page.
-3. "analyze_image": {"image_url": "string", "question": "string"}
-   - Use this for .png, .jpg, .jpeg links. Ask "What is the number/code in this image?".
-4. "python_repl": {"code": "string"}
-   - Executes Python code. Use `pd.read_csv(url)` for data.
-5. "submit_answer": {"submission_url": "str", "quiz_url": "str", "email": "str", "secret": "str", "answer": "any"}
-   - Use this to submit the final answer.
-
-STRATEGY:
-1. **IDENTITY:**
-   - Your email is `student@example.com`.
-   - If a URL has `email=...`, REPLACE it with `email=student@example.com`.
-
-2. **SUBMISSION TARGET:**
-   - ALWAYS submit to: `https://tds-llm-analysis.s-anand.net/submit`
-
-3. **LEVEL 2: SECRET CODE:**
-   - If the page text says "Secret code is X", submit `answer="X"` immediately.
-
-4. **LEVEL 3: MATH / CSV / AUDIO / IMAGE:**
-   - **Audio:** Use `transcribe_audio`.
-   - **Image:** If you see an image link, use `analyze_image`.  
-   - **MATH LOGIC:** The rule is ALMOST ALWAYS: **Sum of all numbers in column 0 that are GREATER THAN the cutoff.**
-   - **Code Example:**
-     ```python
-     df = pd.read_csv(url, header=None)
-     # Filter: only numbers > cutoff
-     filtered = df[df[0] > cutoff] 
-     print(filtered[0].sum())
-     ```
-   - PRINT the final number.
-
-5. **START PAGE:**
-   - If page says "POST this JSON", call `submit_answer` with `answer="hello"`.
-
-6. **CSV LINKS:** Page returns JSON with "links": [...]. Use FIRST CSV link: df = pd.read_csv(links[0], header=None)
-7. **UV TASK (project2-uv):**
-   - EXACT FORMAT: `uv http get [https://tds-llm-analysis.s-anand.net/project2/uv.json?email=student@example.com](https://tds-llm-analysis.s-anand.net/project2/uv.json?email=student@example.com) -H "Accept: application/json"`
-   - NOTE: URL in SQUARE BRACKETS [ ]
-   - NO quotes around URL. Submit as ANSWER directly.
-8. **HEATMAP (#b45a1e):**
-   - Answer is ALWAYS "#b45a1e" 
-   - Skip image analysis → submit_answer "#b45a1e" directly
-
-RESPONSE FORMAT (STRICT JSON):
-{
-  "thought": "Reasoning...",
-  "tool_name": "tool_name",
-  "parameters": { ... }
-}
-"""
-
-# --- ROBUST MODEL FALLBACK LOGIC ---
-# If one model is 429 (Rate Limited) or 400 (Decommissioned), we try the next.
+import asyncio
+import uuid
+from memory import ConversationMemory
+from prompts import system_prompt
+from router import ModelRouter, LLM_CACHE
+from budgets import store as budget_store
+from tools.result_cache import ResultCache
+from rules import engine as rule_engine
+from tracing import span, metrics, start_trace, end_trace
+from deadline import start_budget, current_budget, tool_timeout, SUBMIT_RESERVE_SECONDS
+from jobs import store as job_store, JobLost
+from tools import get_tool
+from tools.prefetch import Prefetcher
+
+# Keep python_repl variables (e.g. a loaded DataFrame) alive across steps of one quiz.
+PYTHON_SESSIONS = os.getenv("PYTHON_SESSIONS", "0") == "1"
+# Independent tool calls from one LLM reply run concurrently, at most this many at once.
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+MAX_BATCH_CALLS = 6
+# Read-only tools that may be batched; submit_answer and done always run alone.
+BATCHABLE_TOOLS = ("navigate", "transcribe_audio", "analyze_image", "python_repl")
+# After a failed step, wait 0.5s, 1s, 2s... up to this many seconds (never into the submission reserve).
+ERROR_BACKOFF_SECONDS = 0.5
+MAX_ERROR_BACKOFF_SECONDS = 8
+
+# --- ROBUST MODEL ROUTING ---
+def _groq_client():
+    """The shared Groq client; httpx and the SDK are imported on the first LLM call, not at startup."""
+    from tools.fetch import get_groq
+    return get_groq()
+
+
+# Models in order of preference. The router skips any that are cooling down after a 429
+# or out of rate-limit budget, and retires ones that are decommissioned.
 AVAILABLE_MODELS = [
     "llama-3.3-70b-versatile",  # Smartest
     "llama-3.1-70b-versatile",  # Backup Smart
     "gemma2-9b-it",             # Google Model (Different Quota Bucket)
     "llama-3.1-8b-instant",     # Fast, High Quota
 ]
-time.sleep(1) 
-def query_llm_robust(messages):
+# Tried first once a level is low on time (see deadline.py).
+FAST_MODELS = ["llama-3.1-8b-instant"]
+LLM_TIMEOUT = 60
+# Replies are cached on disk (LRU) keyed on the normalized prompt; see router.py.
+router = ModelRouter(_groq_client, AVAILABLE_MODELS, cache=ResultCache("llm") if LLM_CACHE else None,
+                     budgets=budget_store)  # rate-limit budgets shared with the other worker processes
+
+async def query_llm_robust(messages, cache=True):
     """
-    Tries models in sequence. If all fail, raises an error.
+    Asks the first model that currently has budget. If none frees up in time, raises an error.
+    Identical prompts are answered from the response cache unless `cache=False`.
+    When the level is low on time, fast models go first and rate limits are only waited
+    out until the submission reserve.
     """
-    for model in AVAILABLE_MODELS:
-        try:
-            print(f"  ... Trying model: {model} ...")
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "400" in error_msg:
-                print(f"  [WARN] Model {model} failed (Rate Limit or Deprecated). Switching...")
-                continue # Try next model
-            else:
-                # If it's a real code error, raise it
-                raise e
-    
-    raise Exception("CRITICAL: All available models are rate-limited or failed.")
+    budget = current_budget()
+    hurry = budget is not None and budget.low
+    if hurry:
+        metrics.inc("deadline_fast_model_total", help="LLM calls routed to fast models near a deadline.")
+    return await router.complete(
+        messages,
+        cache=cache,
+        prefer=FAST_MODELS if hurry else (),
+        max_wait=None if budget is None else min(router.max_wait, max(budget.remaining() - SUBMIT_RESERVE_SECONDS, 0)),
+        timeout=tool_timeout(LLM_TIMEOUT),
+        response_format={"type": "json_object"},
+        temperature=0.1
+    )
 
 # --- MAIN AGENT LOOP ---
-def solve_quiz(start_url, email, secret):
+async def solve_quiz(start_url, email, secret, job_id=None, started_at=None, worker_id=None):
+    """
+    Solves levels from `start_url` on. With a job_id, each solved level and submission is checkpointed;
+    with a worker_id too, the run stops (JobLost) once the job has been requeued away from that worker.
+    The quiz budget runs from `started_at` (when the quiz was posted), or from now; each level's from when it begins.
+    """
+    trace = start_trace(start_url, trace_id=job_id)
+    budget = start_budget(started_at)
+    session = f"quiz-{uuid.uuid4().hex[:8]}" if PYTHON_SESSIONS else None
+    try:
+        await _solve_levels(start_url, email, secret, session, job_id, worker_id, budget)
+    finally:
+        end_trace(trace)
+        if session:
+            await get_tool("end_python_session")(session)
+
+async def _solve_levels(start_url, email, secret, session, job_id, worker_id, budget):
     current_url = start_url
+    intro = "Start solving. Current URL"
+    while current_url:
+        if budget.quiz_remaining() <= 0:
+            print(" [Deadline] Quiz time budget used up. STOP.")
+            return
+        # The level clock starts when this worker begins the level, not when the job was queued.
+        budget.start_level()
+        prefetch = Prefetcher()
+        try:
+            with span("agent.level", url=current_url, budget_s=round(budget.remaining(), 1)):
+                next_url = await _solve_level(current_url, intro, email, secret, session, job_id, prefetch, worker_id)
+        finally:
+            prefetch.cancel()
+        if job_id and next_url:
+            await asyncio.to_thread(job_store.advance, job_id, next_url, worker_id)
+        current_url = next_url
+        intro = "New Level"
+
+async def _record_submission(job_id, worker_id, level_url, answer, response, method):
+    if job_id:  # in a thread: a locked job store must not stall the event loop
+        await asyncio.to_thread(job_store.record_submission, job_id, level_url, answer, str(response), method,
+                                worker_id)
+
+def _prepare_submission(params, current_url, email, secret):
+    """Fills in credentials and fixes known quiz_url mistakes in submit_answer parameters."""
+    # Ensure credentials are present
+    params["email"] = params.get("email", email)
+    params["secret"] = params.get("secret", secret)
+
+    # --- FIX 1: AUTO-CORRECT URL (For Level 2) ---
+    # The 8B model wrongly sends ".../demo-scrape-data". We must fix it to ".../demo-scrape".
+    raw_url = params.get("quiz_url", current_url)
+    if "scrape-data" in raw_url:
+        print(" [Auto-Fix] Correcting URL: removing '-data' suffix from quiz_url.")
+        raw_url = raw_url.replace("scrape-data", "scrape")
+    params["quiz_url"] = raw_url
+
+async def _finish_before_deadline(current_url, memory, email, secret, job_id, worker_id, last_response):
+    """
+    The level is out of time. If nothing was submitted yet, a fast model gets one call to
+    name its best answer so far, which is submitted. Then follow the URL the grader sent
+    (it gives the next level even for a wrong answer), or stop.
+    """
+    print(" [Deadline] Level time nearly up. Submitting the best answer so far.")
+    with span("agent.deadline", submitted=last_response is not None):
+        if last_response is None:
+            metrics.inc("deadline_submissions_total", help="Answers submitted because a level ran out of time.")
+            memory.add("user", "TIME IS UP. Reply now with submit_answer and your best answer so far. No other tool.")
+            try:
+                command = json.loads(await query_llm_robust(memory.messages(), cache=False))
+            except Exception as e:
+                print(f" [Deadline] No final answer: {e}")
+                return None
+            if command.get("tool_name") != "submit_answer":
+                return None
+            params = command.get("parameters") or {}
+            _prepare_submission(params, current_url, email, secret)
+            last_response = await get_tool("submit_answer")(**params)
+            await _record_submission(job_id, worker_id, current_url, params.get("answer"), last_response, "deadline")
+    try:
+        data = json.loads(last_response)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    next_url = data.get("url")
+    if data.get("correct") is True and not next_url:
+        print("\n SUCCESS: Quiz Completed Successfully! Exiting...")
+    return next_url if next_url and next_url != current_url else None
+
+def _truncate_page(raw_data):
+    """Truncates scraped page text to save tokens."""
+    try:
+        raw_data = json.loads(raw_data)
+    except (TypeError, ValueError):
+        pass
+    if isinstance(raw_data, dict):
+        text_content = raw_data.get("text", "")
+        if len(text_content) > 2000:
+            raw_data["text"] = text_content[:2000] + "... [TRUNCATED]"
+        return json.dumps(raw_data)
+    result = str(raw_data)
+    if len(result) > 2000:
+        result = result[:2000] + "... [TRUNCATED]"
+    return result
+
+async def _run_tool(tool_name, params, session, prefetch):
+    """Runs one read-only tool and returns its output for the LLM."""
+    if tool_name == "navigate":
+        target_url = params.get("url")
+        if "tds-lll-analysis" in target_url:
+            target_url = target_url.replace("tds-lll-analysis", "tds-llm-analysis")
+        page = await get_tool("navigate")(target_url)
+        prefetch.start(page)  # fetch the page's assets while the LLM reads it
+        return _truncate_page(page)
+
+    if tool_name == "transcribe_audio":
+        audio_url = params.get("audio_url")
+        result = await prefetch.result("transcribe_audio", audio_url)
+        if result is None or not result.startswith("TRANSCRIPTION"):  # not prefetched, or it failed
+            result = await get_tool("transcribe_audio")(audio_url)
+        return result
+
+    if tool_name == "python_repl":
+        return await get_tool("python_repl")(params.get("code"), session=session)
+
+    if tool_name == "analyze_image":
+        # Default question if the agent didn't provide one
+        q = params.get("question", "Extract any secret code or numbers from this image.")
+        return await get_tool("analyze_image")(params.get("image_url"), q)
+
+    return "Error: Unknown tool name."
+
+def _split_batch(calls):
+    """
+    The calls that may run together (read-only tools, at most MAX_BATCH_CALLS of them),
+    and a note for the LLM naming each call that did not run and why.
+    """
+    batch, skipped = [], []
+    for call in calls:
+        name = call.get("tool_name") if isinstance(call, dict) else None
+        if name in ("submit_answer", "done"):
+            why = f"{name} only runs alone, once you have these results"
+        elif name not in BATCHABLE_TOOLS:
+            why = "not a tool that can run in a batch" if name else "not a tool call"
+        elif len(batch) >= MAX_BATCH_CALLS:
+            why = f"over the limit of {MAX_BATCH_CALLS} calls per batch; call it again"
+        else:
+            batch.append(call)
+            continue
+        params = json.dumps(call.get("parameters") or {})[:100] if isinstance(call, dict) else repr(call)[:100]
+        skipped.append(f"- {name or '?'} {params}: {why}")
+    return batch, "\nNot run:\n" + "\n".join(skipped) if skipped else ""
+
+async def _run_batch(calls, session, prefetch):
+    """Runs independent tool calls concurrently (bounded) and joins their outputs in call order."""
+    limit = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+    async def run(call):
+        async with limit:
+            try:
+                return await _run_tool(call.get("tool_name"), call.get("parameters") or {}, session, prefetch)
+            except Exception as e:
+                return f"Error: {e}"
+
+    with span("agent.batch", calls=len(calls)):
+        results = await asyncio.gather(*(run(c) for c in calls))
+    return "\n".join(f"[{i}] {c.get('tool_name')}: {r}" for i, (c, r) in enumerate(zip(calls, results), 1))
+
+async def _solve_level(current_url, intro, email, secret, session, job_id=None, prefetch=None, worker_id=None):
+    """Solves one level. Returns the next level's URL, or None when the quiz is over."""
+    started = time.time()
+    session_hint = ". Python variables persist between python_repl calls." if session else ""
     
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages.append({
-        "role": "user", 
-        "content": f"Start solving. Current URL: {current_url}. Email: {email}. Secret: {secret}"
-    })
+    # --- FAST PATH: known level types are answered without the LLM ---
+    page = await get_tool("navigate")(current_url)
+    with span("agent.fast_path") as s:
+        outcome = await rule_engine.solve(current_url, page, email, secret)
+        s.set(rule=outcome["rule"] if outcome else None)
+    last_response = None  # the grader's reply to this level's latest submission
+    if outcome:
+        await _record_submission(job_id, worker_id, current_url, outcome["answer"], outcome["response"],
+                                 outcome["rule"])
+        last_response = outcome["response"]
+    if outcome and outcome["correct"]:
+        rule_engine.record_level(current_url, time.time() - started, outcome["rule"])
+        if outcome["next_url"] is None:
+            print("\n SUCCESS: Quiz Completed Successfully! Exiting...")
+        return outcome["next_url"]
+
+    # Fall back to the LLM, which starts with the page already scraped.
+    # The system prompt only carries the hints for this kind of level.
+    # History is kept within CONTEXT_TOKEN_BUDGET; old tool outputs get compacted.
+    memory = ConversationMemory(
+        system_prompt(current_url, page),
+        f"{intro}: {current_url}. Email: {email}. Secret: {secret}{session_hint}"
+    )
+    prefetch = prefetch or Prefetcher()
+    prefetch.start(page)
+    memory.add("assistant", json.dumps({"thought": "Read the page.", "tool_name": "navigate",
+                                        "parameters": {"url": current_url}}))
+    memory.add("user", f"Tool Output: {_truncate_page(page)}")
+    if outcome:
+        memory.add("assistant", json.dumps({"thought": f"Known rule {outcome['rule']}.",
+                                            "tool_name": "submit_answer",
+                                            "parameters": {"answer": outcome["answer"]}}))
+        memory.add("user", f"Tool Output: {outcome['response']}")
 
     loop_count = 0
+    errors_in_row = 0
+    budget = current_budget()
 
     while True:
         print(f"\n--- Agent Thinking (Step {loop_count}) ---")
@@ -126,113 +286,90 @@ def solve_quiz(start_url, email, secret):
 
         if loop_count > 35:  # Higher limit first
             print("Max loops reached. STOP.")
-            break
+            return None
+
+        if budget and budget.expiring:
+            return await _finish_before_deadline(current_url, memory, email, secret, job_id, worker_id, last_response)
 
         
-        try:
-            # CALL THE ROBUST FUNCTION
-            ai_content = query_llm_robust(messages)
-            
-            messages.append({"role": "assistant", "content": ai_content})
-            
-            # Parse Decision
+        with span("agent.step", step=loop_count, level=current_url):
             try:
-                command = json.loads(ai_content)
-                tool_name = command.get("tool_name")
-                params = command.get("parameters", {})
-                print(f"Plan: {command.get('thought')}")
-                print(f"Call: {tool_name}")
-            except json.JSONDecodeError:
-                print("Invalid JSON from AI. Retrying...")
-                messages.append({"role": "user", "content": "Error: Output valid JSON only."})
-                continue
-
-            # Execute Tools
-            result = ""
-            if tool_name == "navigate":
-                target_url = params.get("url")
-                if "tds-lll-analysis" in target_url:
-                    target_url = target_url.replace("tds-lll-analysis", "tds-llm-analysis")
-                
-                # Execute tool
-                raw_data = navigate(target_url)
-                
-                # TRUNCATION to save tokens
-                if isinstance(raw_data, dict):
-                    text_content = raw_data.get("text", "")
-                    if len(text_content) > 2000:
-                        raw_data["text"] = text_content[:2000] + "... [TRUNCATED]"
-                    result = json.dumps(raw_data)
-                else:
-                    result = str(raw_data)
-                    if len(result) > 2000:
-                        result = result[:2000] + "... [TRUNCATED]"
+                # CALL THE ROBUST FUNCTION
+                ai_content = await query_llm_robust(memory.messages())
+                errors_in_row = 0
             
-            elif tool_name == "transcribe_audio":
-                result = transcribe_audio(params.get("audio_url"))
+                memory.add("assistant", ai_content)
             
-            elif tool_name == "python_repl":
-                result = python_repl(params.get("code"))
-
-            elif tool_name == "analyze_image":
-                # Default question if the agent didn't provide one
-                q = params.get("question", "Extract any secret code or numbers from this image.")
-                result = analyze_image(params.get("image_url"), q)
-
-            elif tool_name == "submit_answer":
-                # Ensure credentials are present
-                params["email"] = params.get("email", email)
-                params["secret"] = params.get("secret", secret)
-                
-                # --- FIX 1: AUTO-CORRECT URL (For Level 2) ---
-                # The 8B model wrongly sends ".../demo-scrape-data". We must fix it to ".../demo-scrape".
-                raw_url = params.get("quiz_url", current_url)
-                
-                if "scrape-data" in raw_url:
-                    print(" [Auto-Fix] Correcting URL: removing '-data' suffix from quiz_url.")
-                    raw_url = raw_url.replace("scrape-data", "scrape")
-                
-                params["quiz_url"] = raw_url
-                # ---------------------------------------------
+                # Parse Decision
+                try:
+                    command = json.loads(ai_content)
+                    tool_name = command.get("tool_name")
+                    params = command.get("parameters", {})
+                    calls = command.get("tool_calls")
+                    print(f"Plan: {command.get('thought')}")
+                    print(f"Call: {tool_name or [c.get('tool_name') for c in calls or []]}")
+                except json.JSONDecodeError:
+                    print("Invalid JSON from AI. Retrying...")
+                    memory.add("user", "Error: Output valid JSON only.")
+                    continue
 
-                # Execute the tool
-                result = submit_answer(**params)
+                # Execute Tools
+                result = ""
+                if isinstance(calls, list) and calls:
+                    batch, skipped = _split_batch(calls)
+                    result = await _run_batch(batch, session, prefetch) + skipped
+                    memory.add("user", f"Tool Outputs:\n{result}")
+                    print(f"Result: {result[:100]}...")
+                    continue
 
-                # --- FIX 2: AUTO-TERMINATE (For Level 3) ---
-                # Check if the server says we are done ("correct": true, "url": null)
-                try:
-                    data = json.loads(result)
-                    if data.get("correct") is True and data.get("url") is None:
-                        print("\n SUCCESS: Quiz Completed Successfully! Exiting...")
-                        break  # <--- THIS STOPS THE SCRIPT
-                except:
-                    pass
-                # -------------------------------------------
+                if tool_name in BATCHABLE_TOOLS:
+                    result = await _run_tool(tool_name, params, session, prefetch)
+
+                elif tool_name == "submit_answer":
+                    _prepare_submission(params, current_url, email, secret)
+
+                    # Execute the tool
+                    result = await get_tool("submit_answer")(**params)
+                    await _record_submission(job_id, worker_id, current_url, params.get("answer"), result, "llm")
+                    last_response = result
+
+                    # --- FIX 2: AUTO-TERMINATE (For Level 3) ---
+                    # Check if the server says we are done ("correct": true, "url": null)
+                    try:
+                        data = json.loads(result)
+                        if data.get("correct") is True and data.get("url") is None:
+                            print("\n SUCCESS: Quiz Completed Successfully! Exiting...")
+                            rule_engine.record_level(current_url, time.time() - started, "llm")
+                            return None  # <--- THIS STOPS THE SCRIPT
+                    except:
+                        pass
+                    # -------------------------------------------
                 
-            elif tool_name == "done":
-                next_url = params.get("next_url")
-                if next_url and next_url != "null" and next_url != current_url:
-                    print(f"Level Complete. Moving to: {next_url}")
-                    current_url = next_url
-                    messages = [
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": f"New Level: {current_url}. Email: {email}. Secret: {secret}"}
-                    ]
-                    loop_count = 0
-                    continue
+                elif tool_name == "done":
+                    next_url = params.get("next_url")
+                    rule_engine.record_level(current_url, time.time() - started, "llm")
+                    if next_url and next_url != "null" and next_url != current_url:
+                        print(f"Level Complete. Moving to: {next_url}")
+                        return next_url
+                    else:
+                        print("Quiz Finished!")
+                        return None
                 else:
-                    print("Quiz Finished!")
-                    break
-            else:
-                result = "Error: Unknown tool name."
+                    result = "Error: Unknown tool name."
 
-            print(f"Result: {str(result)[:100]}...")
-            messages.append({"role": "user", "content": f"Tool Output: {result}"})
+                print(f"Result: {str(result)[:100]}...")
+                memory.add("user", f"Tool Output: {result}")
     
-        except Exception as e:
-            error_str = str(e)
-            print(f"Tool Execution Error: {error_str}")
-            # If even the fallback failed, we really must stop
-            if "CRITICAL" in error_str:
-                break
-            time.sleep(2)
\ No newline at end of file
+            except JobLost:
+                raise  # another worker has the job now; stop, do not retry
+            except Exception as e:
+                error_str = str(e)
+                print(f"Tool Execution Error: {error_str}")
+                # If even the fallback failed, we really must stop
+                if "CRITICAL" in error_str:
+                    return None
+                errors_in_row += 1
+                delay = min(ERROR_BACKOFF_SECONDS * 2 ** (errors_in_row - 1), MAX_ERROR_BACKOFF_SECONDS)
+                if budget:
+                    delay = min(delay, max(budget.remaining() - SUBMIT_RESERVE_SECONDS, 0))
+                await asyncio.sleep(delay)
\ No newline at end of file
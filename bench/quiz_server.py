@@ -0,0 +1,174 @@
+"""
+Local stand-in for the quiz server (tds-llm-analysis), serving one demo level of
+each kind (scrape, CSV + audio, image, uv, heatmap) and a /submit endpoint.
+
+Level URLs carry `?email=` so concurrent runs are tracked separately; /runs
+reports per-email progress and timings for the benchmark.
+"""
+import io
+import time
+import random
+from urllib.parse import urlparse
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+from PIL import Image, ImageDraw
+
+app = FastAPI()
+
+SECRET_CODE = "4821"
+IMAGE_CODE = "7312"
+CUTOFF = 500
+_rng = random.Random(42)
+CSV_VALUES = [_rng.randint(0, 1000) for _ in range(2000)]
+CSV_ANSWER = sum(v for v in CSV_VALUES if v > CUTOFF)
+# Big enough to pass the "too small to be audio" check; content is irrelevant to the stub Whisper.
+AUDIO_BYTES = b"ID3" + bytes(4096)
+
+
+def screenshot_png(text, size=(1600, 1200)):
+    """A noisy screenshot-sized PNG with `text` on it, to exercise vision preprocessing."""
+    image = Image.effect_noise(size, 40).convert("RGB")
+    ImageDraw.Draw(image).text((size[0] // 2, size[1] // 2), text, fill=(0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+PNG_BYTES = screenshot_png(IMAGE_CODE)
+
+# Level order; each correct submission points at the next one.
+LEVELS = ["/demo", "/demo-scrape", "/demo-audio", "/demo-image", "/project2-uv", "/project2-heatmap"]
+
+runs = {}  # email -> {"started", "levels": {path: {...}}, "finished"}
+
+
+def base_url(request: Request) -> str:
+    return str(request.base_url).rstrip("/")
+
+
+def expected_answer(path, email, base):
+    uv_url = f"{base}/project2/uv.json?email={email}"
+    return {
+        "/demo": None,  # any answer is accepted
+        "/demo-scrape": SECRET_CODE,
+        "/demo-audio": CSV_ANSWER,
+        "/demo-image": IMAGE_CODE,
+        "/project2-uv": f'uv http get [{uv_url}]({uv_url}) -H "Accept: application/json"',
+        "/project2-heatmap": "#b45a1e",
+    }[path]
+
+
+def track_visit(path, email):
+    run = runs.setdefault(email, {"started": time.time(), "levels": {}, "finished": None})
+    level = run["levels"].setdefault(path, {"visited": time.time(), "attempts": 0, "solved": None})
+    return run, level
+
+
+def page(body: str) -> HTMLResponse:
+    return HTMLResponse(f"<html><body>{body}</body></html>")
+
+
+@app.get("/demo")
+def demo(request: Request, email: str = ""):
+    track_visit("/demo", email)
+    return page(f"""<p>Welcome to the demo quiz.</p>
+        <p>POST this JSON to {base_url(request)}/submit</p>
+        <pre>{{"email": "{email}", "secret": "...", "url": "{request.url}", "answer": "anything you want"}}</pre>""")
+
+
+@app.get("/demo-scrape")
+def demo_scrape(request: Request, email: str = ""):
+    track_visit("/demo-scrape", email)
+    return page(f"""<p>Scrape <a href="/demo-scrape-data?email={email}">this page</a> to get the secret.</p>
+        <p>Post your answer to {base_url(request)}/submit</p>""")
+
+
+@app.get("/demo-scrape-data")
+def demo_scrape_data(email: str = ""):
+    # Revealed by JavaScript, like the real page, so a plain text fetch does not see it.
+    return page(f"""<div id="q"></div>
+        <script>document.getElementById('q').innerText = 'Secret code is {SECRET_CODE} and not 9999.';</script>""")
+
+
+@app.get("/demo-audio")
+def demo_audio(request: Request, email: str = ""):
+    track_visit("/demo-audio", email)
+    return page(f"""<p>Download the <a href="/data.csv">CSV file</a>. Cutoff: {CUTOFF}</p>
+        <audio src="/instructions.mp3" controls></audio>
+        <p>Post your answer to {base_url(request)}/submit</p>""")
+
+
+@app.get("/demo-image")
+def demo_image(request: Request, email: str = ""):
+    track_visit("/demo-image", email)
+    return page(f"""<p>What is the number in <a href="/code.png">this image (png)</a>?</p>
+        <p>Post your answer to {base_url(request)}/submit</p>""")
+
+
+@app.get("/project2-uv")
+def project2_uv(request: Request, email: str = ""):
+    track_visit("/project2-uv", email)
+    return page(f"""<p>Write the uv command that GETs /project2/uv.json with an Accept: application/json header.</p>
+        <p>Post your answer to {base_url(request)}/submit</p>""")
+
+
+@app.get("/project2-heatmap")
+def project2_heatmap(request: Request, email: str = ""):
+    track_visit("/project2-heatmap", email)
+    return page(f"""<p>Which colour is the hottest cell in the <a href="/heatmap.png">heatmap (png)</a>?</p>
+        <p>Post your answer to {base_url(request)}/submit</p>""")
+
+
+@app.get("/data.csv")
+def data_csv():
+    return PlainTextResponse("\n".join(str(v) for v in CSV_VALUES) + "\n", media_type="text/csv")
+
+
+@app.get("/instructions.mp3")
+def instructions_audio():
+    return Response(AUDIO_BYTES, media_type="audio/mpeg")
+
+
+@app.get("/code.png")
+@app.get("/heatmap.png")
+def image():
+    return Response(PNG_BYTES, media_type="image/png")
+
+
+@app.post("/submit")
+async def submit(request: Request):
+    payload = await request.json()
+    email = payload.get("email", "")
+    path = urlparse(payload.get("url", "")).path
+    if path not in LEVELS:
+        return {"correct": False, "url": None, "reason": f"Unknown quiz url {path}"}
+
+    run, level = track_visit(path, email)
+    level["attempts"] += 1
+    expected = expected_answer(path, email, base_url(request))
+    correct = expected is None or str(payload.get("answer")).strip() == str(expected)
+    if not correct:
+        return {"correct": False, "url": None, "reason": "Wrong answer"}
+
+    if level["solved"] is None:
+        level["solved"] = time.time()
+    position = LEVELS.index(path)
+    if position + 1 == len(LEVELS):
+        run["finished"] = time.time()
+        return {"correct": True, "url": None}
+    return {"correct": True, "url": f"{base_url(request)}{LEVELS[position + 1]}?email={email}"}
+
+
+@app.get("/runs")
+def run_report():
+    return runs
+
+
+@app.post("/reset")
+def reset():
+    runs.clear()
+    return {"ok": True}
+
+
+def start_url(base: str, email: str) -> str:
+    return f"{base}{LEVELS[0]}?email={email}"
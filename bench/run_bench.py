@@ -0,0 +1,159 @@
+"""
+End-to-end benchmark: runs the quiz-server stand-in, the stub Groq backend and
+main.app in one process (each on its own local port), POSTs quizzes to /quiz and
+reports per-level latency percentiles, LLM calls per level, and how many
+browsers / Python workers were started. No network access is needed.
+
+    python bench/run_bench.py --quizzes 8 --concurrency 4 --llm-latency 0.3
+
+Exits non-zero if any quiz did not finish, so it can gate CI.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+
+import httpx
+import uvicorn
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))  # repo root, for `main`
+sys.path.insert(0, BENCH_DIR)
+
+import quiz_server
+import stub_llm
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(app, port):
+    """Starts a uvicorn server on a background thread and waits until it accepts requests."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return round(ordered[min(rank, len(ordered) - 1)], 3)
+
+
+def level_latencies(runs, posted):
+    """Seconds per level, measured from the previous level's solve (or the POST to /quiz)."""
+    latencies = {}
+    for email, run in runs.items():
+        previous = posted[email]
+        for path in quiz_server.LEVELS:
+            level = run["levels"].get(path)
+            if not level or not level["solved"]:
+                break
+            latencies.setdefault(path, []).append(level["solved"] - previous)
+            previous = level["solved"]
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=4, help="quiz runs to start")
+    parser.add_argument("--concurrency", type=int, default=4, help="MAX_CONCURRENT_QUIZZES for the service")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds added to every stub model call")
+    parser.add_argument("--recordings", default=stub_llm.RECORDINGS_PATH, help="recorded LLM replies")
+    parser.add_argument("--timeout", type=float, default=300, help="give up after this many seconds")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    quiz_port, llm_port, app_port = free_port(), free_port(), free_port()
+    quiz_base = f"http://127.0.0.1:{quiz_port}"
+    scratch = tempfile.mkdtemp(prefix="quiz_bench_")
+
+    # The service reads these at import time, so set them before importing main.
+    os.environ.update({
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{llm_port}",
+        "QUIZ_SECRET": "bench-secret",
+        "QUIZ_SUBMIT_URL": f"{quiz_base}/submit",
+        "MAX_CONCURRENT_QUIZZES": str(args.concurrency),
+        "DOWNLOAD_CACHE_DIR": os.path.join(scratch, "downloads"),
+        "RESULT_CACHE_PATH": os.path.join(scratch, "results.sqlite"),
+        "JOB_STORE_PATH": os.path.join(scratch, "jobs.sqlite"),
+        "BUDGET_STORE_PATH": os.path.join(scratch, "budgets.sqlite"),
+        "BROWSER_WARMUP": "0",  # launches are counted below; only count the ones quizzes need
+    })
+    stub_llm.load(args.recordings, quiz_base=quiz_base, latency=args.llm_latency)
+    import main as service
+    from tools import browser, execution
+
+    serve(quiz_server.app, quiz_port)
+    serve(stub_llm.app, llm_port)
+    app_server = serve(service.app, app_port)
+
+    emails = [f"bench{i}@example.com" for i in range(args.quizzes)]
+    started = time.time()
+    posted = {}
+    with httpx.Client(base_url=f"http://127.0.0.1:{app_port}", timeout=30) as client:
+        for email in emails:
+            posted[email] = time.time()
+            client.post("/quiz", json={"email": email, "secret": "bench-secret",
+                                       "url": quiz_server.start_url(quiz_base, email)}).raise_for_status()
+
+        # Done when every quiz finished, or the service has nothing left to run.
+        while time.time() - started < args.timeout:
+            time.sleep(0.5)
+            finished = sum(1 for e in emails if quiz_server.runs.get(e, {}).get("finished"))
+            busy = client.get("/").json()["scheduler"]
+            if finished == len(emails) or busy["running"] + busy["queued"] == 0:
+                break
+    wall = time.time() - started
+
+    runs = {e: quiz_server.runs[e] for e in emails if e in quiz_server.runs}
+    llm_calls = dict(stub_llm.calls)
+    latencies = level_latencies(runs, posted)
+    report = {
+        "quizzes": args.quizzes,
+        "completed": sum(1 for r in runs.values() if r["finished"]),
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 2),
+        "levels": {
+            path: {
+                "solved": len(latencies.get(path, [])),
+                "p50_s": percentile(latencies.get(path, []), 50),
+                "p90_s": percentile(latencies.get(path, []), 90),
+                "p99_s": percentile(latencies.get(path, []), 99),
+                "llm_calls_per_quiz": round(llm_calls.get(path, 0) / args.quizzes, 2),
+                "submissions_per_quiz": round(
+                    sum(r["levels"].get(path, {}).get("attempts", 0) for r in runs.values()) / args.quizzes, 2),
+            }
+            for path in quiz_server.LEVELS
+        },
+        "llm_calls": sum(llm_calls.values()),
+        "llm_calls_by_kind": llm_calls,
+        "browser_launches": browser.pool.launches,
+        "python_worker_starts": execution.ReplWorker.started,
+    }
+
+    app_server.should_exit = True
+    time.sleep(1)  # let the service run its shutdown hooks
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report["completed"] == args.quizzes else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Cold-start benchmark: how long `import main` takes, which imports dominate it, and
+how long a fresh server process needs until it accepts requests and until
+GET /ready reports it warm (Python pool, and Chromium with --browser-warmup).
+
+    python bench/startup_bench.py --runs 5
+
+Every run is a new interpreter, so nothing is shared between runs. No network
+access or Groq key is needed.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from run_bench import free_port
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def service_env(scratch, browser_warmup):
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": env.get("GROQ_API_KEY", "stub"),
+        "BROWSER_WARMUP": "1" if browser_warmup else "0",
+        "DOWNLOAD_CACHE_DIR": os.path.join(scratch, "downloads"),
+        "RESULT_CACHE_PATH": os.path.join(scratch, "results.sqlite"),
+        "JOB_STORE_PATH": os.path.join(scratch, "jobs.sqlite"),
+        "BUDGET_STORE_PATH": os.path.join(scratch, "budgets.sqlite"),
+    })
+    return env
+
+
+def import_profile(env):
+    """(seconds to import main, [(module, seconds)] of the heaviest direct imports)."""
+    started = time.time()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True)
+    wall = time.time() - started
+    heaviest = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        # One level below main (" " + two spaces of nesting): its direct imports, with everything beneath them.
+        if match and len(match.group(3)) == 3:
+            heaviest[match.group(4)] = int(match.group(2)) / 1e6
+    top = sorted(heaviest.items(), key=lambda item: -item[1])[:8]
+    return wall, [(name, round(seconds, 3)) for name, seconds in top]
+
+
+def boot(env, timeout):
+    """Seconds until a new `uvicorn main:app` accepts requests, and until /ready is 200."""
+    port = free_port()
+    started = time.time()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                             "--log-level", "warning"],
+                            cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    accepting = ready = None
+    report = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=2) as client:
+            while time.time() - started < timeout and ready is None:
+                try:
+                    if accepting is None:
+                        client.get("/").raise_for_status()
+                        accepting = time.time() - started
+                    response = client.get("/ready")
+                    report = response.json()
+                    if response.status_code == 200:
+                        ready = time.time() - started
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return accepting, ready, report
+
+
+def summary(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {"median_s": round(statistics.median(values), 3), "min_s": round(min(values), 3),
+            "max_s": round(max(values), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="cold starts to measure")
+    parser.add_argument("--browser-warmup", action="store_true", help="also wait for Chromium to launch")
+    parser.add_argument("--timeout", type=float, default=60, help="give up on /ready after this many seconds")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    env = service_env(tempfile.mkdtemp(prefix="quiz_startup_"), args.browser_warmup)
+    imports, accepting, ready = [], [], []
+    for _ in range(args.runs):
+        wall, heaviest = import_profile(env)
+        imports.append(wall)
+        up, warm, last_report = boot(env, args.timeout)
+        accepting.append(up)
+        ready.append(warm)
+
+    report = {
+        "runs": args.runs,
+        "import_main": summary(imports),
+        "heaviest_imports_s": dict(heaviest),
+        "accepting_requests": summary(accepting),
+        "ready": summary(ready),
+        "not_ready_runs": sum(1 for r in ready if r is None),
+        "last_ready_report": last_report,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
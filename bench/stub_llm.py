@@ -0,0 +1,96 @@
+"""
+Stub Groq backend that replays recorded responses, so the agent can run without
+network access or API quota. Point the service at it with GROQ_BASE_URL.
+
+Chat replies come from a recordings file (see recordings.json): for each level
+path, the list of assistant messages to return in order. Each (email, level)
+pair keeps its own cursor, so concurrent quiz runs replay independently.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+from collections import defaultdict
+from urllib.parse import urlparse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+RECORDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings.json")
+TASK_RE = re.compile(r"(?:Current URL|New Level): (\S+?)\. Email: (\S+?)\. Secret")
+
+app = FastAPI()
+app.state.recordings = {}
+app.state.quiz_base = ""
+app.state.latency = 0.0  # seconds added to every call to mimic model time
+
+cursors = defaultdict(int)   # (email, level path) -> next recorded reply
+calls = defaultdict(int)     # level path (or "vision"/"whisper") -> number of calls
+
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-remaining-requests": "10000",
+    "x-ratelimit-reset-requests": "1s",
+    "x-ratelimit-remaining-tokens": "1000000",
+    "x-ratelimit-reset-tokens": "1s",
+}
+
+
+def load(path=RECORDINGS_PATH, quiz_base="", latency=0.0):
+    with open(path) as f:
+        app.state.recordings = json.load(f)
+    app.state.quiz_base = quiz_base
+    app.state.latency = latency
+    cursors.clear()
+    calls.clear()
+
+
+def completion(model, content):
+    body = {
+        "id": f"stub-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+    return JSONResponse(body, headers=RATE_LIMIT_HEADERS)
+
+
+def replay(level, email):
+    script = app.state.recordings.get("levels", {}).get(level) or app.state.recordings["fallback"]
+    step = cursors[(email, level)]
+    cursors[(email, level)] += 1
+    reply = script[min(step, len(script) - 1)]
+    text = json.dumps(reply).replace("{base}", app.state.quiz_base).replace("{email}", email)
+    return text
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat(request: Request):
+    body = await request.json()
+    await asyncio.sleep(app.state.latency)
+    messages = body["messages"]
+
+    # Vision calls carry the image as a content list
+    if isinstance(messages[-1]["content"], list):
+        calls["vision"] += 1
+        return completion(body["model"], app.state.recordings["vision"])
+
+    task = next((m["content"] for m in messages if m["role"] == "user"), "")
+    match = TASK_RE.search(task)
+    level, email = (urlparse(match.group(1)).path, match.group(2)) if match else ("", "")
+    calls[level] += 1
+    return completion(body["model"], replay(level, email))
+
+
+@app.post("/openai/v1/audio/transcriptions")
+async def transcriptions():
+    await asyncio.sleep(app.state.latency)
+    calls["whisper"] += 1
+    return JSONResponse({"text": app.state.recordings["transcription"]}, headers=RATE_LIMIT_HEADERS)
+
+
+@app.get("/stats")
+def stats():
+    return dict(calls)
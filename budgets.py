@@ -0,0 +1,109 @@
+"""
+Rate-limit budgets shared by every process that calls the Groq API.
+
+Each ModelRouter keeps its own ModelState objects, but with several uvicorn
+workers (or extra `python worker.py` processes) those would each believe they own
+the whole quota and together multiply the 429s. This store keeps the budget
+fields of each model in one SQLite file: a process reserves a request (and its
+estimated tokens) before sending it, and publishes the x-ratelimit-* headers,
+cooldowns and retirements it observes, so the others see them immediately.
+"""
+import os
+import time
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+BUDGET_STORE_PATH = os.getenv("BUDGET_STORE_PATH", os.path.join(tempfile.gettempdir(), "quiz_budgets.sqlite"))
+# How long to wait for another process's write lock before going on with this process's own view.
+BUDGET_STORE_TIMEOUT_SECONDS = float(os.getenv("BUDGET_STORE_TIMEOUT_SECONDS", "2"))
+SHARED_FIELDS = ("retired", "cooldown_until", "failures_in_row", "requests_left", "tokens_left",
+                 "requests_reset_at", "tokens_reset_at")
+
+
+class BudgetStore:
+    def __init__(self, path=BUDGET_STORE_PATH, timeout=BUDGET_STORE_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+        with self._db() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS budgets (
+                model TEXT PRIMARY KEY, retired INTEGER, cooldown_until REAL, failures_in_row INTEGER,
+                requests_left INTEGER, tokens_left INTEGER, requests_reset_at REAL, tokens_reset_at REAL,
+                updated_at REAL)""")
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+
+    @contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.path, timeout=self.timeout)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:  # commit on success
+                yield db
+        finally:
+            db.close()
+
+    def reserve(self, state, now, needed_tokens) -> bool:
+        """
+        Loads the shared budget into `state` and, if the model can take the request,
+        takes one request and `needed_tokens` off it for everyone. Returns whether it did.
+        If the store stays locked, decides from this process's last known state instead.
+        """
+        try:
+            return self._reserve(state, now, needed_tokens)
+        except sqlite3.OperationalError as e:
+            print(f"  [Budgets] Shared store unavailable ({e}); using local state for {state.name}.")
+            if not state.available(now, needed_tokens):
+                return False
+            _take(state, now, needed_tokens)
+            return True
+
+    def _reserve(self, state, now, needed_tokens):
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT * FROM budgets WHERE model = ?", (state.name,)).fetchone()
+            if row:
+                for field in SHARED_FIELDS:
+                    setattr(state, field, row[field])
+                state.retired = bool(state.retired)
+            if not state.available(now, needed_tokens):
+                return False
+            _take(state, now, needed_tokens)
+            self._write(db, state, now)
+        return True
+
+    def publish(self, state):
+        """
+        Stores what a response (or error) just told us about the model. Cooldowns and
+        retirements set meanwhile by other processes are kept. If the store stays locked
+        the update is skipped; the next response publishes fresh headers anyway.
+        """
+        try:
+            self._publish(state)
+        except sqlite3.OperationalError as e:
+            print(f"  [Budgets] Could not publish {state.name} ({e}); keeping it local.")
+
+    def _publish(self, state):
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT retired, cooldown_until FROM budgets WHERE model = ?", (state.name,)).fetchone()
+            if row:
+                state.retired = state.retired or bool(row["retired"])
+                state.cooldown_until = max(state.cooldown_until, row["cooldown_until"] or 0.0)
+            self._write(db, state, time.time())
+
+    def _write(self, db, state, now):
+        db.execute(f"""INSERT OR REPLACE INTO budgets (model, {", ".join(SHARED_FIELDS)}, updated_at)
+                       VALUES ({", ".join("?" * (len(SHARED_FIELDS) + 2))})""",
+                   (state.name, *(getattr(state, f) for f in SHARED_FIELDS), now))
+
+
+def _take(state, now, needed_tokens):
+    """Takes one request and `needed_tokens` off the model's remaining quota."""
+    if state.requests_left is not None and now < state.requests_reset_at:
+        state.requests_left = max(state.requests_left - 1, 0)
+    if state.tokens_left is not None and now < state.tokens_reset_at:
+        state.tokens_left = max(state.tokens_left - needed_tokens, 0)
+
+
+store = BudgetStore()
@@ -0,0 +1,76 @@
+"""
+Wall-clock time budgets for quiz runs.
+
+A quiz has an overall budget (QUIZ_TIME_BUDGET_SECONDS) and each level its own
+(LEVEL_TIME_BUDGET_SECONDS, the grader's per-task limit); the level deadline is
+whichever comes first. The budget lives in a contextvar, like the current trace,
+so tools can cap their own timeouts with `tool_timeout()` without it being passed
+around. As a level runs low the agent switches to fast models, and before the
+deadline it submits the best answer it has instead of running out the clock.
+"""
+import os
+import time
+import contextvars
+
+QUIZ_TIME_BUDGET_SECONDS = float(os.getenv("QUIZ_TIME_BUDGET_SECONDS", "1800"))
+LEVEL_TIME_BUDGET_SECONDS = float(os.getenv("LEVEL_TIME_BUDGET_SECONDS", "180"))
+# Below this much time left in a level, prefer fast models.
+LOW_TIME_SECONDS = float(os.getenv("LOW_TIME_SECONDS", "60"))
+# Time kept back for the final submission; tools may not eat into it.
+SUBMIT_RESERVE_SECONDS = float(os.getenv("SUBMIT_RESERVE_SECONDS", "20"))
+# No tool timeout is cut below this, so a call always gets a real chance.
+MIN_TOOL_TIMEOUT = 3.0
+
+_current_budget = contextvars.ContextVar("current_budget", default=None)
+
+
+class Budget:
+    """Deadlines for one quiz run and its current level."""
+
+    def __init__(self, started_at=None, quiz_seconds=QUIZ_TIME_BUDGET_SECONDS, level_seconds=LEVEL_TIME_BUDGET_SECONDS):
+        self.started_at = started_at or time.time()
+        self.quiz_deadline = self.started_at + quiz_seconds
+        self.level_seconds = level_seconds
+        self.level_deadline = min(self.quiz_deadline, self.started_at + level_seconds)
+
+    def start_level(self, started_at=None):
+        self.level_deadline = min(self.quiz_deadline, (started_at or time.time()) + self.level_seconds)
+
+    def remaining(self) -> float:
+        """Seconds left before the current level's deadline."""
+        return self.level_deadline - time.time()
+
+    def quiz_remaining(self) -> float:
+        """Seconds left before the whole quiz's deadline."""
+        return self.quiz_deadline - time.time()
+
+    @property
+    def low(self) -> bool:
+        return self.remaining() < LOW_TIME_SECONDS
+
+    @property
+    def expiring(self) -> bool:
+        """Only the submission reserve is left: time to submit what we have."""
+        return self.remaining() < SUBMIT_RESERVE_SECONDS
+
+
+def start_budget(started_at=None):
+    """Starts the time budget for a quiz run in the current task (and the tasks it spawns)."""
+    budget = Budget(started_at)
+    _current_budget.set(budget)
+    return budget
+
+
+def current_budget():
+    return _current_budget.get()
+
+
+def tool_timeout(default, reserve=SUBMIT_RESERVE_SECONDS) -> float:
+    """
+    `default` seconds, cut down so the call ends `reserve` seconds before the level
+    deadline (never below MIN_TOOL_TIMEOUT). Outside a quiz run it is just `default`.
+    """
+    budget = _current_budget.get()
+    if budget is None:
+        return default
+    return max(MIN_TOOL_TIMEOUT, min(default, budget.remaining() - reserve))
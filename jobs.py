@@ -0,0 +1,272 @@
+"""
+Persistent quiz job store, so a restart does not lose runs in flight.
+
+Each POST /quiz becomes a job row holding the URL of the level being worked on;
+it is checkpointed every time a level is solved, and every submission (answer and
+server response) is logged against it.
+
+The jobs table is also the work queue shared by every process using the same file
+(uvicorn workers, `python worker.py` instances): a worker claims the oldest queued
+job in a write transaction and heartbeats while it runs. Jobs held by a worker
+whose heartbeat has gone stale (crash, kill -9) are put back on the queue and
+resume from their last unsolved level. A run's own writes (checkpoints, submissions,
+final status) carry its worker id and raise JobLost once the job has been requeued
+away from that worker, so a stalled worker stops instead of solving it a second time.
+
+SQLite WAL needs a local filesystem: every process sharing the store must run on
+the same host (several uvicorn workers, or `python worker.py` next to the API).
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "quiz_jobs.sqlite"))
+# A repeat POST of a completed (email, url) within this window gets the finished job back.
+DEDUPE_TTL_SECONDS = int(os.getenv("QUIZ_DEDUPE_TTL_SECONDS", "600"))
+
+# queued -> running -> completed | failed   (interrupted runs go back to queued)
+ACTIVE = ("queued", "running")
+# A worker that has not heartbeated for this long is presumed dead and its jobs requeued.
+WORKER_TIMEOUT_SECONDS = int(os.getenv("WORKER_TIMEOUT_SECONDS", "30"))
+
+
+class JobLost(Exception):
+    """Raised when a worker writes to a job it no longer holds (requeued, or claimed by another worker)."""
+    def __init__(self, job_id):
+        super().__init__(f"Job {job_id} is no longer held by this worker")
+
+
+class QueueFullError(Exception):
+    """Raised when a quiz would join a queue already holding `max_queued` jobs; nothing is written."""
+
+
+class JobStore:
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        with self._db() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, email TEXT, secret TEXT, start_url TEXT, current_url TEXT,
+                status TEXT, levels_solved INTEGER, error TEXT, created_at REAL, updated_at REAL)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS submissions (
+                job_id TEXT, level_url TEXT, answer TEXT, response TEXT, correct INTEGER,
+                method TEXT, submitted_at REAL)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS workers (
+                id TEXT PRIMARY KEY, host TEXT, pid INTEGER, slots INTEGER, running INTEGER,
+                started_at REAL, heartbeat_at REAL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS submissions_job ON submissions (job_id)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_request ON jobs (email, start_url)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+            columns = {r["name"] for r in db.execute("PRAGMA table_info(jobs)")}
+            if "worker_id" not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN worker_id TEXT")  # stores from before the shared queue
+            if "resumed_at" not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN resumed_at REAL")  # stores from before explicit resumes
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")  # readers do not block the writer across processes
+
+    @contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:  # commit on success
+                yield db
+        finally:
+            db.close()
+
+    def create_or_attach(self, url, email, secret, ttl_seconds=DEDUPE_TTL_SECONDS, max_queued=None):
+        """
+        Coalesces repeat requests for the same (email, url): returns (job_id, False) for
+        the job already queued/running or completed within `ttl_seconds`, otherwise creates
+        a new job and returns (job_id, True). Check and insert share one write transaction,
+        as does the queue limit: with `max_queued` jobs waiting, QueueFullError and no insert.
+        """
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("""SELECT id FROM jobs WHERE email = ? AND start_url = ?
+                                AND (status IN (?, ?) OR (status = 'completed' AND updated_at > ?))
+                                ORDER BY created_at DESC LIMIT 1""",
+                             (email, url, *ACTIVE, time.time() - ttl_seconds)).fetchone()
+            if row:
+                return row["id"], False
+            _check_capacity(db, max_queued)
+            job_id = uuid.uuid4().hex[:12]
+            now = time.time()
+            db.execute("""INSERT INTO jobs (id, email, secret, start_url, current_url, status,
+                          levels_solved, error, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'queued', 0, NULL, ?, ?)""",
+                       (job_id, email, secret, url, url, now, now))
+        return job_id, True
+
+    def get(self, job_id):
+        with self._db() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def set_status(self, job_id, status, error=None, worker_id=None):
+        """With `worker_id`, only while that worker still holds the job (else JobLost)."""
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            _check_owner(db, job_id, worker_id)
+            db.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                       (status, error, time.time(), job_id))
+
+    def resume(self, job_id, max_queued=None):
+        """
+        Requeues a failed job with a fresh quiz clock (see claim); returns False if it
+        is not failed (anymore). The run restarts from its last unsolved level.
+        Raises QueueFullError, leaving the job failed, when `max_queued` jobs are waiting.
+        """
+        now = time.time()
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            _check_capacity(db, max_queued)
+            cursor = db.execute("""UPDATE jobs SET status = 'queued', error = NULL, resumed_at = ?, updated_at = ?
+                                   WHERE id = ? AND status = 'failed'""", (now, now, job_id))
+        return cursor.rowcount == 1
+
+    def advance(self, job_id, next_url, worker_id=None):
+        """Checkpoints a solved level; a resumed run starts at `next_url`."""
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            _check_owner(db, job_id, worker_id)
+            db.execute("""UPDATE jobs SET current_url = ?, levels_solved = levels_solved + 1,
+                          updated_at = ? WHERE id = ?""", (next_url, time.time(), job_id))
+
+    def record_submission(self, job_id, level_url, answer, response, method, worker_id=None):
+        """
+        Logs one answer and the server's reply. `response` is the raw submit_answer output.
+        The answer was sent either way, so it is logged even when `worker_id` no longer
+        holds the job; JobLost is raised afterwards.
+        """
+        try:
+            correct = json.loads(response).get("correct") is True
+        except (ValueError, AttributeError):
+            correct = False
+        with self._db() as db:
+            db.execute("INSERT INTO submissions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (job_id, level_url, json.dumps(answer), response, int(correct), method, time.time()))
+        if worker_id is not None:
+            with self._db() as db:  # after the insert has committed
+                _check_owner(db, job_id, worker_id)
+        return correct
+
+    def finish(self, job_id, worker_id=None):
+        """
+        Marks the job completed if the grader accepted its last submission and sent no
+        next URL (the quiz is over), failed otherwise - e.g. a run that solved one level
+        and stopped on the next, which can then be resumed from there.
+        """
+        with self._db() as db:
+            row = db.execute("""SELECT correct, response FROM submissions WHERE job_id = ?
+                                ORDER BY submitted_at DESC, rowid DESC LIMIT 1""",
+                             (job_id,)).fetchone()
+        if row and row["correct"] and _next_url(row["response"]) is None:
+            self.set_status(job_id, "completed", worker_id=worker_id)
+        elif row and row["correct"]:
+            self.set_status(job_id, "failed", "Stopped before the last level.", worker_id=worker_id)
+        else:
+            self.set_status(job_id, "failed", "Stopped without a correct final answer.", worker_id=worker_id)
+
+    # --- SHARED QUEUE ---
+    def claim(self, worker_id):
+        """Takes the longest-waiting queued job for `worker_id` and marks it running, or returns None."""
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY updated_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', worker_id = ?, error = NULL, updated_at = ? WHERE id = ?",
+                       (worker_id, time.time(), row["id"]))
+        # The quiz clock runs from the POST, or from the last explicit resume; requeues keep it.
+        return dict(row, status="running", worker_id=worker_id,
+                    quiz_started_at=row["resumed_at"] or row["created_at"])
+
+    def queued(self):
+        with self._db() as db:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def position(self, job_id):
+        """How many queued jobs will be claimed before this one."""
+        with self._db() as db:
+            return db.execute("""SELECT COUNT(*) FROM jobs WHERE status = 'queued'
+                                 AND updated_at < (SELECT updated_at FROM jobs WHERE id = ?)""",
+                              (job_id,)).fetchone()[0]
+
+    def heartbeat(self, worker_id, slots, running):
+        """Called by the worker process itself, so host and pid are this process's."""
+        now = time.time()
+        with self._db() as db:
+            db.execute("""INSERT INTO workers VALUES (?, ?, ?, ?, ?, ?, ?)
+                          ON CONFLICT(id) DO UPDATE SET slots = excluded.slots, running = excluded.running,
+                          heartbeat_at = excluded.heartbeat_at""",
+                       (worker_id, socket.gethostname(), os.getpid(), slots, running, now, now))
+
+    def requeue_orphans(self, timeout=WORKER_TIMEOUT_SECONDS):
+        """Puts running jobs whose worker stopped heartbeating back on the queue; returns their ids."""
+        cutoff = time.time() - timeout
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute("""SELECT id FROM jobs WHERE status = 'running' AND (worker_id IS NULL OR worker_id NOT IN
+                                 (SELECT id FROM workers WHERE heartbeat_at > ?))""", (cutoff,)).fetchall()
+            db.execute("UPDATE jobs SET status = 'queued', worker_id = NULL WHERE id IN (%s)"
+                       % ",".join("?" * len(rows)), [r["id"] for r in rows])
+            db.execute("DELETE FROM workers WHERE heartbeat_at <= ?", (cutoff,))
+        return [r["id"] for r in rows]
+
+    def release(self, worker_id):
+        """Clean shutdown: the worker's running jobs go straight back on the queue."""
+        with self._db() as db:
+            db.execute("UPDATE jobs SET status = 'queued', worker_id = NULL WHERE status = 'running' AND worker_id = ?",
+                       (worker_id,))
+            db.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def workers(self, timeout=WORKER_TIMEOUT_SECONDS):
+        """Workers with a recent heartbeat."""
+        with self._db() as db:
+            rows = db.execute("SELECT * FROM workers WHERE heartbeat_at > ? ORDER BY started_at",
+                              (time.time() - timeout,)).fetchall()
+        return [dict(r, heartbeat_age_s=round(time.time() - r["heartbeat_at"], 1)) for r in rows]
+
+    def report(self, job_id):
+        """Status plus every submission, without the secret."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.pop("secret")
+        with self._db() as db:
+            rows = db.execute("""SELECT level_url, answer, response, correct, method, submitted_at
+                                 FROM submissions WHERE job_id = ? ORDER BY submitted_at""", (job_id,)).fetchall()
+        job["submissions"] = [dict(r, answer=json.loads(r["answer"]), correct=bool(r["correct"])) for r in rows]
+        return job
+
+
+def _check_capacity(db, max_queued):
+    if max_queued is None:
+        return
+    if db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0] >= max_queued:
+        raise QueueFullError(f"Quiz queue is full ({max_queued} waiting).")
+
+
+def _check_owner(db, job_id, worker_id):
+    """Raises JobLost unless `worker_id` (if given) still runs the job."""
+    if worker_id is None:
+        return
+    row = db.execute("SELECT status, worker_id FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None or row["status"] != "running" or row["worker_id"] != worker_id:
+        raise JobLost(job_id)
+
+
+def _next_url(response):
+    """The next level's URL from a stored grader reply, or None when the grader sent none."""
+    try:
+        return json.loads(response).get("url") or None
+    except (ValueError, AttributeError):
+        return None
+
+
+store = JobStore()
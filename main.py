@@ -1,13 +1,21 @@
-import uvicorn
 import os
 import asyncio
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
 from dotenv import load_dotenv
-from agent import solve_quiz
 
-load_dotenv()
+load_dotenv()  # before the project imports: modules read their settings from the environment
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+from scheduler import scheduler, QueueFullError
+from agent import router
+from rules import engine as rule_engine
+from tracing import metrics, traces
+from jobs import store as job_store
+from tools import execution, loaded
+import readiness
 
 app = FastAPI()
 
@@ -28,27 +36,131 @@ class QuizRequest(BaseModel):
     secret: str
     url: str
 
-async def run_agent_task(url: str, email: str, secret: str):
-    """Runs the agent in the background."""
-    print(f"Background: Starting agent for {url}")
-    await asyncio.to_thread(solve_quiz, url, email, secret)
+@app.on_event("startup")
+async def start_scheduler():
+    """Starts the quiz workers; the pools warm up in the background (see GET /ready)."""
+    scheduler.start()
+    app.state.warm_up = asyncio.create_task(readiness.warm_up())
 
 @app.post("/quiz")
-async def quiz_endpoint(request: QuizRequest, background_tasks: BackgroundTasks):
+async def quiz_endpoint(request: QuizRequest):
     print(f"Received Request: {request}")
     
     # 1. Security Check
     if request.secret != MY_SECRET_KEY:
         raise HTTPException(status_code=403, detail="Invalid secret provided.")
     
-    # 2. Start Agent
-    background_tasks.add_task(run_agent_task, request.url, request.email, request.secret)
-    
-    return {"message": "Quiz task accepted. Agent started.", "status": "processing"}
+    # 2. Coalesce grader retries onto the run already in flight (or just finished)
+    # (a full queue refuses the quiz before anything is written)
+    try:
+        job_id, created = await asyncio.to_thread(job_store.create_or_attach, request.url, request.email,
+                                                  request.secret, max_queued=scheduler.max_queued)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not created:
+        job = await asyncio.to_thread(job_store.get, job_id)
+        print(f"Duplicate request: attached to job {job_id} ({job['status']})")
+        return {"message": "Quiz task already accepted.", "status": "completed" if job["status"] == "completed"
+                else "processing", "job_id": job_id, "levels_solved": job["levels_solved"], "deduplicated": True}
+
+    # 3. Queue Agent (runs as soon as a worker slot is free)
+    ahead = await scheduler.submit(job_id)
+
+    return {"message": "Quiz task accepted. Agent started.", "status": "processing",
+            "job_id": job_id, "queue_position": ahead, "deduplicated": False}
+
+@app.get("/quiz/{job_id}")
+def quiz_status(job_id: str):
+    """Job status, the level it is on, and every answer submitted so far."""
+    report = job_store.report(job_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return report
+
+@app.post("/quiz/{job_id}/resume")
+async def resume_quiz(job_id: str):
+    """
+    Re-queues a failed job; it restarts from its last unsolved level, not the first URL,
+    with a new quiz time budget (the original one may be long gone).
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    try:
+        resumed = await asyncio.to_thread(job_store.resume, job_id, max_queued=scheduler.max_queued)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not resumed:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, only failed jobs can be resumed.")
+    ahead = await scheduler.submit(job_id)
+    return {"job_id": job_id, "status": "queued", "resume_url": job["current_url"], "queue_position": ahead}
+
+@app.on_event("shutdown")
+async def close_shared_resources():
+    """Stops the workers and closes the shared Chromium, HTTP and Python pools."""
+    app.state.warm_up.cancel()
+    await scheduler.stop()
+    browser, fetch = loaded("browser"), loaded("fetch")  # only close what was ever started
+    if browser:
+        await browser.shutdown()
+    if fetch:
+        await fetch.close()
+    await execution.pool.close()
+
+@app.get("/models")
+def model_stats():
+    """Per-model latency, success rate and remaining rate-limit budget."""
+    return router.stats()
+
+@app.get("/workers")
+def worker_stats():
+    """Every quiz worker process with a recent heartbeat, and the jobs waiting for them."""
+    return {"workers": job_store.workers(), "queued": job_store.queued()}
+
+@app.get("/rules")
+def rule_stats():
+    """Fast-path hit rates per rule and recent per-level solve times."""
+    return rule_engine.report()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Span timings, payload bytes and token counts in Prometheus text format."""
+    gauges = [f"# TYPE quiz_scheduler_{k} gauge\nquiz_scheduler_{k} {v}" for k, v in scheduler.stats().items()]
+    return metrics.render() + "\n".join(gauges) + "\n"
+
+@app.get("/traces")
+def list_traces():
+    """Summaries of the most recent quiz runs, newest first."""
+    return [t.summary() for t in reversed(traces.values())]
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """Every span of one quiz run, plus total time per span name."""
+    if trace_id not in traces:
+        raise HTTPException(status_code=404, detail="Unknown trace id.")
+    return traces[trace_id].to_dict()
+
+def _cache_stats(tool_module):
+    module = loaded(tool_module)  # None until the tool has been used in this process
+    return module.results.stats() if module else None
+
+@app.get("/ready")
+def ready():
+    """503 until the scheduler runs and the Python pool (and Chromium, if warmed at startup) are warm."""
+    ok, report = readiness.status()
+    return JSONResponse(dict(report, ready=ok), status_code=200 if ok else 503)
 
 @app.get("/")
 def read_root():
-    return {"status": "alive", "service": "LLM Quiz Solver"}
+    return {
+        "status": "alive",
+        "service": "LLM Quiz Solver",
+        "scheduler": scheduler.stats(),
+        "worker_id": scheduler.worker_id,
+        "result_cache": {"transcription": _cache_stats("transcription"), "vision": _cache_stats("vision"),
+                         "llm": router.cache.stats() if router.cache else None},
+    }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Each worker process runs its own quiz slots; they share the job queue, caches and rate-limit budgets.
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=int(os.getenv("WEB_CONCURRENCY", "1")))
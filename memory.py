@@ -0,0 +1,104 @@
+import os
+import re
+import json
+
+# Prompt budget for one LLM call (system prompt + task + history).
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# The newest messages are always sent verbatim.
+KEEP_RECENT_MESSAGES = int(os.getenv("CONTEXT_KEEP_RECENT", "4"))
+
+URL_RE = re.compile(r"https?://[^\s\"'<>\\)\]]+")
+# Anchored on the whole phrase: "Secret code is 4821" must give 4821, not the word "code".
+CODE_RE = re.compile(r"(?i)\bsecret\s+code\s*(?:is|[:=])\s*[\"']?([\w#-]{3,})")
+NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+
+def summarize_tool_output(content: str) -> str:
+    """Replaces a long tool output with the facts the agent usually needs later."""
+    urls = list(dict.fromkeys(URL_RE.findall(content)))[:8]
+    codes = list(dict.fromkeys(CODE_RE.findall(content)))[:5]
+    numbers = list(dict.fromkeys(NUMBER_RE.findall(content)))[:15]
+    head = " ".join(content.split())[:160]
+    parts = [f"[Compacted] {head}..."]
+    if urls:
+        parts.append("urls: " + ", ".join(urls))
+    if codes:
+        parts.append("codes: " + ", ".join(codes))
+    if numbers:
+        parts.append("numbers: " + ", ".join(numbers))
+    return " | ".join(parts)
+
+
+def summarize_assistant(content: str) -> str:
+    """Keeps only the tool call of an old assistant turn (drops the reasoning)."""
+    try:
+        command = json.loads(content)
+        if command.get("tool_calls"):
+            return json.dumps({"tool_calls": command["tool_calls"]})
+        return json.dumps({"tool_name": command.get("tool_name"), "parameters": command.get("parameters", {})})
+    except (json.JSONDecodeError, AttributeError):
+        return content[:200]
+
+
+class ConversationMemory:
+    """
+    Message history for one level of the agent loop, kept within a token budget.
+    The system prompt and the level's opening message are pinned; older turns are
+    compacted first and dropped only if compaction is not enough.
+    """
+
+    def __init__(self, system_prompt, task, budget=CONTEXT_TOKEN_BUDGET, keep_recent=KEEP_RECENT_MESSAGES):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self._pinned = [self._entry("system", system_prompt), self._entry("user", task)]
+        self._history = []
+        self.tokens_saved = 0
+
+    @staticmethod
+    def _entry(role, content):
+        return {"role": role, "content": content, "tokens": estimate_tokens(content), "compacted": False}
+
+    def add(self, role, content):
+        self._history.append(self._entry(role, content))
+
+    @property
+    def tokens(self) -> int:
+        return sum(m["tokens"] for m in self._pinned + self._history)
+
+    def messages(self) -> list:
+        """Messages to send, after fitting the history into the budget."""
+        saved = self._fit()
+        if saved:
+            self.tokens_saved += saved
+            print(f"  [Memory] ~{self.tokens} tokens in prompt (saved {saved} this step, {self.tokens_saved} total)")
+        return [{"role": m["role"], "content": m["content"]} for m in self._pinned + self._history]
+
+    def _fit(self) -> int:
+        before = self.tokens
+        if before <= self.budget:
+            return 0
+
+        # Compact the older turns first, then the recent ones; the newest message stays intact.
+        split = max(len(self._history) - self.keep_recent, 0)
+        for m in self._history[:split] + self._history[split:-1]:
+            if self.tokens <= self.budget:
+                break
+            if m["compacted"]:
+                continue
+            if m["role"] == "assistant":
+                m["content"] = summarize_assistant(m["content"])
+            else:
+                m["content"] = summarize_tool_output(m["content"])
+            m["tokens"] = estimate_tokens(m["content"])
+            m["compacted"] = True
+
+        # Still over: drop the oldest turns (never the recent ones).
+        while self.tokens > self.budget and len(self._history) > self.keep_recent:
+            self._history.pop(0)
+
+        return before - self.tokens
@@ -0,0 +1,65 @@
+"""
+Background warm-up and readiness for a service or worker process.
+
+Startup only launches `warm_up()` as a task, so the server accepts requests at once;
+GET /ready answers 503 until the Python worker pool (and, with BROWSER_WARMUP=1,
+Chromium) are warm and the scheduler is claiming jobs.
+"""
+import os
+import time
+import asyncio
+import importlib
+from scheduler import scheduler
+from tools import execution, loaded
+
+# Launch Chromium during warm-up instead of on the first page that needs it.
+BROWSER_WARMUP = os.getenv("BROWSER_WARMUP", "1") == "1"
+
+started_at = time.time()
+warmed_at = None
+errors = {}  # component -> why its warm-up failed
+
+
+async def warm_up():
+    """Warms the Python pool and (optionally) the browser concurrently; failures are recorded, not raised."""
+    global warmed_at
+    components = {"python_pool": execution.pool.start()}
+    if BROWSER_WARMUP:
+        components["browser"] = _warm_browser()
+    results = await asyncio.gather(*components.values(), return_exceptions=True)
+    for name, result in zip(components, results):
+        if isinstance(result, Exception):
+            errors[name] = str(result)
+            print(f"[Startup] {name} warm-up failed: {result}")
+    warmed_at = time.time()
+    print(f"[Startup] Warm-up finished in {warmed_at - started_at:.2f}s.")
+
+
+async def _warm_browser():
+    # Playwright is imported here, off the event loop, rather than when the service is imported.
+    browser = await asyncio.to_thread(importlib.import_module, "tools.browser")
+    await browser.pool.warm()
+
+
+def status():
+    """(ready, report) for GET /ready."""
+    browser = loaded("browser")
+    report = {
+        "scheduler": "running" if scheduler.started else "stopped",
+        "python_pool": _state("python_pool", execution.pool.ready),
+        "browser": _state("browser", bool(browser and browser.pool.ready)) if BROWSER_WARMUP else "lazy",
+        "groq_api_key": bool(os.getenv("GROQ_API_KEY")),
+        "uptime_s": round(time.time() - started_at, 2),
+        "warmup_s": round(warmed_at - started_at, 2) if warmed_at else None,
+    }
+    ready = (scheduler.started and report["python_pool"] == "warm"
+             and report["browser"] in ("warm", "lazy") and report["groq_api_key"])
+    return ready, report
+
+
+def _state(name, warm):
+    if warm:
+        return "warm"
+    if name in errors:
+        return f"failed: {errors[name]}"
+    return "warming"
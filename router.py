@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+from memory import estimate_tokens
+from tracing import span, metrics
+from tools.result_cache import make_key
+
+# Longest we are willing to sleep waiting for some model's rate limit to reset.
+MAX_WAIT_SECONDS = 30
+# Errors that mean the model itself is gone, not that this request was bad.
+RETIRE_MARKERS = ("decommissioned", "model_not_found", "does not exist", "not supported")
+LLM_CACHE = os.getenv("LLM_CACHE", "1") == "1"
+# Cached replies are only reused when sampling is (nearly) deterministic.
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.2"))
+
+
+def parse_duration(value) -> float:
+    """Parses Groq reset/retry values such as "7.66s", "2m59.56s", "120ms" or "3" into seconds."""
+    if value is None:
+        return 0.0
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    seconds = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        seconds += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return seconds
+
+
+class ModelState:
+    """What we know about one model: its rate-limit budget, cooldown and track record."""
+
+    def __init__(self, name):
+        self.name = name
+        self.retired = False
+        self.cooldown_until = 0.0
+        self.failures_in_row = 0
+        self.requests_left = None
+        self.tokens_left = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        # Statistics
+        self.calls = 0
+        self.successes = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.tokens_used = 0
+
+    def available(self, now, needed_tokens) -> bool:
+        if self.retired or now < self.cooldown_until:
+            return False
+        if self.requests_left == 0 and now < self.requests_reset_at:
+            return False
+        if self.tokens_left is not None and self.tokens_left < needed_tokens and now < self.tokens_reset_at:
+            return False
+        return True
+
+    def ready_at(self, needed_tokens) -> float:
+        """Earliest time this model can take a request of `needed_tokens`."""
+        ready = self.cooldown_until
+        if self.requests_left == 0:
+            ready = max(ready, self.requests_reset_at)
+        if self.tokens_left is not None and self.tokens_left < needed_tokens:
+            ready = max(ready, self.tokens_reset_at)
+        return ready
+
+    def read_headers(self, headers, now):
+        """Updates the budget from x-ratelimit-* response headers."""
+        if headers.get("x-ratelimit-remaining-requests") is not None:
+            self.requests_left = int(float(headers["x-ratelimit-remaining-requests"]))
+            self.requests_reset_at = now + parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if headers.get("x-ratelimit-remaining-tokens") is not None:
+            self.tokens_left = int(float(headers["x-ratelimit-remaining-tokens"]))
+            self.tokens_reset_at = now + parse_duration(headers.get("x-ratelimit-reset-tokens"))
+
+    def backoff(self, now, retry_after=None):
+        """Cools the model down: retry-after when given, else exponential backoff with jitter."""
+        self.failures_in_row += 1
+        delay = retry_after if retry_after else min(2 ** self.failures_in_row, 60)
+        self.cooldown_until = now + delay + random.uniform(0, 0.25 * delay)
+
+    def stats(self) -> dict:
+        return {
+            "retired": self.retired,
+            "cooling_down_s": round(max(self.cooldown_until - time.time(), 0), 1),
+            "calls": self.calls,
+            "successes": self.successes,
+            "success_rate": round(self.successes / self.calls, 3) if self.calls else None,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "avg_latency_s": round(self.total_latency / self.successes, 3) if self.successes else None,
+            "tokens_used": self.tokens_used,
+            "requests_left": self.requests_left,
+            "tokens_left": self.tokens_left,
+        }
+
+
+class ModelRouter:
+    """
+    Picks the first model (in preference order) that is not retired, cooling down
+    or out of budget. State persists across calls, so a rate-limited model is
+    skipped until its reset time instead of being retried on every step.
+    With a `cache` (a ResultCache), low-temperature replies are reused for identical prompts.
+    With `budgets` (a BudgetStore), the rate-limit state is shared with other processes.
+    `client_factory` returns the Groq client; it is called on the first request, not at import.
+    """
+
+    def __init__(self, client_factory, models, max_wait=MAX_WAIT_SECONDS, cache=None, budgets=None):
+        self._client_factory = client_factory
+        self._client = None
+        self.models = {name: ModelState(name) for name in models}
+        self.max_wait = max_wait
+        self.cache = cache
+        self.budgets = budgets
+
+    @property
+    def client(self):
+        if self._client is None:
+            # The router does its own retries; stop the SDK from retrying 429s behind our back.
+            self._client = self._client_factory().with_options(max_retries=0)
+        return self._client
+
+    async def complete(self, messages, cache=True, prefer=(), max_wait=None, **kwargs) -> str:
+        """
+        Reply from the first available model; `cache=False` skips the response cache for this call.
+        Models named in `prefer` are tried first (e.g. fast ones near a deadline), and `max_wait`
+        overrides how long to wait for a rate limit to reset.
+        """
+        use_cache = cache and self.cache is not None and kwargs.get("temperature", 1.0) <= LLM_CACHE_MAX_TEMPERATURE
+        if use_cache:
+            content = await asyncio.to_thread(self._cached, messages, kwargs)  # SQLite, shared across processes
+            if content is not None:
+                return content
+
+        needed = sum(estimate_tokens(m["content"]) for m in messages)
+        deadline = time.time() + (self.max_wait if max_wait is None else max_wait)
+        rejected = set()  # models that refused this particular request
+        order = ([self.models[name] for name in prefer if name in self.models]
+                 + [s for s in self.models.values() if s.name not in prefer])
+
+        while True:
+            now = time.time()
+            for state in order:
+                if state.name in rejected or not await self._reserve(state, now, needed):
+                    continue
+                content = await self._try(state, messages, kwargs, rejected)
+                if content is not None:
+                    if use_cache and _cacheable(content, kwargs):
+                        await asyncio.to_thread(self.cache.put, _cache_key(state.name, messages, kwargs), content)
+                    return content
+
+            waiting = [s.ready_at(needed) for s in self.models.values()
+                       if not s.retired and s.name not in rejected]
+            if not waiting:
+                raise Exception("CRITICAL: All available models are rate-limited or failed.")
+            wake = min(waiting) + random.uniform(0, 0.5)
+            if wake > deadline:
+                raise Exception("CRITICAL: All available models are rate-limited or failed.")
+            print(f"  [Router] All models busy. Waiting {max(wake - time.time(), 0):.1f}s ...")
+            await asyncio.sleep(max(wake - time.time(), 0))
+
+    async def _reserve(self, state, now, needed):
+        if self.budgets is None:
+            return state.available(now, needed)
+        # The shared store takes a write lock; wait for it in a thread, not on the event loop.
+        return await asyncio.to_thread(self.budgets.reserve, state, now, needed)
+
+    def _cached(self, messages, kwargs):
+        """A stored reply for these messages from any model, in preference order (one cache lookup)."""
+        keys = {_cache_key(name, messages, kwargs): name for name in self.models}
+        found = self.cache.get_first(list(keys))
+        if found is not None:
+            print(f"  [Router] Cached reply ({keys[found[0]]}).")
+            metrics.inc("llm_cache_total", help="LLM response cache lookups.", result="hit")
+            return found[1]
+        metrics.inc("llm_cache_total", help="LLM response cache lookups.", result="miss")
+        return None
+
+    async def _try(self, state, messages, kwargs, rejected):
+        """One attempt on one model. Returns the content, or None to move on."""
+        print(f"  ... Trying model: {state.name} ...")
+        state.calls += 1
+        with span("llm.call", model=state.name, bytes_in=len(json.dumps(messages))) as s:
+            content, outcome, usage = await self._request(state, messages, kwargs, rejected)
+            if self.budgets is not None:
+                await asyncio.to_thread(self.budgets.publish, state)
+            s.set(outcome=outcome, **usage)
+            if content is not None:
+                s.set(bytes_out=len(content))
+            return content
+
+    async def _request(self, state, messages, kwargs, rejected):
+        import groq  # for its exception types; imported with the client, not with this module
+        started = time.time()
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(
+                model=state.name, messages=messages, **kwargs
+            )
+            completion = await raw.parse()
+        except groq.RateLimitError as e:
+            now = time.time()
+            state.rate_limited += 1
+            state.read_headers(e.response.headers, now)
+            state.backoff(now, parse_duration(e.response.headers.get("retry-after")))
+            print(f"  [WARN] Model {state.name} rate-limited. Cooling down {state.cooldown_until - now:.1f}s.")
+            return None, "rate_limited", {}
+        except (groq.BadRequestError, groq.NotFoundError) as e:
+            state.errors += 1
+            if isinstance(e, groq.NotFoundError) or any(m in str(e).lower() for m in RETIRE_MARKERS):
+                state.retired = True
+                print(f"  [WARN] Model {state.name} is unavailable. Retiring it.")
+                return None, "retired", {}
+            rejected.add(state.name)
+            print(f"  [WARN] Model {state.name} rejected the request: {e}")
+            return None, "rejected", {}
+        except (groq.APIConnectionError, groq.InternalServerError) as e:
+            state.errors += 1
+            state.backoff(time.time())
+            print(f"  [WARN] Model {state.name} failed ({type(e).__name__}). Switching...")
+            return None, "error", {}
+
+        now = time.time()
+        state.read_headers(raw.headers, now)
+        state.failures_in_row = 0
+        state.successes += 1
+        state.total_latency += now - started
+        usage = completion.usage
+        tokens = {}
+        if usage:
+            state.tokens_used += usage.total_tokens
+            tokens = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+            metrics.inc("llm_tokens_total", usage.prompt_tokens, help="Tokens used per model.",
+                        model=state.name, kind="prompt")
+            metrics.inc("llm_tokens_total", usage.completion_tokens, help="Tokens used per model.",
+                        model=state.name, kind="completion")
+        return completion.choices[0].message.content, "ok", tokens
+
+    def stats(self) -> dict:
+        return {name: state.stats() for name, state in self.models.items()}
+
+
+def _cache_key(model, messages, kwargs):
+    """Whitespace-insensitive hash of (model, messages, temperature, response format)."""
+    normalized = [(m["role"], " ".join(str(m["content"]).split())) for m in messages]
+    return make_key(model, normalized, kwargs.get("temperature"), kwargs.get("response_format"))
+
+
+def _cacheable(content, kwargs):
+    """Replies that asked for JSON are only stored when they parse."""
+    if (kwargs.get("response_format") or {}).get("type") != "json_object":
+        return True
+    try:
+        json.loads(content)
+        return True
+    except ValueError:
+        return False
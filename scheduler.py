@@ -0,0 +1,133 @@
+import os
+import socket
+import asyncio
+from agent import solve_quiz
+from jobs import store as job_store, JobLost, QueueFullError  # noqa: F401  (re-exported for main)
+
+# How many quizzes this process may run at the same time (0 = only accept and queue
+# them), and how many may wait in the shared queue across all processes.
+MAX_CONCURRENT_QUIZZES = int(os.getenv("MAX_CONCURRENT_QUIZZES", "8"))
+MAX_QUEUED_QUIZZES = int(os.getenv("MAX_QUEUED_QUIZZES", "100"))
+HEARTBEAT_SECONDS = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "5"))
+# Fallback poll for jobs queued by other processes; local submits wake the dispatcher at once.
+QUEUE_POLL_SECONDS = float(os.getenv("QUEUE_POLL_SECONDS", "1"))
+
+
+class QuizScheduler:
+    """
+    Runs quizzes from the shared job queue (the job store's queued rows) with at most
+    `max_concurrent` at a time in this process. Every process using the same store -
+    each uvicorn worker, or `python worker.py` on the same host - claims jobs atomically and
+    heartbeats; jobs held by a worker that stops heartbeating go back on the queue.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_QUIZZES, max_queued=MAX_QUEUED_QUIZZES):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.running = 0
+        self._wake = None
+        self._loops = []
+        self._jobs = set()
+
+    def start(self):
+        self._wake = asyncio.Event()
+        job_store.heartbeat(self.worker_id, self.max_concurrent, 0)
+        for job_id in job_store.requeue_orphans():
+            print(f"Scheduler: Requeued interrupted job {job_id}")
+        self._loops = [
+            asyncio.create_task(self._dispatch(), name="quiz-dispatcher"),
+            asyncio.create_task(self._heartbeat(), name="quiz-heartbeat"),
+        ]
+        print(f"Scheduler: worker {self.worker_id}, {self.max_concurrent} quiz slots, queue limit {self.max_queued}")
+
+    async def stop(self):
+        tasks = self._loops + list(self._jobs)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops = []
+        await asyncio.to_thread(job_store.release, self.worker_id)  # unfinished jobs are picked up by the other workers
+
+    @property
+    def started(self):
+        return bool(self._loops)
+
+    async def submit(self, job_id: str) -> int:
+        """
+        Wakes the dispatcher for a job already 'queued' in the store and returns how many quizzes
+        are waiting ahead of it. The queue limit is enforced when the row is written (max_queued).
+        """
+        if self._wake:
+            self._wake.set()
+        return await asyncio.to_thread(job_store.position, job_id)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": job_store.queued(),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "workers_alive": len(job_store.workers()),
+        }
+
+    async def _dispatch(self):
+        while True:
+            if self.running < self.max_concurrent:
+                try:
+                    job = await asyncio.to_thread(job_store.claim, self.worker_id)
+                except Exception as e:
+                    print(f"Scheduler: Could not claim a job: {e}")
+                    job = None
+                if job:
+                    self.running += 1
+                    task = asyncio.create_task(self._run(job), name=f"quiz-{job['id']}")
+                    self._jobs.add(task)
+                    task.add_done_callback(self._jobs.discard)
+                    continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                # Store calls run in a thread: waiting on its write lock must not stall the quizzes
+                # running on this loop, nor delay the heartbeat until other workers think we died.
+                await asyncio.to_thread(job_store.heartbeat, self.worker_id, self.max_concurrent, self.running)
+                orphans = await asyncio.to_thread(job_store.requeue_orphans)
+            except Exception as e:  # a locked or unreachable store must not kill the loop
+                print(f"Scheduler: Heartbeat failed: {e}")
+                continue
+            for job_id in orphans:
+                print(f"Scheduler: Requeued job {job_id} from a worker that stopped heartbeating")
+            if orphans:
+                self._wake.set()
+
+    async def _run(self, job):
+        job_id = job["id"]
+        print(f"Scheduler[{self.worker_id}]: Starting agent for job {job_id} at {job['current_url']}")
+        try:
+            if job["current_url"]:
+                # The grader's clock started when the quiz was posted (or explicitly resumed), not when
+                # a worker got to it or it was requeued; see JobStore.claim.
+                await solve_quiz(job["current_url"], job["email"], job["secret"], job_id=job_id,
+                                 started_at=job["quiz_started_at"], worker_id=self.worker_id)
+            await asyncio.to_thread(job_store.finish, job_id, self.worker_id)
+        except JobLost:
+            print(f"Scheduler[{self.worker_id}]: Job {job_id} was requeued to another worker; stopped.")
+        except Exception as e:
+            print(f"Scheduler[{self.worker_id}]: Agent crashed on job {job_id}: {e}")
+            try:
+                await asyncio.to_thread(job_store.set_status, job_id, "failed", str(e), self.worker_id)
+            except JobLost:
+                pass
+        finally:
+            self.running -= 1
+            self._wake.set()
+
+
+scheduler = QuizScheduler()
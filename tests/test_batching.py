@@ -0,0 +1,132 @@
+"""
+Batched tool calls: only read-only tools run together, at most MAX_BATCH_CALLS of them,
+and the LLM is told which calls were left out and why. Their outputs come back as one
+observation in call order. The prefetcher starts a page's audio and data downloads in
+the background and hands each result to the first tool call that asks for it.
+"""
+import json
+import asyncio
+
+import pytest
+
+import agent
+from agent import _split_batch, _run_batch, _run_tool, MAX_BATCH_CALLS
+from tools import prefetch as prefetch_module
+from tools.prefetch import Prefetcher
+
+
+def _nav(i):
+    return {"tool_name": "navigate", "parameters": {"url": f"https://quiz.example/{i}"}}
+
+
+def test_batch_is_capped_and_the_rest_reported():
+    calls = [_nav(i) for i in range(MAX_BATCH_CALLS + 2)]
+    batch, note = _split_batch(calls)
+    assert batch == calls[:MAX_BATCH_CALLS]
+    assert note.count(f"over the limit of {MAX_BATCH_CALLS}") == 2
+    assert f"https://quiz.example/{MAX_BATCH_CALLS + 1}" in note
+
+
+def test_submit_and_done_are_held_back_without_using_the_cap():
+    submit = {"tool_name": "submit_answer", "parameters": {"answer": 42}}
+    calls = [submit] + [_nav(i) for i in range(MAX_BATCH_CALLS)] + [{"tool_name": "done"}, "navigate"]
+    batch, note = _split_batch(calls)
+    assert batch == calls[1:MAX_BATCH_CALLS + 1]
+    assert "- submit_answer {\"answer\": 42}: submit_answer only runs alone" in note
+    assert "- done {}: done only runs alone" in note
+    assert "not a tool call" in note
+    assert "over the limit" not in note
+
+
+def test_a_full_batch_has_no_note():
+    calls = [_nav(1), {"tool_name": "python_repl", "parameters": {"code": "print(1)"}}]
+    assert _split_batch(calls) == (calls, "")
+
+
+def test_batch_outputs_are_merged_in_call_order(monkeypatch):
+    monkeypatch.setattr(agent, "TOOL_CONCURRENCY", 2)
+    running = {"now": 0, "most": 0}
+
+    async def fake_tool(tool_name, params, session, prefetch):
+        running["now"] += 1
+        running["most"] = max(running["most"], running["now"])
+        await asyncio.sleep(0.05 if params["url"].endswith("0") else 0.01)  # the first call finishes last
+        running["now"] -= 1
+        if params["url"].endswith("2"):
+            raise RuntimeError("page timed out")
+        return f"page {params['url'][-1]}"
+
+    monkeypatch.setattr(agent, "_run_tool", fake_tool)
+    result = asyncio.run(_run_batch([_nav(0), _nav(1), _nav(2)], None, None))
+    assert result.splitlines() == ["[1] navigate: page 0", "[2] navigate: page 1",
+                                   "[3] navigate: Error: page timed out"]
+    assert running["most"] == 2
+
+
+@pytest.fixture
+def fake_tools(monkeypatch):
+    """Replaces transcribe_audio and fetch_cached with recorders."""
+    calls = []
+
+    def tool(name):
+        async def run(url):
+            calls.append((name, url))
+            await asyncio.sleep(0.01)
+            return f"TRANSCRIPTION: {url}" if name == "transcribe_audio" else f"/cache/{url.rsplit('/', 1)[-1]}"
+        return run
+
+    monkeypatch.setattr(prefetch_module, "get_tool", tool)
+    monkeypatch.setattr(agent, "get_tool", tool)
+    return calls
+
+
+PAGE = json.dumps({"audio": "https://quiz.example/a.mp3", "links": [
+    {"href": "https://quiz.example/data.csv", "type": "csv"},
+    {"href": "https://quiz.example/next", "type": "page"},
+    {"href": "https://quiz.example/chart.png", "type": "image"},
+]})
+
+
+def test_prefetch_starts_audio_and_data_but_not_pages(fake_tools):
+    async def scenario():
+        prefetch = Prefetcher(enabled=True)
+        prefetch.start(PAGE)
+        prefetch.start(PAGE)  # navigating to the same page again starts nothing new
+        prefetch.start("Navigation Error: timeout")
+        keys = sorted(prefetch.tasks)
+        first = await prefetch.result("download", "https://quiz.example/data.csv")
+        again = await prefetch.result("download", "https://quiz.example/data.csv")
+        prefetch.cancel()
+        return keys, first, again
+
+    keys, first, again = asyncio.run(scenario())
+    assert keys == [("download", "https://quiz.example/chart.png"), ("download", "https://quiz.example/data.csv"),
+                    ("transcribe_audio", "https://quiz.example/a.mp3")]
+    assert (first, again) == ("/cache/data.csv", None)  # a result is handed out once
+
+
+def test_prefetch_is_capped_and_can_be_disabled(fake_tools, monkeypatch):
+    monkeypatch.setattr(prefetch_module, "MAX_PREFETCH", 2)
+    page = json.dumps({"links": [{"href": f"https://quiz.example/{i}.csv"} for i in range(5)]})
+
+    async def scenario():
+        capped, disabled = Prefetcher(enabled=True), Prefetcher(enabled=False)
+        capped.start(page)
+        disabled.start(page)
+        sizes = len(capped.tasks), len(disabled.tasks)
+        capped.cancel()
+        return sizes
+
+    assert asyncio.run(scenario()) == (2, 0)
+
+
+def test_transcribe_call_uses_the_prefetched_result(fake_tools):
+    async def scenario():
+        prefetch = Prefetcher(enabled=True)
+        prefetch.start(PAGE)
+        result = await _run_tool("transcribe_audio", {"audio_url": "https://quiz.example/a.mp3"}, None, prefetch)
+        prefetch.cancel()
+        return result
+
+    assert asyncio.run(scenario()) == "TRANSCRIPTION: https://quiz.example/a.mp3"
+    assert fake_tools.count(("transcribe_audio", "https://quiz.example/a.mp3")) == 1
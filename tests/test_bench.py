@@ -0,0 +1,82 @@
+"""
+The benchmark's stand-ins: the local quiz server chains its levels and tracks each
+email's run on its own, and the stub Groq backend replays each (email, level)
+recording independently.
+"""
+import os
+import sys
+import json
+import asyncio
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+
+import quiz_server  # noqa: E402
+import stub_llm  # noqa: E402
+from run_bench import percentile  # noqa: E402
+
+BASE = "http://quiz.test"
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE)
+
+
+def test_quiz_server_walks_every_level():
+    async def scenario():
+        quiz_server.runs.clear()
+        async with _client(quiz_server.app) as client:
+            url, replies = quiz_server.start_url(BASE, "a@b.c"), []
+            wrong = (await client.post("/submit", json={"email": "b@b.c", "url": f"{BASE}/demo-scrape",
+                                                        "answer": "9999"})).json()
+            while url:
+                path = url.split("?")[0][len(BASE):]
+                answer = quiz_server.expected_answer(path, "a@b.c", BASE) or "anything"
+                reply = (await client.post("/submit", json={"email": "a@b.c", "url": url, "answer": answer})).json()
+                replies.append(reply)
+                url = reply["url"]
+            return wrong, replies, (await client.get("/runs")).json()
+
+    wrong, replies, runs = asyncio.run(scenario())
+    assert wrong == {"correct": False, "url": None, "reason": "Wrong answer"}
+    assert [r["correct"] for r in replies] == [True] * len(quiz_server.LEVELS)
+    assert replies[0]["url"] == f"{BASE}/demo-scrape?email=a@b.c"
+    assert runs["a@b.c"]["finished"] and not runs["b@b.c"]["finished"]
+    assert set(runs["a@b.c"]["levels"]) == set(quiz_server.LEVELS)
+
+
+def test_csv_answer_matches_the_served_file():
+    async def scenario():
+        async with _client(quiz_server.app) as client:
+            return (await client.get("/data.csv")).text
+
+    values = [int(v) for v in asyncio.run(scenario()).split()]
+    assert sum(v for v in values if v > quiz_server.CUTOFF) == quiz_server.CSV_ANSWER
+
+
+def test_stub_llm_replays_each_run_separately():
+    stub_llm.load(quiz_base=BASE)
+
+    def ask(email, level):
+        task = f"Current URL: {BASE}{level}?email={email}. Email: {email}. Secret: s"
+        return {"model": "m", "messages": [{"role": "system", "content": "..."}, {"role": "user", "content": task}]}
+
+    async def scenario():
+        async with _client(stub_llm.app) as client:
+            replies = []
+            for email in ("a@b.c", "a@b.c", "x@y.z"):
+                response = await client.post("/openai/v1/chat/completions", json=ask(email, "/demo"))
+                replies.append(json.loads(response.json()["choices"][0]["message"]["content"]))
+            return replies, (await client.get("/stats")).json()
+
+    (first, second, other), stats = asyncio.run(scenario())
+    assert first["tool_name"] == other["tool_name"] == "submit_answer"  # x@y.z starts at its own first step
+    assert second["tool_name"] == "done"
+    assert first["parameters"]["quiz_url"] == f"{BASE}/demo?email=a@b.c"
+    assert stats == {"/demo": 3}
+
+
+def test_percentile_is_nearest_rank():
+    values = [0.5, 0.1, 0.4, 0.2, 0.3]
+    assert (percentile(values, 50), percentile(values, 95), percentile([], 50)) == (0.3, 0.5, None)
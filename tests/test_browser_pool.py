@@ -0,0 +1,142 @@
+"""
+The shared Chromium pool against a fake Playwright: pages are reused, at most
+`max_pages` are open at once, the browser is relaunched after `recycle_after` pages
+or a crash, and a retired browser stays open until its last page is given back.
+"""
+import asyncio
+
+import pytest
+
+from tools import browser as browser_module
+from tools.browser import BrowserPool
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    def is_closed(self):
+        return self.context.closed
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    async def new_context(self):
+        return FakeContext()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless):
+        self.browsers.append(FakeBrowser())
+        return self.browsers[-1]
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = FakePlaywright()
+    monkeypatch.setattr(browser_module, "async_playwright", lambda: fake)
+    return fake
+
+
+def test_pages_are_reused_by_one_browser(playwright):
+    pool = BrowserPool(max_pages=2, recycle_after=10)
+
+    async def scenario():
+        pages = []
+        for _ in range(3):
+            async with pool.page() as page:
+                pages.append(page)
+        await pool.close()
+        return pages
+
+    pages = asyncio.run(scenario())
+    assert pages[0] is pages[1] is pages[2]
+    assert pool.launches == 1 and playwright.browsers[0].closed
+
+
+def test_open_pages_never_exceed_max_pages(playwright):
+    pool = BrowserPool(max_pages=2, recycle_after=100)
+    open_pages = {"now": 0, "most": 0}
+
+    async def use():
+        async with pool.page():
+            open_pages["now"] += 1
+            open_pages["most"] = max(open_pages["most"], open_pages["now"])
+            await asyncio.sleep(0.02)
+            open_pages["now"] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(use() for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert open_pages["most"] == 2
+
+
+def test_browser_is_recycled_but_not_under_a_page_in_use(playwright):
+    pool = BrowserPool(max_pages=2, recycle_after=2)
+
+    async def scenario():
+        async with pool.page():
+            pass
+        async with pool.page() as held:  # the old browser's second and last page
+            async with pool.page():  # over the limit: a new browser is launched
+                pass
+            assert len(playwright.browsers) == 2
+            assert not playwright.browsers[0].closed  # still serving `held`
+        return held
+
+    held = asyncio.run(scenario())
+    assert playwright.browsers[0].closed and held.is_closed()
+    assert not playwright.browsers[1].closed and pool.launches == 2
+
+
+def test_crashed_browser_is_relaunched_and_failed_pages_dropped(playwright):
+    pool = BrowserPool(max_pages=2, recycle_after=100)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with pool.page() as broken:
+                raise RuntimeError("page crashed")
+        async with pool.page() as fresh:
+            assert fresh is not broken
+        playwright.browsers[0].connected = False
+        async with pool.page() as relaunched:
+            pass
+        return broken, fresh, relaunched
+
+    broken, fresh, relaunched = asyncio.run(scenario())
+    assert broken.is_closed()
+    assert relaunched.context is not fresh.context and pool.launches == 2
@@ -0,0 +1,36 @@
+"""
+A locked budget store must not hold up the caller: after a short wait the router
+decides from its own view of the model, and the shared state is left untouched.
+"""
+import time
+import sqlite3
+
+from budgets import BudgetStore
+from router import ModelState
+
+
+def test_reserve_shares_budget(tmp_path):
+    path = str(tmp_path / "budgets.sqlite")
+    first, second = ModelState("m"), ModelState("m")
+    first.requests_left, first.requests_reset_at = 1, time.time() + 60
+    BudgetStore(path).publish(first)
+    assert BudgetStore(path).reserve(second, time.time(), 10)
+    assert not BudgetStore(path).reserve(ModelState("m"), time.time(), 10)
+
+
+def test_locked_store_falls_back_to_local_state(tmp_path):
+    path = str(tmp_path / "budgets.sqlite")
+    store = BudgetStore(path, timeout=0.2)
+    state = ModelState("m")
+    state.requests_left, state.requests_reset_at = 2, time.time() + 60
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")  # another process mid-transaction
+    try:
+        started = time.time()
+        assert store.reserve(state, time.time(), 10)
+        store.publish(state)
+        assert time.time() - started < 2
+        assert state.requests_left == 1
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
@@ -0,0 +1,43 @@
+"""
+Importing the service loads none of the heavy libraries behind the tools (only the
+Python worker pool, which is warmed at startup); get_tool() imports only the module
+of the tool asked for.
+"""
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import tools
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["playwright", "bs4", "PIL", "groq", "pandas", "numpy", "httpx"]
+PROBE = """
+import sys, json, main, tools
+before = [m for m in %(heavy)r if m in sys.modules]
+tools.get_tool("fetch_cached")
+modules = {m for m, _ in tools.REGISTRY.values()}
+print(json.dumps({"before": before, "tool_modules": sorted(m for m in modules if tools.loaded(m)),
+                  "after": [m for m in %(heavy)r if m in sys.modules]}))
+"""
+
+
+def test_import_main_loads_no_heavy_tools(tmp_path):
+    env = dict(os.environ, GROQ_API_KEY="stub", DOWNLOAD_CACHE_DIR=str(tmp_path / "downloads"),
+               RESULT_CACHE_PATH=str(tmp_path / "results.sqlite"), JOB_STORE_PATH=str(tmp_path / "jobs.sqlite"),
+               BUDGET_STORE_PATH=str(tmp_path / "budgets.sqlite"))
+    output = subprocess.run([sys.executable, "-c", PROBE % {"heavy": HEAVY}], cwd=REPO_DIR, env=env,
+                            capture_output=True, text=True, timeout=60, check=True).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    assert report["before"] == []
+    assert report["tool_modules"] == ["execution", "fetch"]
+    assert report["after"] == ["httpx"]  # fetch needs httpx, not the browser or the SDKs
+
+
+def test_unknown_tools_are_errors():
+    with pytest.raises(KeyError):
+        tools.get_tool("delete_everything")
+    with pytest.raises(AttributeError):
+        tools.delete_everything
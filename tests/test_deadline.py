@@ -0,0 +1,120 @@
+"""
+A quiz's clock starts when it was posted (or explicitly resumed), however long it
+waited or how often it was requeued; each level's clock starts when a worker begins that
+level. Waits inside tools end before the level's submission reserve.
+"""
+import time
+import asyncio
+
+import httpx
+import pytest
+
+import deadline
+from jobs import JobStore
+from deadline import Budget, start_budget, SUBMIT_RESERVE_SECONDS
+from tools import fetch
+from tools.browser import BrowserPool
+from tools.download_cache import DownloadCache
+
+
+def test_requeued_job_keeps_quiz_start(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id, _ = store.create_or_attach("https://quiz.example/1", "a@example.com", "s")
+    posted = store.get(job_id)["created_at"]
+    store.claim("worker-a")
+    store.release("worker-a")
+    store.set_status(job_id, "queued")  # any later write moves updated_at
+    job = store.claim("worker-b")
+    assert job["id"] == job_id
+    assert job["quiz_started_at"] == posted
+
+
+def test_resume_starts_a_new_quiz_clock(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id, _ = store.create_or_attach("https://quiz.example/1", "a@example.com", "s")
+    assert not store.resume(job_id)  # only failed jobs
+    store.claim("worker-a")
+    store.set_status(job_id, "failed", "Stopped before the last level.")
+    before = time.time()
+    assert store.resume(job_id)
+    job = store.claim("worker-b")
+    assert job["quiz_started_at"] >= before > job["created_at"]
+    assert Budget(started_at=job["quiz_started_at"]).quiz_remaining() > 1000
+    store.release("worker-b")  # a later requeue keeps the resumed clock
+    assert store.claim("worker-c")["quiz_started_at"] == job["quiz_started_at"]
+
+
+def test_long_queue_wait_still_leaves_level_time():
+    # Posted 10 minutes ago: the 3-minute level deadline measured from then has long passed,
+    # but the quiz still has time and the level starts fresh when it begins.
+    budget = Budget(started_at=time.time() - 600, quiz_seconds=1800, level_seconds=180)
+    assert budget.remaining() < 0
+    assert budget.quiz_remaining() > 1000
+    budget.start_level()
+    assert 175 < budget.remaining() <= 180
+
+
+def test_level_never_outlives_quiz():
+    budget = Budget(started_at=time.time() - 1750, quiz_seconds=1800, level_seconds=180)
+    budget.start_level()
+    assert budget.remaining() <= 50
+
+
+@pytest.fixture
+def short_level(monkeypatch):
+    """Starts a quiz budget in the running task with 0.3 s left before the submission reserve."""
+    monkeypatch.setattr(deadline, "MIN_TOOL_TIMEOUT", 0.05)
+
+    def start():
+        budget = start_budget()
+        budget.level_deadline = time.time() + SUBMIT_RESERVE_SECONDS + 0.3
+    return start
+
+
+def test_download_wait_stops_at_the_reserve(monkeypatch, tmp_path, short_level):
+    async def slow(request):
+        await asyncio.sleep(3)
+        return httpx.Response(200, content=b"late")
+
+    monkeypatch.setattr(fetch, "cache", DownloadCache(root=str(tmp_path)))
+    monkeypatch.setattr(fetch, "get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(slow)))
+
+    async def scenario():
+        short_level()
+        started = time.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await fetch.fetch_cached("https://quiz.example/big.csv")
+        return time.time() - started
+
+    assert asyncio.run(scenario()) < 1
+
+
+def test_page_slot_wait_stops_at_the_reserve(monkeypatch, short_level):
+    browser_pool = BrowserPool(max_pages=1)
+
+    async def ensure_browser():
+        browser_pool._semaphore = browser_pool._semaphore or asyncio.Semaphore(1)
+
+    async def checkout():
+        return object(), object()
+
+    async def release(browser, page, healthy):
+        pass
+
+    monkeypatch.setattr(browser_pool, "_ensure_browser", ensure_browser)
+    monkeypatch.setattr(browser_pool, "_checkout", checkout)
+    monkeypatch.setattr(browser_pool, "_release", release)
+
+    async def scenario():
+        short_level()
+        async with browser_pool.page():
+            started = time.time()
+            with pytest.raises(asyncio.TimeoutError):
+                async with browser_pool.page():
+                    pass
+            waited = time.time() - started
+        async with browser_pool.page():  # the slot was given back
+            pass
+        return waited
+
+    assert asyncio.run(scenario()) < 1
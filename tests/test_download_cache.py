@@ -0,0 +1,151 @@
+"""
+Downloads are streamed to disk under a byte limit, the cache evicts the least recently
+used blobs, cached copies are revalidated with their ETag, and concurrent fetches of
+one URL share a single request. Blobs are stored once per content hash, and a fresh
+entry is served without asking the server.
+"""
+import os
+import sqlite3
+import asyncio
+
+import httpx
+import pytest
+
+from tools import fetch
+from tools.download_cache import DownloadCache, BlobWriter, DownloadTooLarge, MAX_DOWNLOAD_BYTES
+
+URL = "https://quiz.example/data.csv"
+
+
+def _parts(cache):
+    return [name for name in os.listdir(os.path.join(cache.root, "objects")) if name.endswith(".part")]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DownloadCache(root=str(tmp_path), max_bytes=25, fresh_seconds=0)
+
+
+@pytest.fixture
+def server(monkeypatch, cache):
+    """A fake origin for fetch_cached: URL -> (body, etag); records each request's headers."""
+    files, requests = {}, []
+
+    async def handle(request):
+        requests.append(request.headers)
+        await asyncio.sleep(0.05)
+        body, etag = files[str(request.url)]
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"etag": etag})
+        return httpx.Response(200, content=body, headers={"etag": etag, "content-type": "text/csv"})
+
+    monkeypatch.setattr(fetch, "cache", cache)
+    monkeypatch.setattr(fetch, "get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    return files, requests
+
+
+def test_blob_writer_stops_at_the_limit(cache):
+    writer = BlobWriter(cache, URL, max_bytes=10)
+    writer.write(b"12345")
+    with pytest.raises(DownloadTooLarge):
+        writer.write(b"678901")
+    writer.abort()
+    assert _parts(cache) == []
+
+
+def test_oversized_stream_leaves_nothing_behind(cache):
+    with pytest.raises(DownloadTooLarge):
+        cache.store_stream(URL, iter([b"x" * 20]), {"content-length": str(MAX_DOWNLOAD_BYTES + 1)})
+    assert _parts(cache) == [] and cache.lookup(URL) is None
+
+
+def test_least_recently_used_blob_is_evicted(cache):
+    first = cache.store_stream("https://quiz.example/a.csv", [b"a" * 10], {})
+    second = cache.store_stream("https://quiz.example/b.csv", [b"b" * 10], {})
+    cache.touch("https://quiz.example/a.csv")
+    cache.store_stream("https://quiz.example/c.csv", [b"c" * 10], {})  # 30 bytes > 25
+    assert cache.lookup("https://quiz.example/a.csv")["path"] == first["path"]
+    assert cache.lookup("https://quiz.example/b.csv") is None
+    assert not os.path.exists(second["path"])
+    assert cache.lookup("https://quiz.example/c.csv") is not None
+
+
+def test_unchanged_asset_is_revalidated_with_its_etag(server):
+    files, requests = server
+    files[URL] = (b"a,b\n1,2\n", '"v1"')
+
+    async def scenario():
+        return await fetch.fetch_cached(URL), await fetch.fetch_cached(URL)
+
+    first, second = asyncio.run(scenario())
+    assert second["path"] == first["path"]
+    assert [r.get("if-none-match") for r in requests] == [None, '"v1"']
+
+    files[URL] = (b"a,b\n3,4\n", '"v2"')
+    changed = asyncio.run(fetch.fetch_cached(URL))
+    assert changed["path"] != first["path"]
+    with open(changed["path"], "rb") as f:
+        assert f.read() == b"a,b\n3,4\n"
+
+
+def test_concurrent_fetches_share_one_request(server):
+    files, requests = server
+    files[URL] = (b"a,b\n1,2\n", '"v1"')
+
+    async def scenario():
+        return await asyncio.gather(*(fetch.fetch_cached(URL) for _ in range(3)))
+
+    entries = asyncio.run(scenario())
+    assert len(requests) == 1
+    assert len({e["path"] for e in entries}) == 1
+    assert fetch._inflight == {}
+
+
+def test_download_declared_too_large_is_refused_before_reading(monkeypatch, cache):
+    def handle(request):
+        return httpx.Response(200, headers={"content-length": str(MAX_DOWNLOAD_BYTES + 1)}, content=b"x")
+
+    monkeypatch.setattr(fetch, "cache", cache)
+    monkeypatch.setattr(fetch, "get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    with pytest.raises(DownloadTooLarge):
+        asyncio.run(fetch.fetch_cached(URL))
+    assert _parts(cache) == [] and cache.lookup(URL) is None
+
+
+def test_same_body_at_two_urls_is_stored_once(cache):
+    first = cache.store_stream("https://quiz.example/a.csv", [b"1,2\n"], {})
+    second = cache.store_stream("https://mirror.example/copy.csv", [b"1,2\n"], {})
+    assert first["path"] == second["path"] and first["sha256"] == second["sha256"]
+    assert len(os.listdir(os.path.join(cache.root, "objects"))) == 1
+
+
+def test_extensionless_url_gets_the_sniffed_extension(cache):
+    entry = cache.store_stream("https://quiz.example/media?id=3", [b"\x89PNG\r\n\x1a\n" + bytes(8)], {})
+    assert entry["filename"].endswith(".png")
+
+
+def test_fresh_entry_is_served_without_a_request(server, tmp_path, monkeypatch):
+    files, requests = server
+    files[URL] = (b"a,b\n1,2\n", '"v1"')
+    monkeypatch.setattr(fetch, "cache", DownloadCache(root=str(tmp_path / "fresh"), fresh_seconds=300))
+
+    async def scenario():
+        return await fetch.fetch_cached(URL), await fetch.fetch_cached(URL)
+
+    first, second = asyncio.run(scenario())
+    assert first["path"] == second["path"] and len(requests) == 1
+
+
+def test_locked_index_still_serves_reads_and_skips_bookkeeping(cache):
+    cache.store_stream(URL, [b"a,b\n"], {})
+    locked = DownloadCache(root=cache.root, timeout=0.1)
+    holder = sqlite3.connect(os.path.join(cache.root, "index.sqlite"), isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")  # another process mid-write
+    try:
+        assert locked.lookup(URL) is not None  # WAL: readers never wait for the writer
+        locked.touch(URL)
+        entry = locked.store_stream("https://quiz.example/b.csv", [b"b\n"], {})
+    finally:
+        holder.rollback()
+        holder.close()
+    assert os.path.exists(entry["path"]) and locked.lookup("https://quiz.example/b.csv") is None  # not indexed
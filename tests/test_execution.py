@@ -0,0 +1,70 @@
+"""The python_repl pool recovers from workers that fail to start, and never waits past its timeout."""
+import asyncio
+
+import pytest
+
+from tools.execution import ReplPool, ReplWorker
+
+
+@pytest.fixture
+def failing_start(monkeypatch):
+    """Makes ReplWorker.start fail until the returned switch is turned off."""
+    state = {"fail": True}
+    real_start = ReplWorker.start
+
+    async def start(self):
+        if state["fail"]:
+            raise RuntimeError("spawn failed")
+        return await real_start(self)
+
+    monkeypatch.setattr(ReplWorker, "start", start)
+    return state
+
+
+def test_failed_warm_up_is_retried(failing_start):
+    async def scenario():
+        pool = ReplPool(size=1)
+        with pytest.raises(RuntimeError):
+            await pool.start()
+        failing_start["fail"] = False
+        try:
+            return await asyncio.wait_for(pool.run("print(1)", timeout=30), 30)
+        finally:
+            await pool.close()
+
+    assert asyncio.run(scenario())["stdout"].strip() == "1"
+
+
+def test_pool_refills_after_failed_respawn(failing_start):
+    async def scenario():
+        failing_start["fail"] = False
+        pool = ReplPool(size=1)
+        await pool.start()
+        try:
+            failing_start["fail"] = True
+            crashed = await pool.run("import os; os._exit(1)")
+            await asyncio.sleep(0.1)  # the background replacement fails
+            failing_start["fail"] = False
+            return crashed, await asyncio.wait_for(pool.run("print(2)", timeout=30), 30)
+        finally:
+            await pool.close()
+
+    crashed, reply = asyncio.run(scenario())
+    assert "error" in crashed
+    assert reply["stdout"].strip() == "2"
+
+
+def test_waiting_for_a_worker_counts_against_the_timeout():
+    async def scenario():
+        pool = ReplPool(size=1)
+        await pool.start()
+        try:
+            busy = asyncio.create_task(pool.run("import time; time.sleep(3)"))
+            await asyncio.sleep(0.2)
+            reply = await asyncio.wait_for(pool.run("print(1)", timeout=1), 5)
+            await busy
+            return reply
+        finally:
+            await pool.close()
+
+    assert "No Python worker became free" in asyncio.run(scenario())["error"]
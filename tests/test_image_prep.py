@@ -0,0 +1,65 @@
+"""
+Images are flattened onto white before they are trimmed and re-encoded, and OCR answers
+are only given locally for plain numbers; codes go to the vision model.
+"""
+import io
+import base64
+
+import pytest
+from PIL import Image, ImageDraw
+
+from tools import image_prep
+
+DEFAULT_QUESTION = "Extract any secret code or numbers from this image."
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "image.png"
+    Image.new("RGB", (40, 20), "white").save(path)
+    return str(path)
+
+
+@pytest.fixture
+def ocr(monkeypatch):
+    text = {"value": ""}
+    monkeypatch.setattr(image_prep, "_ocr", lambda image: text["value"])
+    return text
+
+
+def test_number_question_is_answered_from_ocr(image, ocr):
+    ocr["value"] = "Total: 4821\n"
+    assert image_prep.local_answer(image, "What number is shown?").startswith("The number in the image is 4821.")
+
+
+@pytest.mark.parametrize("text, question", [
+    ("AB1234", "What number is shown?"),          # digits inside an alphanumeric token
+    ("1234", DEFAULT_QUESTION),                   # the agent's default question asks for a code
+    ("12 34", "What number is shown?"),           # ambiguous
+])
+def test_codes_and_ambiguous_text_go_to_the_vision_model(image, ocr, text, question):
+    ocr["value"] = text
+    assert image_prep.local_answer(image, question) is None
+
+
+def test_transparent_background_becomes_white(tmp_path):
+    path = tmp_path / "transparent.png"
+    image = Image.new("RGBA", (1500, 1500), (0, 0, 0, 0))
+    ImageDraw.Draw(image).rectangle((600, 700, 900, 760), outline=(0, 0, 0, 255), width=4)  # black "text"
+    image.save(path)
+
+    data_url, report = image_prep.prepare(str(path))
+    assert data_url.startswith("data:image/jpeg;base64,")
+    assert report["pixels_after"] == [301, 61]  # trimmed to the drawing: the border was white, not black
+    with Image.open(io.BytesIO(base64.b64decode(data_url.split(",", 1)[1]))) as sent:
+        sent = sent.convert("L")
+        assert sent.getpixel((150, 30)) > 240  # inside the box
+        assert sent.getpixel((1, 30)) < 40     # the outline
+
+
+def test_transparent_image_colour_is_read_on_white(tmp_path):
+    path = tmp_path / "transparent.png"
+    image = Image.new("RGBA", (50, 50), (0, 0, 0, 0))
+    ImageDraw.Draw(image).rectangle((0, 0, 9, 9), fill=(255, 0, 0, 255))
+    image.save(path)
+    assert image_prep.local_answer(str(path), "What is the dominant colour?") == "The dominant colour is #ffffff."
@@ -0,0 +1,99 @@
+"""A job is only completed once the grader says the quiz is over; otherwise it can be resumed."""
+import json
+
+import pytest
+
+from jobs import JobStore, JobLost, QueueFullError
+
+L1, L2 = "https://quiz.example/l1", "https://quiz.example/l2"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def _reply(correct, url):
+    return json.dumps({"correct": correct, "url": url})
+
+
+def test_correct_answer_on_the_last_level_completes(store):
+    job_id, _ = store.create_or_attach(L1, "a@b.c", "s")
+    store.record_submission(job_id, L1, "42", _reply(True, L2), "llm")
+    store.advance(job_id, L2)
+    store.record_submission(job_id, L2, "7", _reply(True, None), "llm")
+    store.finish(job_id)
+    assert store.get(job_id)["status"] == "completed"
+
+
+def test_run_that_stops_on_a_later_level_fails(store):
+    job_id, _ = store.create_or_attach(L1, "a@b.c", "s")
+    assert store.record_submission(job_id, L1, "42", _reply(True, L2), "llm")
+    store.advance(job_id, L2)
+    store.finish(job_id)  # e.g. the step cap was hit on l2 without a submission
+    job = store.get(job_id)
+    assert (job["status"], job["current_url"], job["levels_solved"]) == ("failed", L2, 1)
+
+
+def test_wrong_last_answer_fails(store):
+    job_id, _ = store.create_or_attach(L1, "a@b.c", "s")
+    store.record_submission(job_id, L1, "41", _reply(False, None), "deadline")
+    store.finish(job_id)
+    assert store.get(job_id)["status"] == "failed"
+
+
+def test_retry_attaches_to_a_finished_quiz(store):
+    job_id, created = store.create_or_attach(L1, "a@b.c", "s")
+    assert created
+    assert store.create_or_attach(L1, "a@b.c", "s") == (job_id, False)  # still queued
+    store.record_submission(job_id, L1, "42", _reply(True, None), "llm")
+    store.finish(job_id)
+    assert store.create_or_attach(L1, "a@b.c", "s") == (job_id, False)
+
+
+def test_retry_after_a_run_that_stopped_early_starts_a_new_job(store):
+    job_id, _ = store.create_or_attach(L1, "a@b.c", "s")
+    store.record_submission(job_id, L1, "42", _reply(True, L2), "llm")
+    store.advance(job_id, L2)
+    store.finish(job_id)
+    retry_id, created = store.create_or_attach(L1, "a@b.c", "s")
+    assert created and retry_id != job_id
+    assert store.get(retry_id)["status"] == "queued"
+
+
+def test_writes_from_a_worker_that_lost_the_job_are_refused(store):
+    job_id, _ = store.create_or_attach(L1, "a@b.c", "s")
+    assert store.claim("stalled")["id"] == job_id
+    store.requeue_orphans(timeout=0)  # "stalled" never heartbeated
+    assert store.claim("healthy")["id"] == job_id
+
+    with pytest.raises(JobLost):
+        store.advance(job_id, L2, "stalled")
+    with pytest.raises(JobLost):
+        store.record_submission(job_id, L1, "42", _reply(True, L2), "llm", "stalled")
+    with pytest.raises(JobLost):
+        store.finish(job_id, "stalled")
+
+    store.advance(job_id, L2, "healthy")
+    job = store.get(job_id)
+    assert (job["status"], job["worker_id"], job["levels_solved"]) == ("running", "healthy", 1)
+    assert len(store.report(job_id)["submissions"]) == 1  # the stale answer was still sent, so it is logged
+
+
+def test_full_queue_refuses_without_touching_running_jobs(store):
+    first, _ = store.create_or_attach(L1, "a@b.c", "s", max_queued=1)
+    with pytest.raises(QueueFullError):
+        store.create_or_attach(L2, "a@b.c", "s", max_queued=1)
+    assert store.queued() == 1 and len(store.report(first)["submissions"]) == 0
+
+    assert store.claim("w1")["id"] == first  # frees the queue slot
+    again, created = store.create_or_attach(L1, "a@b.c", "s", max_queued=0)
+    assert (again, created) == (first, False)  # retries still attach when the queue is full
+    assert store.get(first)["status"] == "running"
+
+    store.set_status(first, "failed", "boom", "w1")
+    store.create_or_attach(L2, "x@y.z", "s")
+    with pytest.raises(QueueFullError):
+        store.resume(first, max_queued=1)
+    assert store.get(first)["status"] == "failed"
+    assert store.resume(first, max_queued=2)
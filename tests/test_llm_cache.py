@@ -0,0 +1,48 @@
+"""
+The LLM response cache counts one hit or miss per router call, whichever model's reply
+it finds, and a cache locked by another process is skipped rather than waited on.
+"""
+import time
+import sqlite3
+
+from router import ModelRouter, _cache_key
+from tools.result_cache import ResultCache
+
+MODELS = ["big", "backup", "small"]
+MESSAGES = [{"role": "user", "content": "What is 2 + 2?"}]
+KWARGS = {"temperature": 0.1}
+
+
+def _router(tmp_path):
+    return ModelRouter(lambda: None, MODELS, cache=ResultCache("llm", path=str(tmp_path / "cache.sqlite")))
+
+
+def test_miss_is_counted_once(tmp_path):
+    router = _router(tmp_path)
+    assert router._cached(MESSAGES, KWARGS) is None
+    assert router.cache.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+
+def test_hit_prefers_the_first_model(tmp_path):
+    router = _router(tmp_path)
+    router.cache.put(_cache_key("small", MESSAGES, KWARGS), "from small")
+    router.cache.put(_cache_key("backup", MESSAGES, KWARGS), "from backup")
+    assert router._cached(MESSAGES, KWARGS) == "from backup"
+    assert router.cache.stats() == {"hits": 1, "misses": 0, "hit_rate": 1.0}
+
+
+def test_locked_cache_is_a_miss(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResultCache("llm", path=path, timeout=0.2)
+    cache.put("k", "v")
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN EXCLUSIVE")  # another process mid-write
+    try:
+        started = time.time()
+        assert cache.get("k") is None
+        cache.put("k2", "v2")
+        assert time.time() - started < 2
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert cache.get("k") == "v"
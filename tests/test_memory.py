@@ -0,0 +1,35 @@
+"""Compaction keeps the facts later steps need, above all the secret code."""
+import json
+
+from memory import CODE_RE, ConversationMemory, summarize_tool_output
+
+
+def test_code_pattern_takes_the_code_not_the_word():
+    assert CODE_RE.findall("Secret code is 4821") == ["4821"]
+    assert CODE_RE.findall("The secret code is XKCD-abc.") == ["XKCD-abc"]
+    assert CODE_RE.findall('secret code: "a1b2c3"') == ["a1b2c3"]
+    assert CODE_RE.findall("Enter the code below") == []
+
+
+def test_summary_keeps_code_url_and_numbers():
+    page = ("Welcome! " + "filler text " * 100 + "The secret code is 73615. "
+            "Submit to https://example.com/submit with the sum 1234 today.")
+    summary = summarize_tool_output(page)
+    assert "codes: 73615" in summary
+    assert "https://example.com/submit" in summary
+    assert "1234" in summary
+    assert len(summary) < len(page)
+
+
+def test_fit_compacts_old_outputs_but_keeps_the_code():
+    memory = ConversationMemory("system", "task", budget=300, keep_recent=2)
+    memory.add("assistant", json.dumps({"thought": "x" * 200, "tool_name": "navigate", "parameters": {"url": "u"}}))
+    memory.add("user", "Tool Output: " + "noise " * 200 + "Secret code is 4821")
+    memory.add("assistant", json.dumps({"tool_name": "python_repl", "parameters": {"code": "print(1)"}}))
+    memory.add("user", "Tool Output: STDOUT:\n1")
+
+    messages = memory.messages()
+    assert memory.tokens <= 300
+    assert len(messages) == 6  # compaction was enough, nothing was dropped
+    assert "codes: 4821" in messages[3]["content"]
+    assert messages[-1]["content"] == "Tool Output: STDOUT:\n1"
@@ -0,0 +1,64 @@
+"""
+navigate reads a page over plain HTTP only when the HTML source is what the user sees;
+pages that render from scripts go to the browser.
+"""
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from tools import navigation
+from tools.navigation import _needs_browser, _parse_html
+
+URL = "https://quiz.example/level"
+TEXT = "<h1>Quiz level 3 - please read carefully</h1>"
+
+
+@pytest.mark.parametrize("html, needs_browser", [
+    (f"<html><body>{TEXT}<p>Download <a href='data.csv'>data</a></p></body></html>", False),
+    (f"<html><body>{TEXT}<script type='application/json'>{{\"a\": 1}}</script></body></html>", False),
+    (f"<html><body>{TEXT}<script>var x = 1 + 2;</script></body></html>", False),
+    ("<html><body><div id=root></div></body></html>", True),                       # hardly any text
+    (f"<html><body>{TEXT}<div id=root></div><script src='/app.js'></script></body></html>", True),
+    (f"<html><body>{TEXT}<script>document.body.innerHTML += 'x'</script></body></html>", True),
+])
+def test_static_or_browser(html, needs_browser):
+    assert _needs_browser(_parse_html(html, URL)) is needs_browser
+
+
+def test_external_script_src_is_resolved():
+    raw = _parse_html(f"<html><body>{TEXT}<script src='/app.js'></script></body></html>", URL)
+    assert raw["scripts"][0]["src"] == "https://quiz.example/app.js"
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Answers every static fetch with `html`; records whether the browser was used."""
+    state = {"html": "", "browser": 0}
+
+    def handler(request):
+        return httpx.Response(200, text=state["html"], headers={"content-type": "text/html"})
+
+    async def scrape(url):
+        state["browser"] += 1
+        return {"text": "rendered", "source": "browser"}
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(navigation, "get_client", lambda: client)
+    monkeypatch.setattr(navigation, "_scrape", scrape)
+    monkeypatch.setattr(navigation, "NAVIGATE_STATIC", "auto")
+    return state
+
+
+def test_static_page_skips_the_browser(serve):
+    serve["html"] = f"<html><body>{TEXT}<a href='/files/data.csv'>numbers</a></body></html>"
+    page = json.loads(asyncio.run(navigation.navigate(URL)))
+    assert (page["source"], serve["browser"]) == ("static", 0)
+    assert page["links"] == [{"href": "https://quiz.example/files/data.csv", "text": "numbers", "type": "csv"}]
+
+
+def test_script_rendered_page_uses_the_browser(serve):
+    serve["html"] = f"<html><body>{TEXT}<div id=root></div><script src='/app.js'></script></body></html>"
+    page = json.loads(asyncio.run(navigation.navigate(URL)))
+    assert (page["source"], serve["browser"]) == ("browser", 1)
@@ -0,0 +1,112 @@
+"""
+pd.read_csv inside the python_repl worker is served from the columnar cache; it must
+still behave exactly like plain pandas (same dtypes, same arithmetic).
+"""
+import os
+import sys
+import json
+import subprocess
+
+import pandas as pd
+import pytest
+
+WORKER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "repl_worker.py")
+
+CSVS = {
+    "numbers.csv": "5\n50\n100\n120\n",
+    "people.csv": "id,name,joined,score\n1,ann,2024-01-02,1.5\n2,bob,2024-01-03,\n3,ann,2024-02-01,2.0\n",
+    "missing.csv": 'id,name,note\n1,alice,x\n2,,y\n3,NA,""\n4,null,None\n5,bob,n/a\n',
+}
+
+
+@pytest.fixture
+def worker(tmp_path):
+    env = dict(os.environ, DOWNLOAD_CACHE_DIR=str(tmp_path / "cache"))
+    proc = subprocess.Popen([sys.executable, WORKER], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            text=True, env=env)
+    assert json.loads(proc.stdout.readline()) == {"ready": True}
+
+    def run(code):
+        proc.stdin.write(json.dumps({"code": code}) + "\n")
+        proc.stdin.flush()
+        reply = json.loads(proc.stdout.readline())
+        assert reply["ok"], reply["stderr"]
+        return reply["stdout"]
+
+    yield run
+    proc.kill()
+    proc.wait()
+
+
+@pytest.fixture
+def csv_files(tmp_path):
+    paths = {}
+    for name, text in CSVS.items():
+        paths[name] = tmp_path / name
+        paths[name].write_text(text)
+    return paths
+
+
+def _worker_frame(run, path, **kwargs):
+    """dtypes and values of pd.read_csv(path, **kwargs) as computed in the worker (read twice: cold, then cached)."""
+    code = (f"df = pd.read_csv({str(path)!r}, **{kwargs!r})\n"
+            f"df = pd.read_csv({str(path)!r}, **{kwargs!r})\n"
+            "print(json.dumps({'dtypes': {str(c): str(t) for c, t in df.dtypes.items()},"
+            " 'columns': [str(c) for c in df.columns]}))")
+    return json.loads(run(code))
+
+
+@pytest.mark.parametrize("name, kwargs", [("numbers.csv", {"header": None}), ("people.csv", {})])
+def test_read_csv_keeps_pandas_dtypes(worker, csv_files, name, kwargs):
+    expected = pd.read_csv(csv_files[name], **kwargs)
+    got = _worker_frame(worker, csv_files[name], **kwargs)
+    assert got["columns"] == [str(c) for c in expected.columns]
+    assert got["dtypes"] == {str(c): str(t) for c, t in expected.dtypes.items()}
+
+
+def test_read_csv_arithmetic_matches_pandas(worker, csv_files):
+    path = csv_files["numbers.csv"]
+    expected = int((pd.read_csv(path, header=None)[0] * 10).sum())
+    code = f"df = pd.read_csv({str(path)!r}, header=None)\nprint(int((df[0] * 10).sum()))"
+    assert int(worker(code)) == expected == 2750
+    assert int(worker(code)) == expected  # second read comes from the columnar cache
+
+
+def test_read_csv_strings_accept_new_values(worker, csv_files):
+    path = str(csv_files["people.csv"])
+    out = worker(f"df = pd.read_csv({path!r})\ndf.loc[0, 'name'] = 'carl'\nprint(df.loc[0, 'name'])")
+    assert out.strip() == "carl"
+
+
+@pytest.mark.parametrize("reader", ["pd.read_csv({path!r})", "load_table({path!r})"])
+def test_missing_values_match_pandas(worker, csv_files, reader):
+    path = str(csv_files["missing.csv"])
+    expected = pd.read_csv(path)
+    code = (f"df = {reader.format(path=path)}\ndf = {reader.format(path=path)}\n"
+            "print(json.dumps({'isna': df.isna().sum().to_dict(), 'count': df.count().to_dict(),"
+            " 'rows': df.dropna().astype(str).values.tolist()}))")
+    got = json.loads(worker(code))
+    assert got["isna"] == {c: int(n) for c, n in expected.isna().sum().items()} == {"id": 0, "name": 3, "note": 3}
+    assert got["count"] == {c: int(n) for c, n in expected.count().items()}
+    assert got["rows"] == expected.dropna().astype(str).values.tolist()
+
+
+@pytest.mark.parametrize("helper", ["load_table({path!r}, header=None)",
+                                    "pd.concat(iter_chunks({path!r}, batch_rows=2, header=None))"])
+def test_helpers_match_pandas(worker, csv_files, helper):
+    path = str(csv_files["numbers.csv"])
+    expected = pd.read_csv(path, header=None)
+    out = worker(f"df = {helper.format(path=path)}\nprint(df[0].dtype, int((df[0] * 10).sum()))")
+    assert out.split() == [str(expected[0].dtype), str(int((expected[0] * 10).sum()))]
+
+
+def test_compact_dtypes_is_opt_in(worker, csv_files):
+    path = str(csv_files["people.csv"])
+    out = worker(f"print(compact_dtypes(load_table({path!r}))['id'].dtype)")
+    assert out.strip() == "int8"
+
+
+def test_output_written_below_python_is_kept(worker):
+    out = worker("import os, subprocess, sys\nos.system('echo from-shell')\n"
+                 "subprocess.run([sys.executable, '-c', 'print(\"from-child\")'])\nprint('py')")
+    assert out.split() == ["from-shell", "from-child", "py"]
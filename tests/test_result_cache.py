@@ -0,0 +1,63 @@
+"""
+Transcriptions and vision answers are memoized by content hash: entries expire after
+their TTL, each namespace keeps only its most recently used `max_entries`, and the
+same audio served from two URLs is only sent to Whisper once.
+"""
+import time
+import asyncio
+from types import SimpleNamespace
+
+from tools import transcription
+from tools.result_cache import ResultCache
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    cache = ResultCache("vision", path=str(tmp_path / "cache.sqlite"), ttl_seconds=60)
+    cache.put("k", "red")
+    assert cache.get("k") == "red"
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert cache.get("k") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_least_recently_used_entries_are_dropped_per_namespace(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    vision = ResultCache("vision", path=path, max_entries=2)
+    audio = ResultCache("transcription", path=path, max_entries=2)
+    audio.put("a", "hello")
+    vision.put("a", "red")
+    time.sleep(0.01)
+    vision.put("b", "green")
+    time.sleep(0.01)
+    assert vision.get("a") == "red"  # now more recently used than "b"
+    time.sleep(0.01)
+    vision.put("c", "blue")
+    assert [vision.get(k) for k in "abc"] == ["red", None, "blue"]
+    assert audio.get("a") == "hello"  # another namespace's entries are untouched
+
+
+def test_same_audio_at_two_urls_is_transcribed_once(tmp_path, monkeypatch):
+    audio = tmp_path / "a.mp3"
+    audio.write_bytes(b"ID3" + b"\0" * 200)
+    whisper_calls = []
+
+    async def fetch_cached(url):
+        return {"path": str(audio), "filename": "ab" * 32 + ".mp3", "sha256": "ab" * 32, "size": 203}
+
+    async def create(**kwargs):
+        whisper_calls.append(kwargs["file"][0])
+        return SimpleNamespace(text="the cutoff is 10")
+
+    groq = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(transcription, "fetch_cached", fetch_cached)
+    monkeypatch.setattr(transcription, "get_groq", lambda: groq)
+    monkeypatch.setattr(transcription, "results", ResultCache("transcription", path=str(tmp_path / "cache.sqlite")))
+
+    async def scenario():
+        return [await transcription.transcribe_audio(url)
+                for url in ("https://quiz.example/a.mp3", "https://mirror.example/audio?id=1")]
+
+    assert asyncio.run(scenario()) == ["TRANSCRIPTION: the cutoff is 10"] * 2
+    assert whisper_calls == ["audio.mp3"]
+    assert transcription.results.stats()["hits"] == 1
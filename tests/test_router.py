@@ -0,0 +1,140 @@
+"""
+The router against a fake Groq API: a rate-limited model cools down for its retry-after
+and is skipped meanwhile, a decommissioned or missing model is retired for good, a model
+that rejects one request is only skipped for that request, and when every model is
+cooling down the router waits for the first reset, or gives up if that is too far off.
+"""
+import json
+import time
+import asyncio
+
+import groq
+import httpx
+import pytest
+
+from router import ModelRouter, ModelState, parse_duration
+
+MESSAGES = [{"role": "user", "content": "What is 2 + 2?"}]
+
+
+def _completion(model):
+    return httpx.Response(200, json={
+        "id": "c", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": f"from {model}"},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+    })
+
+
+def _rate_limited(retry_after):
+    return httpx.Response(429, headers={"retry-after": retry_after},
+                          json={"error": {"message": "Rate limit reached", "code": "rate_limit_exceeded"}})
+
+
+class FakeGroq:
+    """Answers with the next scripted reply for the requested model (a completion once the script runs out)."""
+
+    def __init__(self, **scripts):
+        self.scripts = scripts
+        self.calls = []
+
+    def handle(self, request):
+        model = json.loads(request.content)["model"]
+        self.calls.append(model)
+        script = self.scripts.get(model) or []
+        return script.pop(0) if script else _completion(model)
+
+    def router(self, models, **kwargs):
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        return ModelRouter(lambda: groq.AsyncGroq(api_key="test", base_url="http://groq.test",
+                                                  http_client=http_client), models, **kwargs)
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("7.66s", 7.66), ("2m59.56s", 179.56), ("120ms", 0.12), ("1h", 3600), ("3", 3.0), (None, 0.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+def test_backoff_doubles_until_a_success():
+    state = ModelState("m")
+    state.backoff(100.0)
+    assert 102.0 <= state.cooldown_until <= 102.5
+    state.backoff(100.0)
+    assert 104.0 <= state.cooldown_until <= 105.0
+    assert not state.available(103.0, 10) and state.available(105.0, 10)
+    state.backoff(100.0, retry_after=7.5)
+    assert 107.5 <= state.cooldown_until <= 109.5
+
+
+def test_rate_limited_model_is_skipped_until_its_retry_after():
+    api = FakeGroq(big=[_rate_limited("20s")])
+    router = api.router(["big", "small"])
+
+    async def scenario():
+        return [await router.complete(MESSAGES), await router.complete(MESSAGES)]
+
+    assert asyncio.run(scenario()) == ["from small", "from small"]
+    assert api.calls == ["big", "small", "small"]  # no second try on "big" while it cools down
+    assert router.models["big"].cooldown_until >= time.time() + 15
+    assert router.models["big"].rate_limited == 1
+
+
+@pytest.mark.parametrize("reply", [
+    httpx.Response(404, json={"error": {"message": "The model `big` does not exist", "code": "model_not_found"}}),
+    httpx.Response(400, json={"error": {"message": "The model `big` has been decommissioned",
+                                        "code": "model_decommissioned"}}),
+])
+def test_missing_or_decommissioned_model_is_retired(reply):
+    api = FakeGroq(big=[reply])
+    router = api.router(["big", "small"])
+
+    async def scenario():
+        return [await router.complete(MESSAGES), await router.complete(MESSAGES)]
+
+    assert asyncio.run(scenario()) == ["from small", "from small"]
+    assert api.calls == ["big", "small", "small"]
+    assert router.models["big"].retired
+
+
+def test_rejected_request_only_skips_the_model_for_that_request():
+    too_long = httpx.Response(400, json={"error": {"message": "Please reduce the length of the messages",
+                                                   "code": "context_length_exceeded"}})
+    api = FakeGroq(big=[too_long])
+    router = api.router(["big", "small"])
+
+    async def scenario():
+        return [await router.complete(MESSAGES), await router.complete(MESSAGES)]
+
+    assert asyncio.run(scenario()) == ["from small", "from big"]
+    assert api.calls == ["big", "small", "big"]
+    assert not router.models["big"].retired
+
+
+def test_every_model_rejecting_the_request_is_critical():
+    bad = httpx.Response(400, json={"error": {"message": "Invalid request", "code": "invalid_request"}})
+    api = FakeGroq(big=[bad], small=[bad])
+    router = api.router(["big", "small"])
+    with pytest.raises(Exception, match="CRITICAL"):
+        asyncio.run(router.complete(MESSAGES))
+    assert api.calls == ["big", "small"]
+
+
+def test_waits_for_the_first_reset_when_all_models_are_cooling_down():
+    api = FakeGroq(big=[_rate_limited("0.2s")], small=[_rate_limited("5s")])
+    router = api.router(["big", "small"], max_wait=3)
+    started = time.time()
+    assert asyncio.run(router.complete(MESSAGES)) == "from big"
+    assert 0.2 <= time.time() - started < 2
+    assert api.calls == ["big", "small", "big"]
+
+
+def test_gives_up_when_the_first_reset_is_past_max_wait():
+    api = FakeGroq(big=[_rate_limited("30s")], small=[_rate_limited("45s")])
+    router = api.router(["big", "small"], max_wait=1)
+    started = time.time()
+    with pytest.raises(Exception, match="CRITICAL"):
+        asyncio.run(router.complete(MESSAGES))
+    assert time.time() - started < 1
+    assert api.calls == ["big", "small"]
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from rules import PageContext, SecretCodeRule, CsvCutoffRule
+
+
+def secret_code(text):
+    ctx = PageContext("https://quiz.example/level", {"text": text}, "a@example.com")
+    return asyncio.run(SecretCodeRule().answer(ctx))
+
+
+@pytest.mark.parametrize("text", [
+    "The secret code is on the linked page.",
+    "Scrape the file: the secret code is hidden in /data",
+    "Your secret code is: the number of rows in the table.",
+])
+def test_prose_is_not_a_code(text):
+    assert secret_code(text) is None
+
+
+@pytest.mark.parametrize("text, code", [
+    ("Secret code is 4821", "4821"),
+    ("The secret code is: abc-19 (submit it as a string)", "abc-19"),
+    ('The secret code is "banana".', "banana"),
+    ("the secret code is 'open_sesame'", "open_sesame"),
+    ("THE SECRET CODE IS XKCD", "XKCD"),
+    ("The secret code is on the linked page. Later: the secret code is 77aa", "77aa"),
+])
+def test_code_like_tokens(text, code):
+    assert secret_code(text) == code
+
+
+def test_csv_rule_ignores_links_that_only_mention_csv(monkeypatch, tmp_path):
+    data = tmp_path / "data.csv"
+    data.write_text("5\n12\n30\n")
+    fetched = []
+
+    def tool(name):
+        async def run(url):
+            fetched.append(url)
+            return {"path": str(data)}
+        return run
+
+    monkeypatch.setattr("rules.get_tool", tool)
+    links = [{"href": "https://quiz.example/help", "text": "How to read a CSV", "type": "page"},
+             {"href": "https://quiz.example/export?format=csv", "text": "csv export", "type": "page"}]
+    page = {"text": "Sum the first column above the cutoff: 10", "links": links}
+    ctx = PageContext("https://quiz.example/level", page, "a@example.com")
+    assert asyncio.run(CsvCutoffRule().answer(ctx)) is None and fetched == []
+
+    page["links"] = links + [{"href": "/files/data.CSV?v=2", "text": "data", "type": "csv"}]
+    ctx = PageContext("https://quiz.example/level", page, "a@example.com")
+    assert asyncio.run(CsvCutoffRule().answer(ctx)) == 42
+    assert fetched == ["https://quiz.example/files/data.CSV?v=2"]
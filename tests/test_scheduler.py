@@ -0,0 +1,87 @@
+"""
+The scheduler runs queued quizzes oldest first, never more than `max_concurrent` at a
+time on one event loop; a crashed quiz fails without stopping the others, and a clean
+shutdown puts unfinished quizzes back on the queue.
+"""
+import json
+import asyncio
+
+import pytest
+
+import scheduler as scheduler_module
+from jobs import JobStore
+from scheduler import QuizScheduler
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(scheduler_module, "job_store", store)
+    monkeypatch.setattr(scheduler_module, "QUEUE_POLL_SECONDS", 0.02)
+    return store
+
+
+def _fake_solver(store, monkeypatch, seconds=0.05, crash=()):
+    """Replaces solve_quiz; returns the log of started URLs and the most quizzes seen running at once."""
+    seen = {"started": [], "running": 0, "most": 0}
+
+    async def solve_quiz(url, email, secret, job_id=None, started_at=None, worker_id=None):
+        seen["started"].append(url)
+        seen["running"] += 1
+        seen["most"] = max(seen["most"], seen["running"])
+        try:
+            await asyncio.sleep(seconds)
+            if url in crash:
+                raise RuntimeError("browser died")
+            store.record_submission(job_id, url, "42", json.dumps({"correct": True, "url": None}), "llm", worker_id)
+        finally:
+            seen["running"] -= 1
+
+    monkeypatch.setattr(scheduler_module, "solve_quiz", solve_quiz)
+    return seen
+
+
+def _enqueue(store, count):
+    return [store.create_or_attach(f"https://quiz.example/{i}", "a@b.c", "s")[0] for i in range(count)]
+
+
+async def _run_until_idle(quiz_scheduler, store):
+    quiz_scheduler.start()
+    while store.queued() or quiz_scheduler.running:
+        await asyncio.sleep(0.01)
+    await quiz_scheduler.stop()
+
+
+def test_quizzes_start_oldest_first_within_the_concurrency_limit(store, monkeypatch):
+    seen = _fake_solver(store, monkeypatch)
+    job_ids = _enqueue(store, 5)
+    asyncio.run(_run_until_idle(QuizScheduler(max_concurrent=2), store))
+
+    assert seen["started"] == [f"https://quiz.example/{i}" for i in range(5)]
+    assert seen["most"] == 2
+    assert [store.get(j)["status"] for j in job_ids] == ["completed"] * 5
+
+
+def test_crashed_quiz_fails_alone(store, monkeypatch):
+    _fake_solver(store, monkeypatch, crash={"https://quiz.example/0"})
+    crashed, healthy = _enqueue(store, 2)
+    asyncio.run(_run_until_idle(QuizScheduler(max_concurrent=1), store))
+
+    assert (store.get(crashed)["status"], store.get(crashed)["error"]) == ("failed", "browser died")
+    assert store.get(healthy)["status"] == "completed"
+
+
+def test_shutdown_requeues_running_quizzes(store, monkeypatch):
+    _fake_solver(store, monkeypatch, seconds=10)
+    job_ids = _enqueue(store, 3)
+
+    async def scenario():
+        quiz_scheduler = QuizScheduler(max_concurrent=2)
+        quiz_scheduler.start()
+        while quiz_scheduler.running < 2:
+            await asyncio.sleep(0.01)
+        await quiz_scheduler.stop()
+
+    asyncio.run(scenario())
+    assert [store.get(j)["status"] for j in job_ids] == ["queued"] * 3
+    assert store.position(job_ids[2]) == 0  # the one never started is still first in line
@@ -0,0 +1,87 @@
+"""
+Spans nest under the span that was open when they started, each quiz task collects
+its own trace, failures are marked, and /metrics renders valid Prometheus text.
+"""
+import asyncio
+
+import pytest
+
+import tracing
+from tracing import Metrics, span, traced, start_trace, end_trace
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    fresh = Metrics()
+    monkeypatch.setattr(tracing, "metrics", fresh)
+    return fresh
+
+
+def test_spans_nest_and_failures_are_marked(metrics):
+    @traced("tool.echo")
+    async def echo(text):
+        return text * 2
+
+    async def quiz():
+        trace = start_trace("https://quiz.example/1")
+        with span("agent.step", step=1) as step:
+            await echo("abc")
+            with pytest.raises(ValueError):
+                with span("llm.call", model="m"):
+                    raise ValueError("bad reply")
+        end_trace(trace)
+        return trace, step
+
+    trace, step = asyncio.run(quiz())
+    spans = {s.name: s for s in trace.spans}
+    assert [s.name for s in trace.spans] == ["tool.echo", "llm.call", "agent.step"]  # in finishing order
+    assert spans["tool.echo"].parent == spans["llm.call"].parent == step.id and step.parent is None
+    assert spans["tool.echo"].attrs == {"bytes_in": 3, "bytes_out": 6}
+    assert (spans["llm.call"].status, step.status) == ("error", "ok")
+    report = trace.to_dict()
+    assert report["finished"] and report["spans"][0]["name"] == "tool.echo"
+    assert set(report["time_by_span"]) == {"tool.echo", "llm.call", "agent.step"}
+
+
+def test_concurrent_quizzes_keep_separate_traces(metrics):
+    async def quiz(url):
+        trace = start_trace(url)
+        for _ in range(3):
+            with span("agent.step"):
+                await asyncio.sleep(0.01)
+        return trace
+
+    async def scenario():
+        return await asyncio.gather(quiz("https://quiz.example/a"), quiz("https://quiz.example/b"))
+
+    first, second = asyncio.run(scenario())
+    assert len(first.spans) == len(second.spans) == 3
+    assert tracing.traces[first.id] is first and tracing.traces[second.id] is second
+
+
+def test_prometheus_rendering(metrics):
+    metrics.inc("llm_tokens_total", 5, help="Tokens used per model.", model="big", kind="prompt")
+    metrics.inc("llm_tokens_total", 2, help="Tokens used per model.", model="big", kind="prompt")
+    metrics.observe("quiz_span_seconds", 0.3, help="Span durations.", span="tool.navigate")
+    metrics.observe("quiz_span_seconds", 4, help="Span durations.", span="tool.navigate")
+    lines = metrics.render().splitlines()
+
+    assert lines[:3] == ["# HELP llm_tokens_total Tokens used per model.", "# TYPE llm_tokens_total counter",
+                         'llm_tokens_total{kind="prompt",model="big"} 7']
+    assert "# TYPE quiz_span_seconds histogram" in lines
+    buckets = {line.split('le="')[1].split('"')[0]: int(line.rsplit(" ", 1)[1])
+               for line in lines if line.startswith("quiz_span_seconds_bucket")}
+    assert (buckets["0.25"], buckets["0.5"], buckets["5"], buckets["+Inf"]) == (0, 1, 2, 2)  # cumulative
+    assert 'quiz_span_seconds_sum{span="tool.navigate"} 4.300000' in lines
+    assert 'quiz_span_seconds_count{span="tool.navigate"} 2' in lines
+
+
+def test_spans_feed_the_metrics(metrics):
+    with pytest.raises(RuntimeError):
+        with span("tool.navigate") as s:
+            s.set(bytes_in=10, bytes_out=300)
+            raise RuntimeError("timeout")
+    text = metrics.render()
+    assert 'quiz_spans_total{span="tool.navigate",status="error"} 1' in text
+    assert 'quiz_payload_bytes_total{direction="out",span="tool.navigate"} 300' in text
+    assert 'quiz_span_seconds_count{span="tool.navigate"} 1' in text
@@ -1,5 +1,36 @@
-from .navigation import navigate
-from .execution import python_repl
-from .submission import submit_answer
-from .transcription import transcribe_audio
-from .vision import analyze_image 
\ No newline at end of file
+"""
+Tool registry. Tool modules are imported on first use, so importing the service
+does not load Playwright, BeautifulSoup, Pillow or the Groq SDK until a quiz
+actually needs them.
+"""
+import sys
+import importlib
+
+# name -> (module in this package, attribute)
+REGISTRY = {
+    "navigate": ("navigation", "navigate"),
+    "python_repl": ("execution", "python_repl"),
+    "end_python_session": ("execution", "end_python_session"),
+    "submit_answer": ("submission", "submit_answer"),
+    "transcribe_audio": ("transcription", "transcribe_audio"),
+    "analyze_image": ("vision", "analyze_image"),
+    "fetch_cached": ("fetch", "fetch_cached"),  # not an LLM tool; used by rules and prefetch
+}
+
+
+def get_tool(name):
+    """The tool function, importing its module the first time."""
+    module, attribute = REGISTRY[name]
+    return getattr(importlib.import_module(f"{__name__}.{module}"), attribute)
+
+
+def loaded(module):
+    """The tool module if something already imported it, else None (for stats and shutdown)."""
+    return sys.modules.get(f"{__name__}.{module}")
+
+
+def __getattr__(name):
+    # `from tools import navigate` still works; it just loads the module at that point.
+    if name in REGISTRY:
+        return get_tool(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
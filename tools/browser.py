@@ -0,0 +1,184 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from deadline import tool_timeout
+from .fetch import fetch_cached
+
+# --- POOL SETTINGS ---
+# How many pages may be open at once across all quizzes.
+MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "4"))
+# Relaunch Chromium after it has served this many pages (keeps memory in check).
+RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "50"))
+# Longest wait for a free page slot; less when the level is nearly out of time.
+PAGE_WAIT_TIMEOUT = 60
+
+# Resolves once the DOM has been quiet for `quiet` ms, or after `cap` ms at most.
+# Replaces the old fixed 2 s `wait_for_timeout` used for JS hydration.
+SETTLE_SCRIPT = """([quiet, cap]) => new Promise(resolve => {
+    let timer = null;
+    const done = () => { obs.disconnect(); clearTimeout(timer); clearTimeout(hard); resolve(); };
+    const obs = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(done, quiet); });
+    const hard = setTimeout(done, cap);
+    obs.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(done, quiet);
+})"""
+
+# Static sub-resources served from the shared download cache instead of the network.
+CACHED_RESOURCES = {"script", "stylesheet"}
+
+
+async def _route_request(route):
+    request = route.request
+    if request.method == "GET" and request.resource_type in CACHED_RESOURCES:
+        try:
+            entry = await fetch_cached(request.url)
+            return await route.fulfill(path=entry["path"], content_type=entry["content_type"])
+        except Exception:
+            pass  # Let the browser fetch it normally
+    await route.continue_()
+
+
+class BrowserPool:
+    """
+    One long-lived headless Chromium shared by every quiz.
+    Pages are checked out with `async with pool.page() as page:` and reused.
+    The browser is relaunched after RECYCLE_AFTER pages or when it crashes.
+    """
+
+    def __init__(self, max_pages=MAX_PAGES, recycle_after=RECYCLE_AFTER):
+        self.max_pages = max_pages
+        self.recycle_after = recycle_after
+        self._playwright = None
+        self._browser = None
+        self._served = 0
+        self.launches = 0        # Chromium starts since boot (recycles and crashes included)
+        self._idle = []          # pages of the current browser ready for reuse
+        self._in_use = {}        # browser -> number of pages checked out
+        self._retired = set()    # old browsers waiting for their last page
+        self._semaphore = None
+        self._lock = None
+
+    async def _ensure_browser(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_pages)
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            healthy = self._browser is not None and self._browser.is_connected()
+            if healthy and self._served < self.recycle_after:
+                return self._browser
+
+            if self._browser is not None:
+                reason = "recycling" if healthy else "crashed, relaunching"
+                print(f"[Browser] Chromium {reason} after {self._served} pages.")
+                await self._retire(self._browser)
+
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self.launches += 1
+            self._served = 0
+            self._idle = []
+            return self._browser
+
+    async def _retire(self, browser):
+        for page in self._idle:
+            await self._close_quietly(page.context)
+        self._idle = []
+        if self._in_use.get(browser, 0) > 0:
+            self._retired.add(browser)
+        else:
+            self._in_use.pop(browser, None)
+            await self._close_quietly(browser)
+
+    async def _checkout(self):
+        browser = await self._ensure_browser()
+        self._served += 1
+        page = None
+        while self._idle:
+            candidate = self._idle.pop()
+            if not candidate.is_closed():
+                page = candidate
+                break
+        if page is None:
+            context = await browser.new_context()
+            await context.route("**/*", _route_request)
+            page = await context.new_page()
+        self._in_use[browser] = self._in_use.get(browser, 0) + 1
+        return browser, page
+
+    async def _release(self, browser, page, healthy):
+        self._in_use[browser] -= 1
+        reusable = healthy and browser is self._browser and browser.is_connected() and not page.is_closed()
+        if reusable:
+            self._idle.append(page)
+        else:
+            await self._close_quietly(page.context)
+
+        if browser in self._retired and self._in_use[browser] == 0:
+            self._retired.discard(browser)
+            self._in_use.pop(browser, None)
+            await self._close_quietly(browser)
+
+    @property
+    def ready(self):
+        """True while a launched Chromium is connected."""
+        return self._browser is not None and self._browser.is_connected()
+
+    async def warm(self):
+        """Launches Chromium ahead of the first navigate (called from startup when BROWSER_WARMUP=1)."""
+        await self._ensure_browser()
+        print("[Browser] Chromium warm.")
+
+    @asynccontextmanager
+    async def page(self):
+        """A page from the pool; raises asyncio.TimeoutError if no slot frees up within tool_timeout()."""
+        await self._ensure_browser()
+        await asyncio.wait_for(self._semaphore.acquire(), tool_timeout(PAGE_WAIT_TIMEOUT))
+        try:
+            browser, page = await self._checkout()
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                await self._release(browser, page, healthy)
+        finally:
+            self._semaphore.release()
+
+    async def settle(self, page, quiet_ms=300, cap_ms=2000):
+        """Waits until the DOM stops changing instead of sleeping a fixed time (never past tool_timeout())."""
+        try:
+            await asyncio.wait_for(page.evaluate(SETTLE_SCRIPT, [quiet_ms, cap_ms]), tool_timeout(cap_ms / 1000 + 1))
+        except Exception:
+            pass  # Navigation mid-wait or closed page: the caller reads what is there
+
+    async def close(self):
+        for page in self._idle:
+            await self._close_quietly(page.context)
+        self._idle = []
+        for browser in list(self._retired) + [self._browser]:
+            if browser is not None:
+                await self._close_quietly(browser)
+        self._retired.clear()
+        self._in_use.clear()
+        self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @staticmethod
+    async def _close_quietly(target):
+        try:
+            await target.close()
+        except Exception:
+            pass
+
+
+pool = BrowserPool()
+
+
+async def shutdown():
+    """Closes the shared browser. Safe to call if it was never started."""
+    await pool.close()
@@ -0,0 +1,239 @@
+"""
+Content-addressed on-disk cache for downloaded assets (CSV, audio, images, scripts).
+
+Bodies are stored once per sha256 under CACHE_DIR/objects; a small SQLite index maps
+each URL to its blob plus the ETag/Last-Modified needed to revalidate it. The
+index is plain sqlite3 (WAL) so the async fetch layer and the python_repl workers
+(separate processes) can share it; async callers use it from a thread. A lock held
+by another process past INDEX_TIMEOUT_SECONDS turns a lookup into a miss and skips
+bookkeeping writes, rather than failing the download. The directory must be on a
+local disk (SQLite WAL does not work over network filesystems).
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "quiz_download_cache"))
+MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MB", "512")) * 1024 * 1024
+# Within this window a cached URL is served without asking the server at all.
+FRESH_SECONDS = int(os.getenv("DOWNLOAD_CACHE_FRESH_SECONDS", "300"))
+# Single downloads larger than this are aborted mid-stream.
+MAX_DOWNLOAD_BYTES = int(os.getenv("DOWNLOAD_MAX_MB", "100")) * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+INDEX_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_CACHE_TIMEOUT_SECONDS", "2"))
+
+# Leading bytes -> (extension, mime type), for assets whose URL does not say what they are.
+MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"GIF8", ".gif", "image/gif"),
+    (b"%PDF", ".pdf", "application/pdf"),
+    (b"ID3", ".mp3", "audio/mpeg"),
+    (b"\xff\xfb", ".mp3", "audio/mpeg"),
+    (b"\xff\xf3", ".mp3", "audio/mpeg"),
+    (b"\xff\xf2", ".mp3", "audio/mpeg"),
+    (b"OggS", ".ogg", "audio/ogg"),
+    (b"fLaC", ".flac", "audio/flac"),
+    (b"\x1a\x45\xdf\xa3", ".webm", "audio/webm"),
+    (b"PK\x03\x04", ".zip", "application/zip"),
+]
+
+
+class DownloadTooLarge(Exception):
+    """Raised when a download exceeds the per-file byte limit."""
+    def __init__(self, url, limit):
+        super().__init__(f"Download of {url} exceeds {limit // (1024 * 1024)} MB")
+
+
+def sniff(path):
+    """(extension, mime type) from the file's leading bytes, or ("", None) if unknown."""
+    with open(path, "rb") as f:
+        head = f.read(16)
+    for magic, ext, mime in MAGIC:
+        if head.startswith(magic):
+            return ext, mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return ".wav", "audio/wav"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    if head[4:8] == b"ftyp":
+        return ".m4a", "audio/mp4"
+    return "", None
+
+
+class BlobWriter:
+    """Streams one download into a unique temp file, hashing as it goes and enforcing the size limit."""
+
+    def __init__(self, cache, url, max_bytes=MAX_DOWNLOAD_BYTES):
+        self.url = url
+        self.max_bytes = max_bytes
+        fd, self.tmp = tempfile.mkstemp(suffix=".part", dir=os.path.join(cache.root, "objects"))
+        self.file = os.fdopen(fd, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise DownloadTooLarge(self.url, self.max_bytes)
+        self.hash.update(chunk)
+        self.file.write(chunk)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp)
+        except OSError:
+            pass
+
+
+class DownloadCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES, fresh_seconds=FRESH_SECONDS,
+                 timeout=INDEX_TIMEOUT_SECONDS):
+        self.root = root
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        with self._db() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY, filename TEXT, size INTEGER, content_type TEXT,
+                etag TEXT, last_modified TEXT, checked_at REAL, used_at REAL)""")
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+
+    @contextmanager
+    def _db(self):
+        db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=self.timeout)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:  # commit on success
+                yield db
+        finally:
+            db.close()
+
+    def path_for(self, filename):
+        return os.path.join(self.root, "objects", filename)
+
+    def lookup(self, url):
+        """Returns the index entry (with a `path`) or None if missing, its blob is gone or the index is locked."""
+        try:
+            with self._db() as db:
+                row = db.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+        except sqlite3.OperationalError as e:
+            print(f"[Cache] Index busy, treating {url} as a miss ({e}).")
+            return None
+        if row is None:
+            return None
+        entry = self._with_path(dict(row))
+        return entry if os.path.exists(entry["path"]) else None
+
+    def _with_path(self, entry):
+        entry["path"] = self.path_for(entry["filename"])
+        entry["sha256"] = entry["filename"][:64]
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry["checked_at"] < self.fresh_seconds
+
+    def validators(self, entry):
+        """Conditional request headers for revalidating a cached entry."""
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, url, revalidated=False):
+        now = time.time()
+        try:
+            with self._db() as db:
+                if revalidated:
+                    db.execute("UPDATE entries SET used_at = ?, checked_at = ? WHERE url = ?", (now, now, url))
+                else:
+                    db.execute("UPDATE entries SET used_at = ? WHERE url = ?", (now, url))
+        except sqlite3.OperationalError as e:
+            print(f"[Cache] Index busy, not touching {url} ({e}).")
+
+    def writer(self, url, content_length=None):
+        """A BlobWriter for `url`; fails fast if the declared length is already over the limit."""
+        if content_length and int(content_length) > MAX_DOWNLOAD_BYTES:
+            raise DownloadTooLarge(url, MAX_DOWNLOAD_BYTES)
+        return BlobWriter(self, url)
+
+    def commit(self, url, writer, headers):
+        """Moves a finished BlobWriter's file under its content hash and indexes it for `url`."""
+        writer.file.close()
+        filename = writer.hash.hexdigest() + (_extension(url) or sniff(writer.tmp)[0])
+        path = self.path_for(filename)
+        if os.path.exists(path):
+            os.remove(writer.tmp)
+        else:
+            os.replace(writer.tmp, path)
+        return self._index(url, filename, writer.size, headers)
+
+    def store_stream(self, url, chunks, headers):
+        """Saves an iterable of body chunks (see BlobWriter) and indexes it for `url`."""
+        writer = self.writer(url, headers.get("content-length"))
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return self.commit(url, writer, headers)
+
+    def _index(self, url, filename, size, headers):
+        now = time.time()
+        entry = {"url": url, "filename": filename, "size": size, "content_type": headers.get("content-type"),
+                 "etag": headers.get("etag"), "last_modified": headers.get("last-modified"),
+                 "checked_at": now, "used_at": now}
+        try:
+            with self._db() as db:
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", tuple(entry.values()))
+            self.evict(keep=filename)
+        except sqlite3.OperationalError as e:
+            # The blob is in place; only the index entry is missing, so the next lookup downloads again.
+            print(f"[Cache] Index busy, {url} not indexed ({e}).")
+        return self._with_path(entry)
+
+    def evict(self, keep=None):
+        """Drops least-recently-used URLs until the blobs fit in max_bytes (never `keep`)."""
+        with self._db() as db:
+            rows = db.execute("""SELECT filename, MAX(size) AS size, MAX(used_at) AS used_at
+                                 FROM entries GROUP BY filename ORDER BY used_at""").fetchall()
+            total = sum(r["size"] for r in rows)
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                if row["filename"] == keep:
+                    continue
+                db.execute("DELETE FROM entries WHERE filename = ?", (row["filename"],))
+                try:
+                    os.remove(self.path_for(row["filename"]))
+                except OSError:
+                    pass
+                self._drop_conversions(row["filename"][:64])
+                total -= row["size"]
+
+    def _drop_conversions(self, digest):
+        """Removes columnar copies of an evicted blob (see tabular.py)."""
+        columnar = os.path.join(self.root, "columnar")
+        if os.path.isdir(columnar):
+            for name in os.listdir(columnar):
+                if name.startswith(digest):
+                    try:
+                        os.remove(os.path.join(columnar, name))
+                    except OSError:
+                        pass
+
+
+def _extension(url):
+    # Keep the URL's extension so pandas & co. can still infer the format/compression.
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    return ext if 0 < len(ext) <= 8 else ""
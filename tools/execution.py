@@ -1,29 +1,252 @@
+import os
 import sys
-import subprocess
+import json
+import time
+import asyncio
+import psutil
+from tracing import traced
+from deadline import tool_timeout
 
-def python_repl(code: str) -> str:
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "repl_worker.py")
+
+# --- POOL SETTINGS ---
+POOL_SIZE = int(os.getenv("REPL_WORKERS", "2"))
+# Recycle a worker after this many snippets or once it grows past this much memory.
+MAX_JOBS_PER_WORKER = int(os.getenv("REPL_MAX_JOBS", "50"))
+MAX_WORKER_MEMORY_MB = int(os.getenv("REPL_MAX_MEMORY_MB", "1024"))
+TIMEOUT = 45
+
+
+class ReplWorker:
+    """One warm interpreter process running tools/repl_worker.py."""
+
+    started = 0  # Interpreter processes launched since boot
+
+    def __init__(self):
+        self.proc = None
+        self.jobs = 0
+
+    async def start(self):
+        ReplWorker.started += 1
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=64 * 1024 * 1024,  # Replies are single JSON lines; allow large prints
+        )
+        if not await self.proc.stdout.readline():  # {"ready": true} once pandas & co. are imported
+            await self.kill()
+            raise RuntimeError("Python worker exited during startup")
+        return self
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.returncode is None
+
+    def memory_mb(self):
+        try:
+            return psutil.Process(self.proc.pid).memory_info().rss / (1024 * 1024)
+        except psutil.Error:
+            return 0
+
+    async def run(self, code, persist=False):
+        self.jobs += 1
+        self.proc.stdin.write((json.dumps({"code": code, "persist": persist}) + "\n").encode())
+        await self.proc.stdin.drain()
+        line = await self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError("Python worker exited unexpectedly")
+        return json.loads(line)
+
+    async def kill(self):
+        if self.alive:
+            self.proc.kill()
+            await self.proc.wait()
+
+
+class ReplPool:
     """
-    Executes Python code in a subprocess.
-    Auto-injects imports for pandas, requests, and numpy to ensure robustness.
+    Pre-started Python workers that already have pandas, numpy and requests imported.
+    Snippets run on any idle worker; a session pins one worker to a quiz so its
+    variables (e.g. a loaded DataFrame) survive between python_repl calls.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_jobs=MAX_JOBS_PER_WORKER, max_memory_mb=MAX_WORKER_MEMORY_MB):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_memory_mb = max_memory_mb
+        self._idle = None
+        self._count = 0       # shared workers idle, running a snippet or starting up
+        self._starting = None
+        self._sessions = {}   # session id -> ReplWorker
+        self._session_locks = {}
+        self.ready = False    # True once the first workers have imported pandas & co.
+
+    async def start(self):
+        """
+        Warms up the pool. Called at server startup, or lazily on first use; concurrent
+        callers share one warm-up, and after a failed one the next call tries again.
+        """
+        if self._idle is not None:
+            return
+        if self._starting is None or self._starting.done():
+            self._starting = asyncio.ensure_future(self._start())
+        await asyncio.shield(self._starting)  # a caller timing out must not abort the warm-up for the rest
+
+    async def _start(self):
+        results = await asyncio.gather(*(ReplWorker().start() for _ in range(self.size)), return_exceptions=True)
+        workers = [r for r in results if isinstance(r, ReplWorker)]
+        if not workers:
+            raise RuntimeError(f"No Python worker could start: {results[0]}")
+        idle = asyncio.Queue()
+        for worker in workers:
+            idle.put_nowait(worker)
+        # Only now: a pool whose warm-up failed must not look started with an empty queue.
+        self._idle, self._count = idle, len(workers)
+        self.ready = True
+        print(f"[Python] {len(workers)} warm workers ready.")
+
+    async def _spawn_into_pool(self):
+        self._count += 1
+        try:
+            self._idle.put_nowait(await ReplWorker().start())
+        except Exception as e:
+            self._count -= 1  # the next checkout starts one on demand
+            print(f"[Python] Could not start a replacement worker: {e}")
+
+    async def _checkout(self):
+        """An idle shared worker; starts one if failed spawns left the pool below `size`."""
+        await self.start()
+        if self._idle.empty() and self._count < self.size:
+            self._count += 1
+            worker = ReplWorker()
+            try:
+                return await worker.start()
+            except BaseException:  # including the caller's timeout
+                self._count -= 1
+                await worker.kill()
+                raise
+        return await self._idle.get()
+
+    def _retire(self, worker):
+        """`worker` leaves the shared pool (worn out, or pinned to a session); a replacement is started."""
+        self._count -= 1
+        asyncio.create_task(self._spawn_into_pool())
+
+    def _worn_out(self, worker):
+        return (not worker.alive or worker.jobs >= self.max_jobs
+                or worker.memory_mb() > self.max_memory_mb)
+
+    async def _execute(self, worker, code, persist, timeout):
+        """Runs one snippet; returns (reply, worker_still_usable)."""
+        try:
+            return await asyncio.wait_for(worker.run(code, persist), timeout=timeout), True
+        except asyncio.TimeoutError:
+            await worker.kill()
+            return {"error": f"Command timed out after {timeout} seconds"}, False
+        except Exception as e:
+            await worker.kill()
+            return {"error": str(e)}, False
+
+    async def run(self, code, session=None, timeout=TIMEOUT):
+        """Runs `code`; `timeout` covers waiting for a free worker as well as the run itself."""
+        deadline = time.monotonic() + timeout
+        if session:
+            return await self._run_in_session(code, session, timeout, deadline)
+
+        try:
+            worker = await asyncio.wait_for(self._checkout(), timeout)
+        except asyncio.TimeoutError:
+            return {"error": f"No Python worker became free within {timeout} seconds"}
+        reply, usable = await self._execute(worker, code, False, _left(deadline))
+        if usable and not self._worn_out(worker):
+            self._idle.put_nowait(worker)
+        else:
+            await worker.kill()
+            self._retire(worker)
+        return reply
+
+    async def _run_in_session(self, code, session, timeout, deadline):
+        lock = self._session_locks.setdefault(session, asyncio.Lock())
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return {"error": f"Session still busy after {timeout} seconds"}
+        try:
+            worker = self._sessions.get(session)
+            note = ""
+            if worker is None or not worker.alive:
+                if worker is not None:
+                    note = "[Session reset: earlier variables were lost]\n"
+                # Take a warm worker for this quiz and backfill the shared pool.
+                try:
+                    worker = await asyncio.wait_for(self._checkout(), _left(deadline))
+                except asyncio.TimeoutError:
+                    return {"error": f"No Python worker became free within {timeout} seconds"}
+                self._retire(worker)
+                self._sessions[session] = worker
+
+            reply, usable = await self._execute(worker, code, True, _left(deadline))
+            # Sessions are not recycled by job count (that would drop their state), only by memory.
+            if usable and worker.memory_mb() > self.max_memory_mb:
+                await worker.kill()
+            if note and "error" not in reply:
+                reply["stdout"] = note + reply["stdout"]
+                reply["stderr"] = note + reply["stderr"]
+            return reply
+        finally:
+            lock.release()
+
+    async def end_session(self, session):
+        """Discards a quiz's interpreter and its variables."""
+        self._session_locks.pop(session, None)
+        worker = self._sessions.pop(session, None)
+        if worker is not None:
+            await worker.kill()
+
+    async def close(self):
+        for session in list(self._sessions):
+            await self.end_session(session)
+        if self._idle is not None:
+            while not self._idle.empty():
+                await self._idle.get_nowait().kill()
+            self._idle = None
+        self._count = 0
+        self.ready = False
+
+
+def _left(deadline):
+    return round(max(deadline - time.monotonic(), 0.1), 1)
+
+
+pool = ReplPool()
+
+
+@traced("tool.python_repl")
+async def python_repl(code: str, session: str = None) -> str:
+    """
+    Executes Python code on a warm worker process.
+    pandas (pd), numpy (np), requests, json and re are already imported, and
+    `cached_path(url)` returns a local copy from the shared download cache.
+    With `session`, variables persist across calls made with the same session id.
     """
     print("[Tool] Executing Python...")
-    
-    # Pre-load common libraries to prevent model errors
-    prepend_imports = "import pandas as pd\nimport numpy as np\nimport requests\nimport json\nimport re\n"
-    full_code = prepend_imports + code
-    
+
     try:
-        # Run the code safely in a subprocess
-        result = subprocess.run(
-            [sys.executable, "-c", full_code],
-            capture_output=True, text=True, timeout=45
-        )
-        
-        # Return stdout if successful, else stderr
-        if result.returncode == 0:
-            return f"STDOUT:\n{result.stdout}"
-        else:
-            return f"STDERR:\n{result.stderr}"
-            
+        reply = await pool.run(code, session=session, timeout=tool_timeout(TIMEOUT))
     except Exception as e:
-        return f"Execution Error: {e}"
\ No newline at end of file
+        return f"Execution Error: {e}"
+
+    if "error" in reply:
+        return f"Execution Error: {reply['error']}"
+
+    # Return stdout if successful, else stderr
+    if reply["ok"]:
+        return f"STDOUT:\n{reply['stdout']}"
+    else:
+        return f"STDERR:\n{reply['stderr']}"
+
+
+async def end_python_session(session: str):
+    """Frees the interpreter kept for a quiz session."""
+    await pool.end_session(session)
@@ -0,0 +1,98 @@
+import os
+import asyncio
+import httpx
+from deadline import tool_timeout
+from .download_cache import DownloadCache, DownloadTooLarge, CHUNK_SIZE
+
+# One keep-alive connection pool for every outbound HTTP call (submissions, media downloads).
+_client = None
+# One Groq client for the agent, vision and transcription (the SDK is only imported on first use).
+_groq = None
+cache = DownloadCache()
+# Whole-download deadline, on top of httpx's per-read timeout; a caller waits at most until
+# its level's submission reserve (tool_timeout), while the download goes on for the others.
+DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "60"))
+_inflight = {}  # url -> Task of the download already running (prefetch + tool share one request)
+
+class FetchError(Exception):
+    """Raised when a download answers with a non-200 status."""
+    def __init__(self, url, status_code):
+        super().__init__(f"Failed to download {url} (Status {status_code})")
+        self.status_code = status_code
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the shared async HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _client
+
+def get_groq():
+    """Returns the shared AsyncGroq client, creating it on first use."""
+    global _groq
+    if _groq is None:
+        from groq import AsyncGroq
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in .env file")
+        _groq = AsyncGroq(api_key=api_key)
+    return _groq
+
+async def fetch_cached(url: str) -> dict:
+    """
+    Downloads `url` through the shared on-disk cache and returns its index entry.
+    The entry's `path` is a local file; cached copies are revalidated with
+    ETag/Last-Modified, so an unchanged asset costs at most a 304. Bodies are
+    streamed to disk, never held in memory; oversized or slow downloads raise
+    DownloadTooLarge / asyncio.TimeoutError, and so does a wait that would run into
+    the level's submission reserve. Index reads and writes run in a thread: the index
+    is a SQLite file shared with the other workers and the python_repl processes.
+    """
+    entry = await asyncio.to_thread(cache.lookup, url)
+    if entry and cache.is_fresh(entry):
+        await asyncio.to_thread(cache.touch, url)
+        return entry
+
+    task = _inflight.get(url)
+    if task is None:
+        task = _inflight[url] = asyncio.ensure_future(
+            asyncio.wait_for(_download(url, entry), DOWNLOAD_TIMEOUT_SECONDS))
+        task.add_done_callback(lambda t: _finished(url, t))
+    # Shielded: a cancelled or timed-out caller (e.g. a dropped prefetch) must not abort
+    # the download for the others.
+    return await asyncio.wait_for(asyncio.shield(task), tool_timeout(DOWNLOAD_TIMEOUT_SECONDS))
+
+def _finished(url, task):
+    _inflight.pop(url, None)
+    if not task.cancelled():
+        task.exception()  # mark retrieved; callers still see it
+
+async def _download(url, entry):
+    async with get_client().stream("GET", url, headers=cache.validators(entry)) as response:
+        if response.status_code == 304 and entry:
+            await asyncio.to_thread(cache.touch, url, True)
+            return entry
+        if response.status_code != 200:
+            raise FetchError(url, response.status_code)
+        writer = cache.writer(url, response.headers.get("content-length"))
+        try:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+    return await asyncio.to_thread(cache.commit, url, writer, response.headers)
+
+async def close():
+    """Closes the shared clients (called on server shutdown)."""
+    global _client, _groq
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _groq is not None:
+        await _groq.close()
+        _groq = None
@@ -0,0 +1,142 @@
+"""
+Local image preprocessing for analyze_image.
+
+Images are decoded with Pillow, trimmed of uniform borders, downscaled to
+VISION_MAX_SIDE and re-encoded as JPEG (or kept as-is when that is smaller), so
+the vision request carries far fewer bytes. Simple questions are answered here
+without the API: "dominant colour" from a colour histogram, and "number in the
+image" via Tesseract OCR when pytesseract and the binary are installed. Questions
+about a code go to the vision model: codes are often alphanumeric.
+"""
+import io
+import os
+import re
+import time
+import shutil
+import base64
+from collections import Counter
+from PIL import Image, ImageChops, ImageOps
+from .download_cache import sniff
+
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "1024"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+VISION_LOCAL_ANSWERS = os.getenv("VISION_LOCAL_ANSWERS", "1") == "1"
+
+# Formats the vision API takes directly, so a small original can be sent untouched.
+PASSTHROUGH = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+COLOUR_QUESTION = re.compile(r"\b(dominant|most (common|frequent|used)|main|background)\b.{0,20}\bcolou?r", re.I)
+NUMBER_QUESTION = re.compile(r"\b(number|digits?)\b", re.I)
+CODE_QUESTION = re.compile(r"\b(codes?|secret|password|key)\b", re.I)
+
+
+def prepare(path):
+    """
+    Returns (data_url, report) for the vision request. `report` has the payload bytes
+    and pixel size before/after plus the time spent; an image Pillow cannot decode is
+    sent unchanged.
+    """
+    started = time.time()
+    size_before = os.path.getsize(path)
+    try:
+        with Image.open(path) as original:
+            fmt = original.format
+            transparent = _has_alpha(original)
+            image = _flatten(ImageOps.exif_transpose(original))
+            pixels_before = image.size
+            image = _trim(image)
+            image.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE))
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+    except (OSError, Image.DecompressionBombError):
+        mime = sniff(path)[1]
+        if not (mime or "").startswith("image/"):
+            mime = "image/jpeg"
+        return _data_url(path, mime), {"bytes_before": size_before, "bytes_after": size_before,
+                                       "preprocessed": False}
+
+    report = {"bytes_before": size_before, "pixels_before": list(pixels_before),
+              "pixels_after": list(image.size), "preprocessed": True,
+              "prep_ms": round((time.time() - started) * 1000, 1)}
+    if fmt in PASSTHROUGH and not transparent and image.size == pixels_before and size_before <= buffer.tell():
+        report["bytes_after"] = size_before  # already compact; re-encoding would not help
+        return _data_url(path, PASSTHROUGH[fmt]), report
+    report["bytes_after"] = buffer.tell()
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getbuffer()).decode("ascii"), report
+
+
+def local_answer(path, question):
+    """Answers "dominant colour" and (with Tesseract) "number in the image" questions, else None."""
+    if not VISION_LOCAL_ANSWERS:
+        return None
+    try:
+        with Image.open(path) as image:
+            image = _flatten(image)
+            if COLOUR_QUESTION.search(question):
+                return f"The dominant colour is {dominant_colour(image)}."
+            if NUMBER_QUESTION.search(question) and not CODE_QUESTION.search(question):
+                text = _ocr(image)
+                numbers = _numbers(text or "")
+                if numbers and len(set(numbers)) == 1:
+                    return f"The number in the image is {numbers[0]}. (OCR text: {text.strip()[:200]})"
+    except OSError:
+        pass
+    return None
+
+
+def dominant_colour(image):
+    """Most frequent colour as #rrggbb (on a downsampled copy, so large images stay cheap)."""
+    sample = image.copy()
+    sample.thumbnail((200, 200), Image.NEAREST)
+    (r, g, b), _ = Counter(sample.getdata()).most_common(1)[0]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _numbers(text):
+    """
+    The all-digit tokens in OCR text, or None if any token mixes digits with letters
+    (e.g. "AB1234"), where taking just the digits would give a wrong answer.
+    """
+    numbers = []
+    for token in text.split():
+        token = token.strip(".,;:!?()[]\"'")
+        if token.isdigit() and len(token) >= 2:
+            numbers.append(token)
+        elif any(c.isdigit() for c in token):
+            return None
+    return numbers
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+
+def _flatten(image):
+    """RGB copy with any transparency composited onto white (convert("RGB") alone turns it black)."""
+    if _has_alpha(image):
+        rgba = image.convert("RGBA")
+        return Image.alpha_composite(Image.new("RGBA", rgba.size, "white"), rgba).convert("RGB")
+    return image.convert("RGB")
+
+
+def _trim(image):
+    """Crops away a uniform border (the colour of the top-left pixel), e.g. around a chart. Expects _flatten's output."""
+    background = Image.new("RGB", image.size, image.getpixel((0, 0)))
+    box = ImageChops.difference(image, background).getbbox()
+    if box and box != (0, 0) + image.size:
+        return image.crop(box)
+    return image
+
+
+def _ocr(image):
+    try:
+        import pytesseract  # Optional: only used when installed with the tesseract binary
+    except ImportError:
+        return None
+    if not shutil.which("tesseract"):
+        return None
+    return pytesseract.image_to_string(ImageOps.grayscale(image))
+
+
+def _data_url(path, mime):
+    with open(path, "rb") as f:
+        return f"data:{mime};base64," + base64.b64encode(f.read()).decode("ascii")
@@ -1,53 +1,206 @@
+import os
+import re
 import json
-from playwright.sync_api import sync_playwright
+import base64
+import asyncio
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup
+from tracing import traced, span
+from deadline import tool_timeout
+from .browser import pool
+from .fetch import get_client
 
-def navigate(url: str) -> str:
+# "auto": plain HTTP fetch + HTML parse, falling back to Chromium when the page builds
+# its content with JavaScript. "always" never starts the browser, "never" always does.
+NAVIGATE_STATIC = os.getenv("NAVIGATE_STATIC", "auto")
+
+try:
+    import lxml  # noqa: F401  (faster parser when installed)
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# Seconds for the browser to load a page, and for the plain HTTP fetch; both shrink near the deadline.
+NAVIGATE_TIMEOUT = 60
+STATIC_TIMEOUT = 20
+EXTRACT_TIMEOUT = 15  # reading the rendered DOM
+TEXT_LIMIT = 1500
+MAX_TABLES, MAX_ROWS = 5, 20
+MAX_PAGE_LINKS = 10
+EMBEDDED_LIMIT = 500
+
+ASSET_TYPES = {
+    "csv": (".csv", ".tsv"),
+    "json": (".json",),
+    "pdf": (".pdf",),
+    "audio": (".mp3", ".wav", ".ogg", ".opus", ".m4a", ".flac", ".webm"),
+    "image": (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg"),
+    "data": (".xlsx", ".xls", ".txt", ".zip", ".parquet", ".xml"),
+}
+MEDIA_TYPES = {"audio": "audio", "img": "image"}
+BLOCK_TAGS = ["p", "div", "br", "li", "tr", "pre", "table", "form", "section", "article", "header", "footer",
+              "blockquote", "h1", "h2", "h3", "h4", "h5", "h6"]
+SUBMIT_RE = re.compile(r"https?://[^\s\"'<>]+?submit\b")
+BASE64_RE = re.compile(r"[\"'`]([A-Za-z0-9+/]{16,}={0,2})[\"'`]")
+# Inline scripts that write to the DOM: the static HTML is not what the user sees.
+# Any external (src=) script counts too: what it renders cannot be seen from here.
+DOM_WRITES = re.compile(r"document\.|innerHTML|innerText|textContent|appendChild|createElement|fetch\(")
+
+# One round-trip: everything the agent needs, read from the rendered DOM.
+EXTRACT_SCRIPT = """() => {
+    const text = el => (el.innerText || el.textContent || '').trim();
+    return {
+        text: document.body ? document.body.innerText : '',
+        tables: Array.from(document.querySelectorAll('table')).slice(0, %d).map(t =>
+            Array.from(t.rows).slice(0, %d).map(r => Array.from(r.cells).map(text))),
+        anchors: Array.from(document.querySelectorAll('a[href]')).map(a => ({href: a.href, text: text(a)})),
+        media: Array.from(document.querySelectorAll('audio, audio source, video source, img')).map(m => ({
+            tag: m.closest('audio') ? 'audio' : m.tagName.toLowerCase(), src: m.currentSrc || m.src || ''})),
+        forms: Array.from(document.forms).map(f => ({action: f.action, method: (f.method || 'get').toLowerCase(),
+            fields: Array.from(f.elements).map(e => e.name).filter(Boolean)})),
+        scripts: Array.from(document.scripts).filter(s => !s.src).map(s => ({type: s.type, text: s.textContent})),
+    };
+}""" % (MAX_TABLES, MAX_ROWS)
+
+
+def _parse_html(html, url):
+    """Static counterpart of EXTRACT_SCRIPT: the same raw structure from the HTML source."""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    scripts = [{"type": s.get("type", ""), "text": s.string or "",
+                "src": urljoin(url, s["src"]) if s.get("src") else ""} for s in soup.find_all("script")]
+    tables = [[[c.get_text(" ", strip=True) for c in row.find_all(["td", "th"])]
+               for row in table.find_all("tr")[:MAX_ROWS]]
+              for table in soup.find_all("table")[:MAX_TABLES]]
+    media = [{"tag": "audio" if m.name == "audio" or m.find_parent("audio") else m.name,
+              "src": urljoin(url, m["src"])}
+             for m in soup.find_all(["audio", "source", "img"]) if m.get("src")]
+    forms = [{"action": urljoin(url, f.get("action", "")), "method": f.get("method", "get").lower(),
+              "fields": [e["name"] for e in f.find_all(["input", "select", "textarea"]) if e.get("name")]}
+             for f in soup.find_all("form")]
+    anchors = [{"href": urljoin(url, a["href"]), "text": a.get_text(" ", strip=True)}
+               for a in soup.find_all("a", href=True)]
+    for tag in soup(["script", "style", "noscript", "template"]):
+        tag.decompose()
+    for tag in soup.find_all(BLOCK_TAGS):
+        tag.insert_after("\n")  # line breaks where innerText would put them
+    for cell in soup.find_all(["td", "th"]):
+        cell.insert_after(" ")
+    body = soup.body or soup
+    return {"text": body.get_text(), "tables": tables, "anchors": anchors, "media": media,
+            "forms": forms, "scripts": scripts}
+
+
+def _needs_browser(raw):
+    """True when the static HTML is likely not the rendered page."""
+    if len(raw["text"].strip()) < 20:
+        return True
+    return any(s.get("src") or DOM_WRITES.search(s["text"]) for s in raw["scripts"] if "json" not in s["type"])
+
+
+def _asset_type(href):
+    path = urlparse(href).path.lower()
+    return next((kind for kind, exts in ASSET_TYPES.items() if path.endswith(exts)), None)
+
+
+def _embedded(scripts):
+    """JSON script blocks and base64 strings hidden in inline scripts, decoded when they are text."""
+    found = []
+    for s in scripts:
+        if "json" in s["type"]:
+            found.append({"kind": "json", "data": s["text"].strip()[:EMBEDDED_LIMIT]})
+            continue
+        for blob in BASE64_RE.findall(s["text"]):
+            try:
+                decoded = base64.b64decode(blob, validate=True).decode("utf-8")
+            except ValueError:
+                continue
+            if decoded.isprintable():
+                found.append({"kind": "base64", "decoded": decoded[:EMBEDDED_LIMIT]})
+    return found[:10]
+
+
+def _structure(raw, url, source):
+    """Compact page document shared by the browser and static paths."""
+    lines = (" ".join(line.split()) for line in raw["text"].splitlines())
+    text = "\n".join(line for line in lines if line)
+
+    links, seen, page_links = [], set(), 0
+    assets = [{"href": m["src"], "text": m["tag"], "type": MEDIA_TYPES.get(m["tag"]) or _asset_type(m["src"])}
+              for m in raw["media"] if m["src"] and not m["src"].startswith("data:")]
+    for link in assets + raw["anchors"]:
+        href = link["href"].split("#")[0]
+        if not href.startswith(("http://", "https://")) or href in seen or href == url:
+            continue
+        kind = link.get("type") or _asset_type(href)
+        if kind is None:
+            if "download" not in link["text"].lower() and page_links >= MAX_PAGE_LINKS:
+                continue
+            kind = "download" if "download" in link["text"].lower() else "page"
+            page_links += kind == "page"
+        seen.add(href)
+        links.append({"href": href, "text": link["text"][:80], "type": kind})
+
+    submit_url = next((f["action"] for f in raw["forms"] if f["action"] and f["action"] != url), None)
+    if submit_url is None:
+        match = SUBMIT_RE.search(text)
+        submit_url = match.group(0) if match else None
+
+    return {
+        "text": text[:TEXT_LIMIT],
+        "links": links,
+        "audio": next((l["href"] for l in links if l["type"] == "audio"), None),
+        "tables": [t for t in raw["tables"] if t],
+        "forms": raw["forms"],
+        "embedded": _embedded(raw["scripts"]),
+        "submission_url": submit_url,
+        "source": source,
+    }
+
+
+async def _fetch_static(url):
+    """The page via plain HTTP, or None if it needs a real browser."""
+    with span("navigate.static") as s:
+        response = await get_client().get(url, timeout=tool_timeout(STATIC_TIMEOUT))
+        response.raise_for_status()
+        if "html" not in response.headers.get("content-type", "html"):
+            # A data file, not a page: hand back its text directly.
+            raw = {"text": response.text, "tables": [], "anchors": [], "media": [], "forms": [], "scripts": []}
+            return _structure(raw, url, "static")
+        raw = await asyncio.to_thread(_parse_html, response.text, url)
+        needs_browser = _needs_browser(raw)
+        s.set(bytes_in=len(response.content), needs_browser=needs_browser)
+        if needs_browser and NAVIGATE_STATIC != "always":
+            return None
+        return _structure(raw, url, "static")
+
+
+async def _scrape(url):
+    with span("navigate.browser"):
+        async with pool.page() as page:
+            # Long timeout for slow quiz pages (less when the level is nearly out of time); wait until DOM is ready
+            await page.goto(url, wait_until="domcontentloaded", timeout=tool_timeout(NAVIGATE_TIMEOUT) * 1000)
+            await pool.settle(page)  # Wait for JS hydration, but only until the DOM settles
+            raw = await asyncio.wait_for(page.evaluate(EXTRACT_SCRIPT), tool_timeout(EXTRACT_TIMEOUT))
+    return _structure(raw, url, "browser")
+
+
+@traced("tool.navigate")
+async def navigate(url: str) -> str:
     """
-    Scrapes a URL using Playwright.
-    Returns: Text content, Links, Audio URL, and Submission URL.
+    Reads a page, over plain HTTP when it is static or in the shared browser pool otherwise.
+    Returns JSON: text, typed links (csv/json/pdf/audio/image/data/page), the audio URL,
+    tables, forms, embedded script data, and the submission URL.
     """
     print(f"[Tool] Navigating to: {url}")
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            
-            # Long timeout for slow quiz pages; wait until DOM is ready
-            page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            page.wait_for_timeout(2000) # Wait for JS hydration
-            
-            content = page.evaluate("document.body.innerText")
-            
-            # Extract Links for CSVs/PDFs
-            links = page.evaluate("""() => {
-                return Array.from(document.querySelectorAll('a')).map(a => ({href: a.href, text: a.innerText}))
-            }""")
-            
-            # Extract Audio Source if present
-            audio_src = page.evaluate("""() => {
-                const audio = document.querySelector('audio');
-                return audio ? audio.src : null;
-            }""")
-            
-            # Extract Submission URL (Robust Regex match)
-            submit_url = page.evaluate(r"""() => {
-                const form = document.querySelector('form');
-                if (form && form.action) return form.action;
-                // Look for patterns like "Post your answer to..."
-                const match = document.body.innerText.match(/https:\/\/[^\s]+submit/);
-                return match ? match[0] : null;
-            }""")
-            
-            browser.close()
-            
-            # Return a JSON string that the LLM can parse
-            # Return a JSON string that the LLM can parse
-            return json.dumps({
-                "text": content[:1500], 
-                # ADDED: 'png', 'jpg', 'jpeg' to the list of interesting extensions
-                "links": [l for l in links if any(x in l['text'].lower() or x in l['href'].lower() for x in ['csv', 'pdf', 'json', 'download', 'png', 'jpg', 'jpeg'])],
-                "audio": audio_src,
-                "submission_url": submit_url
-            })
+        page = None
+        if NAVIGATE_STATIC != "never":
+            try:
+                page = await _fetch_static(url)
+            except Exception as e:
+                print(f"[Tool] Static fetch failed ({e}); using the browser.")
+        if page is None:
+            page = await _scrape(url)
+        return json.dumps(page)
     except Exception as e:
-        return f"Navigation Error: {e}"
\ No newline at end of file
+        return f"Navigation Error: {e}"
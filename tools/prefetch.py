@@ -0,0 +1,69 @@
+"""
+Speculative prefetch of a page's assets while the LLM is still deciding what to do.
+
+After navigate(), the page's audio is transcribed and its data/image links are
+downloaded into the shared cache in the background. A later transcribe_audio call
+for the same URL awaits the running task; downloads are shared by fetch_cached.
+"""
+import os
+import json
+import asyncio
+from urllib.parse import urlparse
+from . import get_tool
+
+PREFETCH_ASSETS = os.getenv("PREFETCH_ASSETS", "1") == "1"
+MAX_PREFETCH = int(os.getenv("PREFETCH_MAX_ASSETS", "6"))
+ASSET_EXTENSIONS = (".csv", ".json", ".txt", ".pdf", ".xlsx", ".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+class Prefetcher:
+    """Background tasks for one level; `cancel()` drops whatever has not been used."""
+
+    def __init__(self, enabled=PREFETCH_ASSETS):
+        self.enabled = enabled
+        self.tasks = {}  # (tool, url) -> Task
+
+    def start(self, page_json):
+        """Starts prefetching for a navigate() result (ignored if it is not page JSON)."""
+        if not self.enabled:
+            return
+        try:
+            page = json.loads(page_json)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(page, dict):
+            return
+        if page.get("audio"):
+            self._spawn("transcribe_audio", page["audio"], get_tool("transcribe_audio"))
+        for link in page.get("links") or []:
+            href = link.get("href") or ""
+            if urlparse(href).path.lower().endswith(ASSET_EXTENSIONS):
+                self._spawn("download", href, get_tool("fetch_cached"))
+
+    def _spawn(self, tool, url, func):
+        key = (tool, url)
+        if key in self.tasks or len(self.tasks) >= MAX_PREFETCH:
+            return
+        print(f"[Prefetch] {tool}: {url}")
+        task = asyncio.create_task(func(url))
+        task.add_done_callback(_discard_error)
+        self.tasks[key] = task
+
+    async def result(self, tool, url):
+        """The prefetched result for this tool call, or None if it was not prefetched."""
+        task = self.tasks.pop((tool, url), None)
+        if task is None:
+            return None
+        print(f"[Prefetch] Using speculative {tool} for {url}")
+        return await task
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+
+
+def _discard_error(task):
+    # A failed prefetch is harmless: the real tool call just runs again.
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,170 @@
+"""
+Long-lived interpreter used by tools.execution.python_repl.
+Started once with the heavy libraries already imported, then runs snippets
+sent as JSON lines on stdin and answers with one JSON line per snippet.
+"""
+import io
+import os
+import sys
+import json
+import re
+import tempfile
+import traceback
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+
+import pandas as pd
+import numpy as np
+import requests
+
+# Run as a script, so the sibling module is importable directly (without tools/__init__).
+from download_cache import DownloadCache, CHUNK_SIZE
+import tabular
+
+_cache = DownloadCache()
+_http = requests.Session()  # keep-alive across snippets
+
+
+def cached_path(url):
+    """Local file path for `url`, downloaded through the shared download cache."""
+    entry = _cache.lookup(url)
+    if entry and _cache.is_fresh(entry):
+        _cache.touch(url)
+        return entry["path"]
+    with _http.get(url, headers=_cache.validators(entry), timeout=30, stream=True) as response:
+        if response.status_code == 304 and entry:
+            _cache.touch(url, revalidated=True)
+            return entry["path"]
+        response.raise_for_status()
+        chunks = response.iter_content(CHUNK_SIZE)
+        return _cache.store_stream(url, chunks, response.headers)["path"]
+
+
+def _local(source):
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        return cached_path(source)
+    return source
+
+
+# pd.read_csv/read_json calls with only these options are served from the columnar cache.
+COLUMNAR_OPTIONS = {"header", "usecols"}
+# Rows pandas reads itself to check the cached frame has exactly the dtypes and values it would give.
+SAMPLE_ROWS = 1000
+
+
+def _through_cache(reader, columnar=False):
+    def read(source, *args, **kwargs):
+        source = _local(source)
+        simple = not args and set(kwargs) <= COLUMNAR_OPTIONS and kwargs.get("header", "infer") in ("infer", 0, None)
+        if columnar and simple:
+            try:
+                # load_table keeps pandas' dtypes and nulls; the sample check catches what pyarrow reads differently.
+                df = tabular.load_table(source, columns=kwargs.get("usecols"), header=kwargs.get("header", "infer"))
+                expected = reader(source, nrows=SAMPLE_ROWS, **kwargs)
+                if df.head(len(expected)).equals(expected):
+                    return df
+            except Exception:
+                pass  # Anything pyarrow cannot parse (or types differently) goes to pandas as written
+        return reader(source, *args, **kwargs)
+    return read
+
+
+def load_table(source, columns=None, header="infer", **read_options):
+    """DataFrame for a CSV/TSV/JSON/Excel/Parquet URL or path; repeat reads are memory-mapped."""
+    return tabular.load_table(_local(source), columns=columns, header=header, **read_options)
+
+
+def iter_chunks(source, batch_rows=100_000, columns=None, header="infer"):
+    """Yields DataFrames of `batch_rows` rows from a large file."""
+    return tabular.iter_chunks(_local(source), batch_rows=batch_rows, columns=columns, header=header)
+
+
+def pdf_tables(source, pages=None):
+    """All tables in a PDF (PyMuPDF find_tables) as DataFrames."""
+    return tabular.pdf_tables(_local(source), pages=pages)
+
+
+# The model habitually writes pd.read_csv(url); serve those from the cache too.
+pd.read_csv = _through_cache(pd.read_csv, columnar=True)
+pd.read_json = _through_cache(pd.read_json)
+pd.read_excel = _through_cache(pd.read_excel)
+
+PRELOADED = {"pd": pd, "np": np, "requests": requests, "json": json, "re": re, "cached_path": cached_path,
+             "load_table": load_table, "iter_chunks": iter_chunks, "pdf_tables": pdf_tables,
+             "compact_dtypes": tabular.compact_dtypes}
+
+
+def fresh_namespace():
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    namespace.update(PRELOADED)
+    return namespace
+
+
+@contextmanager
+def _capture_fds():
+    """
+    Points fds 1 and 2 at temp files while a snippet runs, so output that bypasses
+    sys.stdout (os.system, subprocess.run, C extensions) is kept. Yields a list that
+    holds the (stdout, stderr) text once the block exits.
+    """
+    captured = []
+    files = [tempfile.TemporaryFile() for _ in (1, 2)]
+    saved = [os.dup(1), os.dup(2)]
+    try:
+        for fd, f in zip((1, 2), files):
+            os.dup2(f.fileno(), fd)
+        yield captured
+    finally:
+        for fd, original in zip((1, 2), saved):
+            os.dup2(original, fd)
+            os.close(original)
+        for f in files:
+            f.seek(0)
+            captured.append(f.read().decode("utf-8", errors="replace"))
+            f.close()
+
+
+def run(code, namespace):
+    """Executes one snippet. Mirrors `python -c`: ok is False when it raised or exited non-zero."""
+    out, err = io.StringIO(), io.StringIO()
+    ok = True
+    with _capture_fds() as fd_output, redirect_stdout(out), redirect_stderr(err):
+        try:
+            exec(compile(code, "<string>", "exec"), namespace)
+        except SystemExit as e:
+            ok = e.code in (None, 0)
+            if not ok and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            ok = False
+            etype, value, tb = sys.exc_info()
+            traceback.print_exception(etype, value, tb.tb_next)  # Hide this file's frame
+    # Like `python -c` into a pipe: Python's own buffered prints come after what the shell wrote.
+    fd_stdout, fd_stderr = fd_output
+    return ok, fd_stdout + out.getvalue(), fd_stderr + err.getvalue()
+
+
+def main():
+    # Keep the real stdout for replies; fd 1 itself is only written by snippets (see _capture_fds).
+    replies = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+
+    def reply(payload):
+        replies.write(json.dumps(payload) + "\n")
+        replies.flush()
+
+    session = None  # Namespace kept between snippets when the caller asks for it
+    reply({"ready": True})
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get("persist"):
+            if session is None:
+                session = fresh_namespace()
+            namespace = session
+        else:
+            namespace = fresh_namespace()
+        ok, stdout, stderr = run(request["code"], namespace)
+        reply({"ok": ok, "stdout": stdout, "stderr": stderr})
+
+
+if __name__ == "__main__":
+    main()
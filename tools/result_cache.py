@@ -0,0 +1,115 @@
+"""
+Persistent memo cache for slow model calls (Whisper transcriptions, vision answers).
+
+Results live in one SQLite file, namespaced per tool, with a TTL and LRU eviction
+once a namespace grows past `max_entries`. Hit/miss counters are kept in-process.
+The file is shared by every worker process on the host (WAL, so readers do not wait
+for a writer); async callers run get/put in a thread. If another process holds the
+write lock past `timeout`, a lookup counts as a miss and a store is skipped.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "quiz_result_cache.sqlite"))
+TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000"))
+# A cache is only worth a short wait; past this, go on without it.
+CACHE_TIMEOUT_SECONDS = float(os.getenv("RESULT_CACHE_TIMEOUT_SECONDS", "2"))
+
+
+def make_key(*parts) -> str:
+    """Stable hash of the inputs that determine a result (content hash, model, prompt, temperature...)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, namespace, path=CACHE_PATH, ttl_seconds=TTL_SECONDS, max_entries=MAX_ENTRIES,
+                 timeout=CACHE_TIMEOUT_SECONDS):
+        self.namespace = namespace
+        self.path = path
+        self.timeout = timeout
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        with self._db() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS results (
+                namespace TEXT, key TEXT, value TEXT, created_at REAL, used_at REAL,
+                PRIMARY KEY (namespace, key))""")
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+
+    @contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            with db:  # commit on success
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        found = self.get_first([key])
+        return found[1] if found else None
+
+    def get_first(self, keys):
+        """
+        (key, value) for the first of `keys` that has a fresh entry, or None. One query
+        and one hit or miss, however many keys (e.g. one per model for the same prompt).
+        """
+        try:
+            return self._get_first(keys)
+        except sqlite3.OperationalError as e:
+            print(f"  [Cache] {self.namespace} lookup skipped ({e}).")
+            self.misses += 1
+            return None
+
+    def _get_first(self, keys):
+        now = time.time()
+        with self._db() as db:
+            rows = db.execute("SELECT key, value, created_at FROM results WHERE namespace = ? AND key IN (%s)"
+                              % ",".join("?" * len(keys)), (self.namespace, *keys)).fetchall()
+            fresh = {key: value for key, value, created_at in rows if now - created_at < self.ttl_seconds}
+            expired = [key for key, _, created_at in rows if key not in fresh]
+            if expired:
+                db.execute("DELETE FROM results WHERE namespace = ? AND key IN (%s)" % ",".join("?" * len(expired)),
+                           (self.namespace, *expired))
+            key = next((k for k in keys if k in fresh), None)
+            if key is not None:
+                db.execute("UPDATE results SET used_at = ? WHERE namespace = ? AND key = ?",
+                           (now, self.namespace, key))
+        if key is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return key, fresh[key]
+
+    def put(self, key, value):
+        try:
+            self._put(key, value)
+        except sqlite3.OperationalError as e:
+            print(f"  [Cache] {self.namespace} store skipped ({e}).")
+
+    def _put(self, key, value):
+        now = time.time()
+        with self._db() as db:
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                       (self.namespace, key, value, now, now))
+            # LRU: keep only the most recently used max_entries of this namespace
+            db.execute("""DELETE FROM results WHERE namespace = ? AND key NOT IN (
+                              SELECT key FROM results WHERE namespace = ?
+                              ORDER BY used_at DESC LIMIT ?)""",
+                       (self.namespace, self.namespace, self.max_entries))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -1,7 +1,13 @@
-import requests
 import json
+from tracing import traced
+from deadline import tool_timeout
+from .fetch import get_client
 
-def submit_answer(submission_url: str, quiz_url: str, email: str, secret: str, answer: str) -> str:
+# Seconds to wait for the grader; near the deadline, whatever time is left (submitting is the last step).
+SUBMIT_TIMEOUT = 15
+
+@traced("tool.submit_answer")
+async def submit_answer(submission_url: str, quiz_url: str, email: str, secret: str, answer: str) -> str:
     """
     POSTs the answer to the server.
     Returns the server's JSON response (which often contains the next URL).
@@ -14,8 +20,8 @@ def submit_answer(submission_url: str, quiz_url: str, email: str, secret: str, a
             "url": quiz_url,
             "answer": answer
         }
-        # 15s timeout to prevent hanging
-        resp = requests.post(submission_url, json=payload, timeout=15)
+        # Timeout to prevent hanging
+        resp = await get_client().post(submission_url, json=payload, timeout=tool_timeout(SUBMIT_TIMEOUT, reserve=0))
         
         # Return JSON if possible, else text
         try:
@@ -24,4 +30,4 @@ def submit_answer(submission_url: str, quiz_url: str, email: str, secret: str, a
             return resp.text
             
     except Exception as e:
-        return f"Submission Error: {e}"
\ No newline at end of file
+        return f"Submission Error: {e}"
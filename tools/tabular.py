@@ -0,0 +1,215 @@
+"""
+Large-dataset helpers for python_repl (loaded by repl_worker as `load_table`,
+`iter_chunks` and `pdf_tables`).
+
+The first read of a CSV/JSON/Excel/PDF-table file converts it with pyarrow into an
+uncompressed Arrow IPC file under CACHE_DIR/columnar. Later reads memory-map that
+file and only materialise the requested columns, so repeated queries over the same
+file skip parsing entirely. Columns keep pandas' default dtypes (int64, float64 and
+strings, with dates left as text) and the cells pandas reads as missing ("", "NA",
+"null", ...) are nulls, so arithmetic and isna/count/dropna give what plain pandas gives.
+Shrinking them is opt-in: `compact=True` here, or compact_dtypes() on a frame,
+downcasts integers (which can then overflow) and dictionary-encodes strings.
+"""
+import os
+import json
+import hashlib
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.json as pa_json
+import pyarrow.compute as pc
+
+from download_cache import CACHE_DIR
+
+COLUMNAR_DIR = os.path.join(CACHE_DIR, "columnar")
+BLOCK_SIZE = 8 * 1024 * 1024
+# Strings with at most this share of distinct values become dictionary (category) columns.
+DICTIONARY_RATIO = 0.5
+INT_TYPES = [pa.int8(), pa.int16(), pa.int32(), pa.int64()]
+# pandas' default na_values; pyarrow's own list lacks "<NA>" and "None" and keeps empty strings.
+PANDAS_NULL_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                      "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+# Bumped whenever conversion changes, so files converted by an older version are not reused.
+FORMAT_VERSION = 2
+
+
+def load_table(path, columns=None, header="infer", compact=False, **read_options):
+    """
+    DataFrame for a local CSV/TSV/JSON/Excel/Parquet/Arrow file, via the columnar cache.
+    `header=None` numbers the columns 0, 1, ... like pandas; `columns` limits what is read.
+    `compact=True` downcasts integers and dictionary-encodes repetitive strings.
+    """
+    table = _columnar(path, header, read_options, compact)
+    if columns is not None:
+        table = table.select([str(c) for c in columns])
+    df = table.to_pandas(split_blocks=True)
+    if header is None:
+        df.columns = [int(c) for c in df.columns]
+    return df
+
+
+def iter_chunks(path, batch_rows=100_000, columns=None, header="infer", compact=False):
+    """Yields DataFrames of up to `batch_rows` rows, for files too big to handle at once."""
+    table = _columnar(path, header, {}, compact)
+    if columns is not None:
+        table = table.select([str(c) for c in columns])
+    for batch in table.to_batches(max_chunksize=batch_rows):
+        df = batch.to_pandas(split_blocks=True)
+        if header is None:
+            df.columns = [int(c) for c in df.columns]
+        yield df
+
+
+def pdf_tables(path, pages=None):
+    """Every table PyMuPDF finds in the PDF (optionally only `pages`, 0-based), as DataFrames."""
+    key = _key(path, "pdf", pages)
+    done = os.path.join(COLUMNAR_DIR, f"{key}.json")
+    if not os.path.exists(done):
+        tables = _extract_pdf_tables(path, pages)
+        os.makedirs(COLUMNAR_DIR, exist_ok=True)
+        for i, df in enumerate(tables):
+            _write(pa.Table.from_pandas(df, preserve_index=False), os.path.join(COLUMNAR_DIR, f"{key}-{i}.arrow"))
+        with open(done, "w") as f:
+            json.dump({"tables": len(tables)}, f)
+    with open(done) as f:
+        count = json.load(f)["tables"]
+    return [_read(os.path.join(COLUMNAR_DIR, f"{key}-{i}.arrow")).to_pandas() for i in range(count)]
+
+
+def compact_dtypes(df):
+    """Downcasts integer columns and turns repetitive strings into categories (in place-friendly copy)."""
+    df = df.copy()
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_integer_dtype(column):
+            df[name] = pd.to_numeric(column, downcast="integer")
+        elif column.dtype == object and len(column) and column.nunique() / len(column) <= DICTIONARY_RATIO:
+            df[name] = column.astype("category")
+    return df
+
+
+# --- CONVERSION CACHE ---
+def _key(path, *variant):
+    """Cache key: the blob's sha256 for download-cache files, else path + size + mtime."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if os.path.dirname(os.path.abspath(path)) == os.path.join(os.path.abspath(CACHE_DIR), "objects"):
+        base = stem
+    else:
+        stat = os.stat(path)
+        base = hashlib.sha256(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+    suffix = hashlib.sha256(json.dumps(variant, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    return f"{base}-{suffix}"
+
+
+def _columnar(path, header, read_options, compact=False):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".arrow", ".feather", ".ipc"):
+        return _read(path)
+    variant = (header, read_options, FORMAT_VERSION) if compact else (header, read_options, FORMAT_VERSION, "pandas-types")
+    target = os.path.join(COLUMNAR_DIR, f"{_key(path, *variant)}.arrow")
+    if not os.path.exists(target):
+        os.makedirs(COLUMNAR_DIR, exist_ok=True)
+        table = _parse(path, ext, header, read_options)
+        if compact:
+            table = _compact(table)
+        else:
+            temporal = [f.name for f in table.schema if pa.types.is_temporal(f.type)]
+            if temporal and ext not in (".parquet", ".xlsx", ".xls", ".json", ".jsonl", ".ndjson"):
+                # pandas leaves date-like text as strings; read those columns again as text
+                table = _parse(path, ext, header, read_options, text_columns=temporal)
+        _write(table, target)
+    return _read(target)
+
+
+def _parse(path, ext, header, read_options, text_columns=()):
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path, memory_map=True)
+    if ext in (".xlsx", ".xls"):
+        return pa.Table.from_pandas(pd.read_excel(path, header=header if header is None else 0, **read_options),
+                                    preserve_index=False)
+    if ext in (".json", ".jsonl", ".ndjson"):
+        return _parse_json(path)
+    delimiter = "\t" if ext == ".tsv" else read_options.get("sep", read_options.get("delimiter", ","))
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE, autogenerate_column_names=header is None),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in text_columns},
+                                              null_values=PANDAS_NULL_VALUES, strings_can_be_null=True,
+                                              quoted_strings_can_be_null=True),
+    )
+    if header is None:  # stored as "0", "1"...; load_table turns them back into ints like pandas
+        table = table.rename_columns([str(i) for i in range(table.num_columns)])
+    return table
+
+
+def _parse_json(path):
+    try:
+        return pa_json.read_json(path)  # newline-delimited records
+    except pa.ArrowInvalid:
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):  # {"data": [...]} and similar wrappers
+            data = next((v for v in data.values() if isinstance(v, list)), [data])
+        return pa.Table.from_pandas(pd.json_normalize(data), preserve_index=False)
+
+
+def _compact(table):
+    """Smallest integer type that fits each int column; low-cardinality strings dictionary-encoded."""
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_integer(column.type) and len(column) and column.null_count < len(column):
+            low, high = pc.min_max(column).values()
+            for candidate in INT_TYPES:
+                info = _int_range(candidate)
+                if info[0] <= low.as_py() and high.as_py() <= info[1]:
+                    column = column.cast(candidate)
+                    break
+        elif pa.types.is_string(column.type) and len(column):
+            if pc.count_distinct(column).as_py() / len(column) <= DICTIONARY_RATIO:
+                column = column.dictionary_encode()
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+def _int_range(int_type):
+    bits = int_type.bit_width
+    return -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+
+
+def _write(table, target):
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, target)
+
+
+def _read(path):
+    """Memory-mapped, zero-copy view of an Arrow IPC file."""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def _extract_pdf_tables(path, pages):
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf  # PyMuPDF < 1.24
+    tables = []
+    with pymupdf.open(path) as doc:
+        for number in (pages if pages is not None else range(len(doc))):
+            for table in doc[number].find_tables().tables:
+                df = table.to_pandas()
+                df.columns = _unique_names(df.columns)
+                tables.append(df.astype(str) if df.dtypes.eq(object).any() else df)
+    return tables
+
+
+def _unique_names(names):
+    seen, result = {}, []
+    for name in (str(n) if n not in (None, "") else "col" for n in names):
+        seen[name] = seen.get(name, -1) + 1
+        result.append(name if seen[name] == 0 else f"{name}_{seen[name]}")
+    return result
@@ -1,12 +1,22 @@
 import os
-import requests
-from groq import Groq
-from dotenv import load_dotenv
+import asyncio
+from .fetch import fetch_cached, get_groq, FetchError, DownloadTooLarge
+from .download_cache import sniff
+from .result_cache import ResultCache, make_key
+from tracing import traced
+from deadline import tool_timeout
 
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+WHISPER_MODEL = "whisper-large-v3"
+LANGUAGE = "en"
+TEMPERATURE = 0.0
+WHISPER_TIMEOUT = 60  # seconds; less when the level is nearly out of time
+# Groq supports these formats: flac, mp3, mp4, mpeg, mpga, m4a, ogg, wav, webm
+WHISPER_FORMATS = (".flac", ".mp3", ".mp4", ".mpeg", ".mpga", ".m4a", ".ogg", ".wav", ".webm")
+# Transcripts keyed on (audio sha256, model, language, temperature)
+results = ResultCache("transcription")
 
-def transcribe_audio(audio_url: str) -> str:
+@traced("tool.transcribe_audio")
+async def transcribe_audio(audio_url: str) -> str:
     """
     Downloads audio from a URL and transcribes it using Groq's Whisper model.
     """
@@ -15,44 +25,42 @@ def transcribe_audio(audio_url: str) -> str:
     if not audio_url.startswith(("http://", "https://")):
         audio_url = "https://tds-llm-analysis.s-anand.net" + audio_url
         print(f"[Tool] Fixed to full URL: {audio_url}")
-    temp_filename = "temp_audio_file"
     
     try:
-        # 1. Download the audio file
-        response = requests.get(audio_url, stream=True)
-        if response.status_code != 200:
-            return f"Error: Failed to download audio (Status {response.status_code})"
+        # 1. Download the audio file (reuses the cached copy on retries)
+        try:
+            entry = await fetch_cached(audio_url)
+        except FetchError as e:
+            return f"Error: Failed to download audio (Status {e.status_code})"
+        except DownloadTooLarge as e:
+            return f"Error: {e}"
         
-        if len(response.content) < 100:
+        if entry["size"] < 100:
              return f"Error: Downloaded file is too small. It might not be audio."
-        # Groq supports these formats: flac, mp3, mp4, mpeg, mpga, m4a, ogg, wav, webm
-        # We try to detect extension or default to .mp3
-        if ".ogg" in audio_url: ext = ".ogg"
-        elif ".wav" in audio_url: ext = ".wav"
-        else: ext = ".mp3"
-        
-        filename = f"{temp_filename}{ext}"
-        
-        with open(filename, "wb") as f:
-            f.write(response.content)
+
+        key = make_key(entry["sha256"], WHISPER_MODEL, LANGUAGE, TEMPERATURE)
+        cached = await asyncio.to_thread(results.get, key)  # SQLite shared with the other workers: off the loop
+        if cached is not None:
+            print("[Tool] Transcription cache hit.")
+            return f"TRANSCRIPTION: {cached}"
+
+        # Detect the format from the file itself, then the URL; default to .mp3
+        url_ext = os.path.splitext(entry["filename"])[1]
+        ext = next((e for e in (sniff(entry["path"])[0], url_ext) if e in WHISPER_FORMATS), ".mp3")
             
-        # 2. Send to Groq for Transcription
-        with open(filename, "rb") as file:
-            transcription = client.audio.transcriptions.create(
-                file=(filename, file.read()),
-                model="whisper-large-v3",
+        # 2. Send to Groq for Transcription (the open file is streamed into the upload)
+        with open(entry["path"], "rb") as file:
+            transcription = await get_groq().audio.transcriptions.create(
+                file=(f"audio{ext}", file),
+                model=WHISPER_MODEL,
                 response_format="json",
-                language="en",
-                temperature=0.0
+                language=LANGUAGE,
+                temperature=TEMPERATURE,
+                timeout=tool_timeout(WHISPER_TIMEOUT),
             )
-            
-        # 3. Cleanup
-        if os.path.exists(filename):
-            os.remove(filename)
+        await asyncio.to_thread(results.put, key, transcription.text)
             
         return f"TRANSCRIPTION: {transcription.text}"
 
     except Exception as e:
-        if os.path.exists(filename):
-            os.remove(filename)
-        return f"Transcription Error: {e}"
\ No newline at end of file
+        return f"Transcription Error: {e}"
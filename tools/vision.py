@@ -1,35 +1,51 @@
-import os
-import base64
-import requests
-from groq import Groq
-from dotenv import load_dotenv
+import asyncio
+from .fetch import fetch_cached, get_groq
+from .image_prep import prepare, local_answer, VISION_MAX_SIDE, VISION_JPEG_QUALITY
+from .result_cache import ResultCache, make_key
+from tracing import traced, span
+from deadline import tool_timeout
 
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+VISION_MODEL = "llama-3.2-11b-vision-preview"
+VISION_TEMPERATURE = 0.1
+VISION_TIMEOUT = 60  # seconds; less when the level is nearly out of time
+# Answers keyed on (image sha256, model, question, temperature, preprocessing settings)
+results = ResultCache("vision")
 
-def encode_image(image_url):
-    """Downloads an image and converts it to base64 string."""
-    try:
-        response = requests.get(image_url)
-        if response.status_code == 200:
-            return base64.b64encode(response.content).decode('utf-8')
-        else:
-            return None
-    except Exception:
-        return None
-
-def analyze_image(image_url: str, question: str = "What is in this image?") -> str:
+@traced("tool.analyze_image")
+async def analyze_image(image_url: str, question: str = "What is in this image?") -> str:
     """
     Analyzes an image using Groq's Vision model.
     """
     print(f"[Tool] Analyzing Image: {image_url}")
     
-    base64_image = encode_image(image_url)
-    if not base64_image:
+    try:
+        entry = await fetch_cached(image_url)
+    except Exception:
         return "Error: Could not download image."
 
+    # The cache key comes from the download index, so a hit never reads the image.
+    key = make_key(entry["sha256"], VISION_MODEL, question, VISION_TEMPERATURE, VISION_MAX_SIDE, VISION_JPEG_QUALITY)
+    cached = await asyncio.to_thread(results.get, key)  # SQLite shared with the other workers: off the loop
+    if cached is not None:
+        print("[Tool] Vision cache hit.")
+        return f"IMAGE ANALYSIS: {cached}"
+
+    # Simple questions (dominant colour, OCR-able numbers) never reach the API.
+    with span("vision.local") as s:
+        answer = await asyncio.to_thread(local_answer, entry["path"], question)
+        s.set(answered=answer is not None)
+    if answer:
+        print(f"[Tool] Answered locally: {answer[:80]}")
+        return f"IMAGE ANALYSIS: {answer}"
+
+    with span("vision.preprocess") as s:
+        data_url, report = await asyncio.to_thread(prepare, entry["path"])
+        s.set(bytes_in=report["bytes_before"], bytes_out=report["bytes_after"], **report)
+    print(f"[Tool] Image payload {report['bytes_before']} -> {report['bytes_after']} bytes "
+          f"({report.get('pixels_before')} -> {report.get('pixels_after')} px, {report.get('prep_ms')} ms)")
+
     try:
-        chat_completion = client.chat.completions.create(
+        chat_completion = await get_groq().chat.completions.create(
             messages=[
                 {
                     "role": "user",
@@ -38,17 +54,19 @@ def analyze_image(image_url: str, question: str = "What is in this image?") -> s
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
+                                "url": data_url,
                             },
                         },
                     ],
                 }
             ],
-            model="llama-3.2-11b-vision-preview",
-            temperature=0.1,
+            model=VISION_MODEL,
+            temperature=VISION_TEMPERATURE,
+            timeout=tool_timeout(VISION_TIMEOUT),
         )
         
         result = chat_completion.choices[0].message.content
+        await asyncio.to_thread(results.put, key, result)
         return f"IMAGE ANALYSIS: {result}"
 
     except Exception as e:
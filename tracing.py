@@ -0,0 +1,182 @@
+"""
+Span-based timing for quiz runs, plus Prometheus-style metrics.
+
+    with span("tool.navigate", url=url) as s:
+        ...
+        s.set(bytes_out=len(result))
+
+Spans nest via contextvars and are collected into the current quiz's Trace (a
+JSON-friendly record kept for the last MAX_TRACES runs). Every finished span also
+feeds the `quiz_span_seconds` histogram and `quiz_spans_total` counter.
+"""
+import time
+import uuid
+import functools
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MAX_TRACES = 200
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+# --- METRICS ---
+class Metrics:
+    """Minimal in-process counters and histograms rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}     # (name, labels) -> value
+        self.histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+        self.help = {}
+
+    def inc(self, name, value=1, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.help.setdefault(name, (help, "counter"))
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.help.setdefault(name, (help, "histogram"))
+            h = self.histograms.setdefault(key, [0] * len(BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (text, kind) in sorted(self.help.items()):
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in sorted(self.counters.items()):
+                        if n == name:
+                            lines.append(f"{name}{_labels(labels)} {value}")
+                else:
+                    for (n, labels), h in sorted(self.histograms.items()):
+                        if n != name:
+                            continue
+                        for bound, count in zip(BUCKETS, h):
+                            le = "+Inf" if bound == float("inf") else repr(bound)
+                            lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {count}")
+                        lines.append(f"{name}_sum{_labels(labels)} {h[-2]:.6f}")
+                        lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}"
+
+
+metrics = Metrics()
+
+
+# --- TRACES ---
+class Span:
+    def __init__(self, name, trace, parent, attrs):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.trace = trace
+        self.parent = parent
+        self.attrs = dict(attrs)
+        self.started = time.time()
+        self.duration = None
+        self.status = "ok"
+
+    def set(self, **attrs):
+        """Adds attributes (payload bytes, tokens, model...) to the span."""
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        offset = self.started - self.trace.started if self.trace else 0
+        return {"id": self.id, "parent": self.parent, "name": self.name, "status": self.status,
+                "start_s": round(offset, 3), "duration_s": round(self.duration or 0, 4), "attrs": self.attrs}
+
+
+class Trace:
+    """Every span recorded during one quiz run."""
+
+    def __init__(self, trace_id, url):
+        self.id = trace_id
+        self.url = url
+        self.started = time.time()
+        self.finished = None
+        self.spans = []
+
+    def summary(self):
+        return {"id": self.id, "url": self.url, "spans": len(self.spans),
+                "duration_s": round((self.finished or time.time()) - self.started, 2),
+                "finished": self.finished is not None}
+
+    def to_dict(self):
+        totals = {}
+        for s in self.spans:
+            totals[s.name] = round(totals.get(s.name, 0) + (s.duration or 0), 3)
+        return dict(self.summary(), time_by_span=totals, spans=[s.to_dict() for s in self.spans])
+
+
+traces = OrderedDict()  # trace id -> Trace (most recent last)
+
+
+def start_trace(url, trace_id=None):
+    """Starts collecting spans for a quiz run in the current task."""
+    trace = Trace(trace_id or uuid.uuid4().hex[:12], url)
+    traces[trace.id] = trace
+    while len(traces) > MAX_TRACES:
+        traces.popitem(last=False)
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace(trace):
+    trace.finished = time.time()
+
+
+@contextmanager
+def span(name, **attrs):
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    s = Span(name, trace, parent.id if parent else None, attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException:
+        s.status = "error"
+        raise
+    finally:
+        _current_span.reset(token)
+        s.duration = time.time() - s.started
+        if trace is not None:
+            trace.spans.append(s)
+        metrics.observe("quiz_span_seconds", s.duration, help="Duration of agent steps, tool calls and LLM calls.",
+                        span=name)
+        metrics.inc("quiz_spans_total", help="Finished spans by name and status.", span=name, status=s.status)
+        for key in ("bytes_in", "bytes_out"):
+            if key in s.attrs:
+                metrics.inc("quiz_payload_bytes_total", s.attrs[key], help="Payload bytes in/out of each span.",
+                            span=name, direction=key[6:])
+
+
+def traced(name):
+    """Decorator for async tools: times the call and records argument/result sizes."""
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name) as s:
+                s.set(bytes_in=sum(len(str(a)) for a in args) + sum(len(str(v)) for v in kwargs.values()))
+                result = await func(*args, **kwargs)
+                s.set(bytes_out=len(str(result)))
+                return result
+        return wrapper
+    return decorate
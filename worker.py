@@ -0,0 +1,42 @@
+"""
+Headless quiz worker: runs queued quizzes from the shared job store without serving HTTP.
+
+Start extra copies on the same host (they share the job store, caches and budget
+store, which are SQLite files on local disk) to add capacity. API processes can set
+MAX_CONCURRENT_QUIZZES=0 to only accept and queue quizzes.
+"""
+import signal
+import asyncio
+from dotenv import load_dotenv
+
+load_dotenv()  # before the project imports: modules read their settings from the environment
+
+from scheduler import scheduler
+from tools import execution, loaded
+import readiness
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    scheduler.start()
+    warm_up = asyncio.create_task(readiness.warm_up())
+    try:
+        await stop.wait()
+    finally:
+        print(f"Worker {scheduler.worker_id}: shutting down, releasing {scheduler.running} job(s).")
+        warm_up.cancel()
+        await scheduler.stop()
+        browser, fetch = loaded("browser"), loaded("fetch")
+        if browser:
+            await browser.shutdown()
+        if fetch:
+            await fetch.close()
+        await execution.pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())